@@ -0,0 +1,144 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+# Sparse fieldsets, driven by query parameters:
+#   ?fields=id,name,price          keep only these fields
+#   ?omit=description,attributes   drop these fields
+#   ?view=compact                  use a named representation (Meta.fieldsets on the serializer)
+# Dotted paths reach nested serializers, e.g. on orders ?fields=id,items.quantity,items.product.name
+# or ?omit=items.product.description. fieldset_queryset() turns the resulting field tree into
+# only()/select_related()/Prefetch() calls, so columns that are not rendered are never fetched.
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+VIEW_PARAM = 'view'
+
+
+def parse_fieldset(value):
+    """'id,items.product.name' -> {'id': {}, 'items': {'product': {'name': {}}}}"""
+    tree = {}
+    for path in (value or '').split(','):
+        node = tree
+        for part in path.strip().split('.'):
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def fieldset_requested(request):
+    params = getattr(request, 'query_params', {})
+    return any(params.get(name) for name in (FIELDS_PARAM, OMIT_PARAM, VIEW_PARAM))
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin applying ?fields= / ?omit= / ?view= from the request in the context.
+    Works for nested serializers too: each one looks up the part of the field tree at its
+    own path from the root serializer. Named representations are declared as
+    Meta.fieldsets = {'compact': [...]}.
+    """
+
+    def get_fieldset_path(self):
+        path, node = [], self
+        while node.parent is not None:
+            if node.field_name: # ListSerializer children are bound with an empty name
+                path.append(node.field_name)
+            node = node.parent
+        return path[::-1]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or not fieldset_requested(request):
+            return fields
+        path = self.get_fieldset_path()
+        params = request.query_params
+
+        selected = parse_fieldset(params.get(FIELDS_PARAM))
+        for part in path:
+            selected = selected.get(part) if selected else None
+        if not selected:
+            named = getattr(getattr(self, 'Meta', None), 'fieldsets', {})
+            selected = dict.fromkeys(named.get(params.get(VIEW_PARAM), []), {})
+        if selected:
+            fields = {name: field for name, field in fields.items() if name in selected}
+
+        omitted = parse_fieldset(params.get(OMIT_PARAM))
+        for part in path:
+            omitted = omitted.get(part, {})
+        # Only leaves are removed here; deeper paths are handled by the nested serializer.
+        return {name: field for name, field in fields.items() if name not in omitted or omitted[name]}
+
+
+def fieldset_queryset(queryset, serializer, extra_fields=()):
+    """
+    Restrict `queryset` to the columns and relations `serializer` (already trimmed by
+    SparseFieldsetMixin) renders: plain fields become only(), relations crossed by a source
+    become select_related(), nested serializers become Prefetch() with their own restricted
+    queryset. `extra_fields` are always loaded (e.g. the pagination ordering).
+    Meta.fieldset_requires = {'field': ['relation', ...]} declares what method fields read.
+    """
+    model = queryset.model
+    only = {model._meta.pk.name, *extra_fields}
+    select, prefetch, whole = set(), {}, set()
+    restrict = True
+    requires = getattr(getattr(serializer, 'Meta', None), 'fieldset_requires', {})
+    required = set()
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        required.update(requires.get(name, []))
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        if isinstance(nested, serializers.BaseSerializer):
+            related = model._meta.get_field(field.source)
+            if not related.is_relation:
+                restrict = False
+                continue
+            related_queryset = related.related_model._default_manager.all()
+            # Reverse FKs are matched on the FK column, which must then be loaded.
+            backlink = [related.field.name] if related.one_to_many else []
+            if related.many_to_one or related.one_to_one:
+                only.add(related.name)
+            prefetch[field.source] = Prefetch(
+                field.source, queryset=fieldset_queryset(related_queryset, nested, extra_fields=backlink)
+            )
+            continue
+        if field.source == '*':
+            continue
+
+        current, lookup = model, []
+        for attr in field.source_attrs:
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                model_field = None
+            if model_field is None or model_field.many_to_many or model_field.one_to_many:
+                # A property/method (or a to-many relation): load the whole object it hangs on.
+                if lookup:
+                    select.add('__'.join(lookup))
+                    only.add('__'.join(lookup))
+                    whole.add('__'.join(lookup))
+                else:
+                    restrict = False
+                break
+            lookup.append(attr)
+            if model_field.is_relation and attr != field.source_attrs[-1]:
+                select.add('__'.join(lookup))
+                current = model_field.related_model
+        else:
+            only.add('__'.join(lookup))
+
+    # Method fields read these relations in full, which beats a restricted Prefetch.
+    prefetch.update((lookup, lookup) for lookup in required)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch.values())
+    if restrict:
+        # only('vendor') loads every vendor column while only('vendor__company_name') loads one:
+        # the more specific path wins, unless a method needs the whole related object.
+        only = {path for path in only if not any(path.startswith(f'{w}__') for w in whole)}
+        only = {path for path in only if path in whole or not any(other.startswith(f'{path}__') for other in only)}
+        queryset = queryset.only(*only)
+    return queryset
@@ -0,0 +1,26 @@
+import time
+from django.core.cache import cache
+
+# Generation-keyed caches: entries put the current generation number of their family in
+# their key, so bumping the number drops every entry of the family at once without
+# knowing their keys (the orphans simply expire). Numbers are seeded from the clock, so a
+# lost or evicted generation key never resurrects stale entries.
+
+
+def _new_generation():
+    return int(time.time() * 1000)
+
+
+def get_generation(key):
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _new_generation(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(key):
+    try:
+        cache.incr(key)
+    except ValueError: # Generation key not set yet (or evicted)
+        cache.add(key, _new_generation(), timeout=None)
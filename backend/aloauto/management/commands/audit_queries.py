@@ -0,0 +1,75 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIClient
+from accounts.models import User
+from catalogue.models import Category, Product
+from vendors.models import Vendor
+from aloauto.query_audit import AUDIT_ROLES, audit, audit_requests
+
+class Command(BaseCommand):
+    help = 'Replays the API GET endpoints per role, runs EXPLAIN on the SQL they issue and reports table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--role', action='append', choices=AUDIT_ROLES, help='Role to audit as (repeatable, default: all).')
+        parser.add_argument('--url', action='append', help='Audit only these URLs (repeatable).')
+        parser.add_argument('--timings', type=int, default=0, metavar='N', help='Also time every query shape (median of N runs).')
+        parser.add_argument('--output', help='Write the audit as JSON (to --compare against later).')
+        parser.add_argument('--compare', help='JSON written by an earlier --output run: print before/after timings.')
+        parser.add_argument('--plans', action='store_true', help='Print the query plan of every shape, not only scans.')
+
+    def handle(self, *args, **options):
+        clients = {}
+        for role in options['role'] or AUDIT_ROLES:
+            user = User.objects.filter(role=role, is_active=True).order_by('id').first()
+            if user is None:
+                self.stdout.write(self.style.WARNING(f"No active {role} user, skipping that role."))
+                continue
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(user)
+            clients[role] = client
+        if not clients:
+            raise CommandError('No user to audit with; populate the database first.')
+
+        placeholders = {
+            name: value for name, value in (
+                ('vendor', Vendor.objects.order_by('id').values_list('id', flat=True).first()),
+                ('category', Category.objects.order_by('id').values_list('id', flat=True).first()),
+                ('product_slug', Product.objects.order_by('id').values_list('slug', flat=True).first()),
+            ) if value is not None
+        }
+        shapes = audit(clients, options['url'] or audit_requests(placeholders), timings=options['timings'])
+
+        flagged = {key: entry for key, entry in shapes.items() if entry['scans']}
+        walked = {key: entry for key, entry in shapes.items() if entry['index_scans'] and not entry['scans']}
+        for key, entry in sorted(shapes.items(), key=lambda item: (not item[1]['scans'], not item[1]['index_scans'], item[0])):
+            if not entry['scans'] and not entry['index_scans'] and not options['plans']:
+                continue
+            if entry['scans']:
+                label = self.style.ERROR(f"SCAN {', '.join(entry['scans'])}")
+            elif entry['index_scans']:
+                label = self.style.WARNING(f"INDEX SCAN {', '.join(entry['index_scans'])}")
+            else:
+                label = self.style.SUCCESS('indexed')
+            timing = f" {entry['ms']:.2f} ms" if entry['ms'] is not None else ''
+            self.stdout.write(f"[{key}] {label}{timing}")
+            self.stdout.write(f"  {entry['shape'][:400]}")
+            for endpoint in entry['endpoints'][:5]:
+                self.stdout.write(f"  <- {endpoint}")
+            for line in entry['plan']:
+                self.stdout.write(f"     {line}")
+
+        if options['compare']:
+            with open(options['compare']) as before_file:
+                before = json.load(before_file)
+            self.stdout.write('\nBefore/after (ms):')
+            for key, entry in sorted(shapes.items()):
+                if key in before and before[key]['ms'] is not None and entry['ms'] is not None:
+                    self.stdout.write(
+                        f"[{key}] {before[key]['ms']:.2f} -> {entry['ms']:.2f}"
+                        f" scans {before[key]['scans'] or '-'} -> {entry['scans'] or '-'}"
+                    )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(shapes, output, indent=2)
+        self.stdout.write(f"\n{len(shapes)} query shapes, {len(flagged)} with table scans, {len(walked)} with full index scans.")
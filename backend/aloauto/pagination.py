@@ -0,0 +1,129 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from django.template import loader
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(LimitOffsetPagination):
+    """
+    Opt-in keyset (cursor) pagination on top of the default limit/offset pagination.
+
+    Requests without a `cursor` parameter are paginated with limit/offset exactly as before.
+    Sending `cursor` (empty for the first page) switches to keyset mode: rows are ordered by
+    `ordering` — a (field, tie-breaker) pair — and each page starts strictly after the
+    position encoded in the cursor, so page N costs the same index range scan as page 1
+    and no COUNT(*) is run. The response holds `next`, `previous` and `results`.
+
+    In keyset mode `ordering` always wins over ?ordering= or relevance ordering, since
+    cursors are only stable for a fixed, unique ordering.
+    """
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+    template = 'rest_framework/pagination/numbers.html'
+    keyset_template = 'rest_framework/pagination/previous_and_next.html'
+    invalid_cursor_message = 'Invalid cursor'
+
+    use_keyset = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_keyset = self.cursor_query_param in request.query_params
+        if not self.use_keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request) or self.default_limit or self.max_limit
+        model = queryset.model
+        fields = [model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+        position, values, reverse = self.decode_cursor(request, fields, connections[queryset.db])
+
+        descending = self.ordering[0].startswith('-')
+        ordering = self.ordering
+        if reverse:
+            ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+        queryset = queryset.order_by(*ordering)
+
+        if position is not None:
+            columns = ', '.join(f'"{model._meta.db_table}"."{field.column}"' for field in fields)
+            operator = '<' if descending != reverse else '>'
+            placeholders = ', '.join(['%s'] * len(values))
+            queryset = queryset.filter(RawSQL(f'({columns}) {operator} ({placeholders})', values, output_field=BooleanField()))
+
+        results = list(queryset[:self.limit + 1])
+        has_more = len(results) > self.limit
+        results = results[:self.limit]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.fields = fields
+        self.first_position = self.get_position(results[0]) if results else None
+        self.last_position = self.get_position(results[-1]) if results else None
+        if not results and position is not None:
+            # Empty page past either end: keep a way back to where the client came from.
+            self.first_position = self.last_position = position
+        if request.accepted_renderer.format == 'html':
+            self.display_page_controls = True
+        return results
+
+    def get_position(self, obj):
+        return [field.value_to_string(obj) for field in self.fields]
+
+    def decode_cursor(self, request, fields, connection):
+        """(position, database values of the position, reverse); a malformed cursor is a 404."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, None, False
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            position, reverse = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            values = [field.get_db_prep_value(field.to_python(raw), connection) for field, raw in zip(fields, position)]
+        except (TypeError, ValueError, UnicodeError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, values, bool(reverse)
+
+    def encode_cursor(self, position, reverse):
+        data = json.dumps([position, reverse], separators=(',', ':')).encode('utf-8')
+        encoded = base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_keyset_next_link(self):
+        if not self.has_next or self.last_position is None:
+            return None
+        return self.encode_cursor(self.last_position, False)
+
+    def get_keyset_previous_link(self):
+        if not self.has_previous or self.first_position is None:
+            return None
+        return self.encode_cursor(self.first_position, True)
+
+    def get_paginated_response(self, data):
+        if not self.use_keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_keyset_next_link()),
+            ('previous', self.get_keyset_previous_link()),
+            ('results', data),
+        ]))
+
+    def to_html(self):
+        if not self.use_keyset:
+            return super().to_html()
+        template = loader.get_template(self.keyset_template)
+        return template.render({
+            'previous_url': self.get_keyset_previous_link(),
+            'next_url': self.get_keyset_next_link(),
+        })
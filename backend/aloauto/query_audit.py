@@ -0,0 +1,180 @@
+import hashlib
+import re
+import statistics
+import time
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, URLResolver, get_resolver, reverse
+
+# Query audit (manage.py audit_queries): replays the API's GET endpoints for each role
+# (lists, details filled with the first row of their model, and custom GET actions),
+# captures the SQL they issue, folds it into query shapes (literals replaced by ?),
+# runs EXPLAIN on every SELECT shape and reports the ones that read a table without an
+# index, optionally timing them so index changes can be compared before/after.
+AUDIT_ROLES = ('admin', 'vendor', 'buyer')
+
+# Requests worth auditing besides the plain list and detail endpoints. {vendor} and
+# {category} are filled with ids from the database, {product_slug} with a product slug.
+AUDIT_EXTRA_REQUESTS = [
+    '/api/catalogue/products/{product_slug}/', # Detail by slug
+    '/api/catalogue/products/?vendor={vendor}&is_active=true',
+    '/api/catalogue/products/?category={category}',
+    '/api/catalogue/listings/?vendor={vendor}',
+    '/api/catalogue/listings/?category={category}&in_stock=true',
+    '/api/orders/orders/?limit=20',
+    '/api/support/?limit=20',
+]
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'IN \((?:\?, )*\?\)')
+
+
+def query_shape(sql):
+    shape = _NUMBER_RE.sub('?', _STRING_RE.sub('?', sql))
+    return _IN_LIST_RE.sub('IN (...)', shape)
+
+
+def shape_key(shape):
+    return hashlib.sha1(shape.encode('utf-8')).hexdigest()[:12]
+
+
+def viewset_get_routes(patterns=None):
+    """Named URL patterns of every viewset route answering GET (lists, details and custom actions)."""
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        if isinstance(pattern, URLResolver):
+            yield from viewset_get_routes(pattern.url_patterns)
+        elif pattern.name and 'get' in (getattr(pattern.callback, 'actions', None) or {}):
+            yield pattern
+
+
+def sample_lookup(view_class):
+    """Lookup value of the first row of the view's model, or None (no model or no row)."""
+    model = getattr(getattr(getattr(view_class, 'serializer_class', None), 'Meta', None), 'model', None)
+    if model is None:
+        return None
+    return model._default_manager.order_by('pk').values_list(getattr(view_class, 'lookup_field', 'pk'), flat=True).first()
+
+
+def list_endpoints():
+    """URLs of the GET routes that take no arguments: list routes and list actions."""
+    urls = set()
+    for pattern in viewset_get_routes():
+        if not pattern.pattern.regex.groupindex:
+            try:
+                urls.add(reverse(pattern.name))
+            except NoReverseMatch:
+                continue
+    return sorted(urls)
+
+
+def detail_endpoints():
+    """URLs of the GET routes on one object (details and detail actions), filled from the first row of their model."""
+    urls, samples = set(), {}
+    for pattern in viewset_get_routes():
+        view_class = pattern.callback.cls
+        kwarg = getattr(view_class, 'lookup_url_kwarg', None) or getattr(view_class, 'lookup_field', 'pk')
+        if set(pattern.pattern.regex.groupindex) != {kwarg}: # No lookup, or format suffix routes
+            continue
+        if view_class not in samples:
+            samples[view_class] = sample_lookup(view_class)
+        if samples[view_class] is None:
+            continue
+        try:
+            urls.add(reverse(pattern.name, kwargs={kwarg: samples[view_class]}))
+        except NoReverseMatch:
+            continue
+    return sorted(urls)
+
+
+def audit_requests(placeholders):
+    requests = list_endpoints() + detail_endpoints()
+    for template in AUDIT_EXTRA_REQUESTS:
+        try:
+            requests.append(template.format(**placeholders))
+        except KeyError: # No row to fill the placeholder with
+            continue
+    return requests
+
+
+def capture_queries(client, url, using=DEFAULT_DB_ALIAS):
+    """(status code, SQL strings) of one GET, rolled back so auditing never writes."""
+    with transaction.atomic(using=using):
+        with CaptureQueriesContext(connections[using]) as context:
+            response = client.get(url)
+        transaction.set_rollback(True, using=using)
+    return response.status_code, [query['sql'] for query in context.captured_queries]
+
+
+def explain(sql, using=DEFAULT_DB_ALIAS):
+    """
+    (plan lines, scanned tables, tables walked through a whole index) for a SELECT on
+    SQLite, PostgreSQL or MySQL. A full index walk reads every row of the index instead of
+    searching it: cheap for an ordered page with a LIMIT, a scan in disguise otherwise.
+    """
+    connection = connections[using]
+    index_scans = []
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = [row[3] for row in cursor.fetchall()]
+            scans = [line.split()[1] for line in plan if line.startswith('SCAN ') and ' USING ' not in line]
+            index_scans = [line.split()[1] for line in plan if line.startswith('SCAN ') and ' INDEX ' in line]
+        elif connection.vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN {sql}')
+            plan = [row[0] for row in cursor.fetchall()]
+            scans = [m.group(1) for line in plan for m in [re.search(r'Seq Scan on (\w+)', line)] if m]
+        elif connection.vendor == 'mysql':
+            cursor.execute(f'EXPLAIN {sql}')
+            columns = [c[0] for c in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            plan = [f"{row['table']}: {row['type']} key={row['key']}" for row in rows]
+            scans = [row['table'] for row in rows if row['type'] == 'ALL']
+            index_scans = [row['table'] for row in rows if row['type'] == 'index']
+        else:
+            return [], [], []
+    return plan, scans, index_scans
+
+
+def time_query(sql, repeat=5, using=DEFAULT_DB_ALIAS):
+    """Median wall time of `sql` in milliseconds over `repeat` runs (rows fetched)."""
+    timings = []
+    with connections[using].cursor() as cursor:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            cursor.execute(sql)
+            cursor.fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def audit(clients, requests, timings=0, using=DEFAULT_DB_ALIAS):
+    """
+    Run `requests` with each of `clients` ({role: APIClient}) and EXPLAIN what they issue.
+    Returns {shape key: {'shape', 'sql', 'endpoints', 'plan', 'scans', 'index_scans', 'ms'}}; scans
+    are only reported for queries with a WHERE clause, full reads of a table being intended,
+    and full index walks only without a LIMIT.
+    """
+    shapes = {}
+    for role, client in clients.items():
+        for url in requests:
+            status_code, queries = capture_queries(client, url, using=using)
+            for sql in queries:
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                shape = query_shape(sql)
+                entry = shapes.setdefault(shape_key(shape), {'shape': shape, 'sql': sql, 'endpoints': set()})
+                entry['endpoints'].add(f'{role} {url} ({status_code})')
+
+    tables = set(connections[using].introspection.table_names())
+    for entry in shapes.values():
+        entry['plan'], scans, index_scans = explain(entry['sql'], using=using)
+        # Scans of subquery results are not table scans.
+        scans = {table.strip('"') for table in scans} & tables
+        index_scans = {table.strip('"') for table in index_scans} & tables
+        filtered = ' WHERE ' in entry['sql'].upper()
+        entry['scans'] = sorted(scans) if filtered else []
+        entry['index_scans'] = sorted(index_scans) if filtered and ' LIMIT ' not in entry['sql'].upper() else []
+        entry['ms'] = time_query(entry['sql'], repeat=timings, using=using) if timings else None
+        entry['endpoints'] = sorted(entry['endpoints'])
+    return shapes
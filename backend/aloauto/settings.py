@@ -76,6 +76,23 @@ DATABASES = {
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+# Cache
+# Local memory by default; point CACHE_REDIS_URL at a Redis instance to share the cache between processes.
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -113,6 +130,11 @@ STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Product feeds (catalogue.feeds): public site the sitemap/merchant links point to
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000')
+FEED_PRODUCT_URL = '/products/{slug}/'
+FEED_CURRENCY = 'TND'
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -135,3 +157,25 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE # Use Django's timezone
 # CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler' # If using django-celery-beat for scheduled tasks
+CELERY_BEAT_SCHEDULE = {
+    # Order counts used to rank autocomplete suggestions (incremented live, recomputed here)
+    'refresh-autocomplete-popularity': {
+        'task': 'catalogue.tasks.refresh_autocomplete_popularity_task',
+        'schedule': 60 * 60,
+    },
+    # Rewrites the sitemap/merchant feed shards whose products changed
+    'generate-product-feeds': {
+        'task': 'catalogue.tasks.generate_feeds_task',
+        'schedule': 60 * 60,
+    },
+    # Recomputes "frequently bought together" from the order history
+    'build-related-products': {
+        'task': 'catalogue.tasks.build_related_products_task',
+        'schedule': 60 * 60 * 24,
+    },
+    # Gives back the stock of checkout reservations that were neither committed nor released
+    'release-expired-stock-reservations': {
+        'task': 'orders.tasks.release_expired_reservations_task',
+        'schedule': 60,
+    },
+}
@@ -0,0 +1,39 @@
+from contextlib import contextmanager
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.test.utils import CaptureQueriesContext
+
+# Query budgets per API endpoint: the maximum number of SQL queries a request may issue,
+# independent of page size. Tests wrap requests in query_budget('<endpoint>') so that an
+# N+1 regression (a missing select_related/prefetch_related) fails loudly.
+QUERY_BUDGETS = {
+    'product-list': 4, # ETag aggregate, COUNT, products joined with vendor and category, prefetched images
+    'product-detail': 4, # product joined with vendor and category, prefetched images, related products and their last change
+    'cart-checkout': 31, # checkout_cart, then the order with its items, products and images
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(endpoint, budget=None, using=DEFAULT_DB_ALIAS):
+    """
+    Fail if the wrapped block issues more queries than the budget of `endpoint`.
+    `budget` overrides the value from QUERY_BUDGETS.
+    """
+    limit = QUERY_BUDGETS[endpoint] if budget is None else budget
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    if len(context) > limit:
+        queries = '\n'.join(f"{i}. {q['sql']}" for i, q in enumerate(context.captured_queries, start=1))
+        raise QueryBudgetExceeded(
+            f"Endpoint '{endpoint}' issued {len(context)} queries, budget is {limit}:\n{queries}"
+        )
+
+
+class QueryBudgetMixin:
+    """TestCase mixin exposing query_budget() as an assertion."""
+
+    def assertQueryBudget(self, endpoint, budget=None, using=DEFAULT_DB_ALIAS):
+        return query_budget(endpoint, budget=budget, using=using)
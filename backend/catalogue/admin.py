@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Product, Category, ProductImage
+from .models import Product, Category, ProductImage, VehicleMake, VehicleModel, Vehicle, ProductFitment, PartNumber
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -14,13 +14,19 @@ class ProductImageInline(admin.TabularInline):
     extra = 1 # Number of empty forms to display
     readonly_fields = ('created_at',)
 
+class PartNumberInline(admin.TabularInline):
+    model = PartNumber
+    fields = ('number', 'normalized', 'kind', 'brand')
+    readonly_fields = ('normalized',)
+    extra = 0
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('name', 'category', 'vendor', 'price', 'stock_quantity', 'is_active', 'attributes_summary', 'updated_at')
     list_filter = ('category', 'vendor', 'is_active', 'updated_at')
     search_fields = ('name', 'description', 'vendor__company_name', 'category__name')
     prepopulated_fields = {'slug': ('name',)}
-    inlines = [ProductImageInline]
+    inlines = [ProductImageInline, PartNumberInline]
     readonly_fields = ('created_at', 'updated_at')
 
     fieldsets = (
@@ -60,3 +66,31 @@ class ProductAdmin(admin.ModelAdmin):
 #     def product_name(self, obj):
 #         return obj.product.name
 #     product_name.short_description = 'Product'
+
+
+@admin.register(VehicleMake)
+class VehicleMakeAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug')
+    search_fields = ('name',)
+    prepopulated_fields = {'slug': ('name',)}
+
+@admin.register(VehicleModel)
+class VehicleModelAdmin(admin.ModelAdmin):
+    list_display = ('name', 'make', 'slug')
+    list_filter = ('make',)
+    search_fields = ('name', 'make__name')
+    prepopulated_fields = {'slug': ('name',)}
+
+@admin.register(Vehicle)
+class VehicleAdmin(admin.ModelAdmin):
+    list_display = ('model', 'year', 'engine')
+    list_filter = ('model__make', 'year')
+    search_fields = ('model__name', 'model__make__name', 'engine')
+    list_select_related = ('model__make',)
+
+@admin.register(ProductFitment)
+class ProductFitmentAdmin(admin.ModelAdmin):
+    list_display = ('product', 'vehicle', 'notes')
+    search_fields = ('product__name', 'product__sku', 'vehicle__model__name')
+    raw_id_fields = ('product', 'vehicle')
+    list_select_related = ('product', 'vehicle__model__make')
@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count
+from .models import Product, ProductAttributeValue
+
+ATTRIBUTE_KEY_MAX_LENGTH = ProductAttributeValue._meta.get_field('key').max_length
+ATTRIBUTE_VALUE_MAX_LENGTH = ProductAttributeValue._meta.get_field('value').max_length
+INDEX_BATCH_SIZE = 1000
+
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value).strip()[:ATTRIBUTE_VALUE_MAX_LENGTH]
+
+
+def flatten_attributes(attributes):
+    """
+    Turn a Product.attributes dict into a set of (key, value) string pairs.
+    Lists contribute one pair per scalar element; nested objects and empty values are skipped.
+    """
+    pairs = set()
+    if not isinstance(attributes, dict):
+        return pairs
+    for key, value in attributes.items():
+        key = str(key).strip()[:ATTRIBUTE_KEY_MAX_LENGTH]
+        values = value if isinstance(value, list) else [value]
+        for item in values:
+            if item is None or isinstance(item, (dict, list)):
+                continue
+            item = _format_value(item)
+            if key and item:
+                pairs.add((key, item))
+    return pairs
+
+
+def index_product_attributes(product_ids, using=DEFAULT_DB_ALIAS):
+    """Rebuild the attribute rows of the given products from their JSON attributes."""
+    product_ids = list(product_ids)
+    for start in range(0, len(product_ids), INDEX_BATCH_SIZE):
+        batch = product_ids[start:start + INDEX_BATCH_SIZE]
+        rows = [
+            ProductAttributeValue(product_id=pk, key=key, value=value)
+            for pk, attributes in Product.objects.using(using).filter(id__in=batch).values_list('id', 'attributes')
+            for key, value in flatten_attributes(attributes)
+        ]
+        with transaction.atomic(using=using):
+            ProductAttributeValue.objects.using(using).filter(product_id__in=batch).delete()
+            ProductAttributeValue.objects.using(using).bulk_create(rows, batch_size=INDEX_BATCH_SIZE)
+
+
+def parse_attribute_filters(values):
+    """Parse repeated `key:value` query parameters into {key: [values]}."""
+    filters = OrderedDict()
+    for raw in values:
+        key, sep, value = raw.partition(':')
+        key, value = key.strip(), value.strip()
+        if sep and key and value:
+            filters.setdefault(key, []).append(value)
+    return filters
+
+
+def filter_by_attributes(queryset, filters):
+    """Keep products matching every key, and any of the values given for a key."""
+    for key, values in filters.items():
+        matching = ProductAttributeValue.objects.filter(key=key, value__in=values).values('product_id')
+        queryset = queryset.filter(pk__in=matching) # pk: also works on ProductListing
+    return queryset
+
+
+def compute_facets(queryset, keys=None):
+    """
+    Count products per attribute key/value within `queryset`, with one GROUP BY over the
+    attribute index. Returns {key: {value: count}} with values sorted by descending count.
+    """
+    rows = ProductAttributeValue.objects.filter(product_id__in=queryset.values('pk'))
+    if keys:
+        rows = rows.filter(key__in=keys)
+    rows = rows.values('key', 'value').annotate(count=Count('product_id')).order_by('key', '-count', 'value')
+    facets = OrderedDict()
+    for row in rows:
+        facets.setdefault(row['key'], OrderedDict())[row['value']] = row['count']
+    return facets
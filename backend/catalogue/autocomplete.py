@@ -0,0 +1,229 @@
+import re
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from aloauto.generations import bump_generation, get_generation
+from .models import AutocompleteTerm, Category, Product
+from .search import FRENCH_STOPWORDS, strip_accents
+from vendors.models import Vendor
+
+# Typeahead over product names, SKUs, category names and vendor names.
+# Every indexed label is stored once per word it contains, as the suffix starting at that
+# word ("plaquettes de frein avant" -> "plaquettes de frein avant", "frein avant", "avant"),
+# so a typed prefix matching the start of any word becomes a prefix scan on the term index.
+# SKUs are stored without separators and match the query with separators removed too.
+# Rows carry a popularity (distinct orders of the product, summed for categories and vendors)
+# used for ranking. Responses are cached per normalized query; the cache is keyed by a
+# generation (aloauto.generations) bumped only when a reindex changes the suggestions
+# themselves, popularity drift is tolerated until the timeout.
+AUTOCOMPLETE_CACHE_KEY = 'catalogue:autocomplete:{generation}:{limit}:{query}'
+AUTOCOMPLETE_GENERATION_KEY = 'catalogue:autocomplete:generation'
+AUTOCOMPLETE_CACHE_TIMEOUT = 60 * 5
+AUTOCOMPLETE_MIN_LENGTH = 2
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 25
+AUTOCOMPLETE_BATCH_SIZE = 1000
+TERM_MAX_LENGTH = 100
+
+_NON_WORD_RE = re.compile(r'[^0-9a-z]+')
+
+
+def normalize_term(text):
+    """'Plaquettes  de Frein-Avant' -> 'plaquettes de frein avant'"""
+    return _NON_WORD_RE.sub(' ', strip_accents((text or '').lower())).strip()
+
+
+def compact_term(text):
+    return normalize_term(text).replace(' ', '')
+
+
+def label_terms(label):
+    words = normalize_term(label).split()
+    terms = []
+    for i, word in enumerate(words):
+        if word in FRENCH_STOPWORDS and i > 0:
+            continue
+        term = ' '.join(words[i:])[:TERM_MAX_LENGTH].strip()
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+
+def invalidate_autocomplete():
+    bump_generation(AUTOCOMPLETE_GENERATION_KEY)
+
+
+def _order_counts(product_ids=None, using=DEFAULT_DB_ALIAS):
+    from orders.models import OrderItem
+
+    items = OrderItem.objects.using(using)
+    if product_ids is not None:
+        items = items.filter(product_id__in=product_ids)
+    return dict(items.values('product_id').annotate(orders=Count('order', distinct=True)).values_list('product_id', 'orders'))
+
+
+def _grouped_popularity(field, ids, using):
+    # Distinct orders containing at least one product of each category/vendor.
+    from orders.models import OrderItem
+
+    return dict(
+        OrderItem.objects.using(using).filter(**{f'product__{field}__in': ids})
+        .values(f'product__{field}').annotate(orders=Count('order', distinct=True))
+        .values_list(f'product__{field}', 'orders')
+    )
+
+
+def _product_terms(product, popularity):
+    terms = [
+        AutocompleteTerm(term=term, kind='product', object_id=product.pk, label=product.name,
+                         slug=product.slug, popularity=popularity)
+        for term in label_terms(product.name)
+    ]
+    sku = compact_term(product.sku)[:TERM_MAX_LENGTH]
+    if sku:
+        terms.append(AutocompleteTerm(term=sku, kind='sku', object_id=product.pk, label=product.name,
+                                      slug=product.slug, popularity=popularity))
+    return terms
+
+
+def _replace_terms(kinds, object_ids, terms, using):
+    """
+    Rewrite the terms of `object_ids` unless they are already up to date. Returns whether
+    the suggestions changed, i.e. anything besides the popularity.
+    """
+    rows = AutocompleteTerm.objects.using(using).filter(kind__in=kinds, object_id__in=object_ids)
+    current = {
+        (kind, object_id, term, label, slug): popularity
+        for kind, object_id, term, label, slug, popularity in rows.values_list('kind', 'object_id', 'term', 'label', 'slug', 'popularity')
+    }
+    wanted = {(term.kind, term.object_id, term.term, term.label, term.slug): term.popularity for term in terms}
+    if current == wanted:
+        return False
+    with transaction.atomic(using=using):
+        rows.delete()
+        AutocompleteTerm.objects.using(using).bulk_create(terms, batch_size=AUTOCOMPLETE_BATCH_SIZE)
+    return current.keys() != wanted.keys()
+
+
+def index_products(product_ids, using=DEFAULT_DB_ALIAS, batch_size=AUTOCOMPLETE_BATCH_SIZE):
+    """Rewrite the name and SKU terms of `product_ids`; inactive or deleted products are dropped."""
+    product_ids = list(product_ids)
+    changed = False
+    for start in range(0, len(product_ids), batch_size):
+        batch = product_ids[start:start + batch_size]
+        products = Product.objects.using(using).filter(id__in=batch, is_active=True).only('id', 'name', 'slug', 'sku')
+        counts = _order_counts(batch, using=using)
+        terms = [term for product in products for term in _product_terms(product, counts.get(product.pk, 0))]
+        changed |= _replace_terms(['product', 'sku'], batch, terms, using)
+    if changed:
+        invalidate_autocomplete()
+
+
+def index_categories(category_ids, using=DEFAULT_DB_ALIAS):
+    category_ids = list(category_ids)
+    categories = Category.objects.using(using).filter(id__in=category_ids)
+    popularity = _grouped_popularity('category_id', category_ids, using)
+    terms = [
+        AutocompleteTerm(term=term, kind='category', object_id=category.pk, label=category.name,
+                         slug=category.slug, popularity=popularity.get(category.pk, 0))
+        for category in categories for term in label_terms(category.name)
+    ]
+    if _replace_terms(['category'], category_ids, terms, using):
+        invalidate_autocomplete()
+
+
+def index_vendors(vendor_ids, using=DEFAULT_DB_ALIAS):
+    """Only active vendors are suggested."""
+    vendor_ids = list(vendor_ids)
+    vendors = Vendor.objects.using(using).filter(id__in=vendor_ids, status='active')
+    popularity = _grouped_popularity('vendor_id', vendor_ids, using)
+    terms = [
+        AutocompleteTerm(term=term, kind='vendor', object_id=vendor.pk, label=vendor.company_name,
+                         popularity=popularity.get(vendor.pk, 0))
+        for vendor in vendors for term in label_terms(vendor.company_name)
+    ]
+    if _replace_terms(['vendor'], vendor_ids, terms, using):
+        invalidate_autocomplete()
+
+
+def rebuild_index(using=DEFAULT_DB_ALIAS, batch_size=AUTOCOMPLETE_BATCH_SIZE):
+    """Regenerate every term. Returns the number of rows written."""
+    AutocompleteTerm.objects.using(using).all().delete()
+    product_ids = list(Product.objects.using(using).filter(is_active=True).order_by('id').values_list('id', flat=True))
+    index_products(product_ids, using=using, batch_size=batch_size)
+    index_categories(Category.objects.using(using).values_list('id', flat=True), using=using)
+    index_vendors(Vendor.objects.using(using).filter(status='active').values_list('id', flat=True), using=using)
+    return AutocompleteTerm.objects.using(using).count()
+
+
+def refresh_popularity(using=DEFAULT_DB_ALIAS):
+    """Recompute every popularity from the orders, with one UPDATE per kind."""
+    from orders.models import OrderItem
+
+    items = OrderItem.objects.using(using)
+    sources = {
+        ('product', 'sku'): items.filter(product_id=OuterRef('object_id')).values('product_id'),
+        ('category',): items.filter(product__category_id=OuterRef('object_id')).values('product__category_id'),
+        ('vendor',): items.filter(product__vendor_id=OuterRef('object_id')).values('product__vendor_id'),
+    }
+    updated = 0
+    for kinds, grouped in sources.items():
+        orders = grouped.annotate(orders=Count('order', distinct=True)).values('orders')
+        updated += AutocompleteTerm.objects.using(using).filter(kind__in=kinds).update(
+            popularity=Coalesce(Subquery(orders), Value(0))
+        )
+    return updated
+
+
+def record_order_items(product_ids, using=DEFAULT_DB_ALIAS):
+    # Cheap increment for new order lines: every term of the products, their categories and
+    # vendors gains one order (once per call, like refresh_popularity() counts distinct
+    # orders). Lines added to an existing order one by one drift; the refresh corrects that.
+    owners = list(Product.objects.using(using).filter(pk__in=product_ids).values_list('pk', 'category_id', 'vendor_id'))
+    if not owners:
+        return
+    ids, category_ids, vendor_ids = (set(column) for column in zip(*owners))
+    AutocompleteTerm.objects.using(using).filter(
+        Q(kind__in=['product', 'sku'], object_id__in=ids)
+        | Q(kind='category', object_id__in=category_ids)
+        | Q(kind='vendor', object_id__in=vendor_ids)
+    ).update(popularity=F('popularity') + 1)
+
+
+def lookup(query, limit=AUTOCOMPLETE_DEFAULT_LIMIT, using=DEFAULT_DB_ALIAS):
+    """
+    Suggestions for a typed prefix, most popular first: a list of {kind, id, label, slug}.
+    A product matching on several words or on its SKU is returned once.
+    """
+    spaced, compact = normalize_term(query)[:TERM_MAX_LENGTH], compact_term(query)[:TERM_MAX_LENGTH]
+    if len(compact) < AUTOCOMPLETE_MIN_LENGTH:
+        return []
+    matches = Q(kind__in=['product', 'category', 'vendor'], term__startswith=spaced)
+    matches |= Q(kind='sku', term__startswith=compact)
+    rows = (
+        AutocompleteTerm.objects.using(using).filter(matches)
+        .order_by('-popularity', 'label', 'id')
+        .values_list('kind', 'object_id', 'label', 'slug')[:limit * 4]
+    )
+    results, seen = [], set()
+    for kind, object_id, label, slug in rows:
+        key = ('product' if kind == 'sku' else kind, object_id)
+        if key in seen:
+            continue
+        seen.add(key)
+        results.append({'kind': key[0], 'id': object_id, 'label': label, 'slug': slug})
+        if len(results) == limit:
+            break
+    return results
+
+
+def cached_lookup(query, limit=AUTOCOMPLETE_DEFAULT_LIMIT):
+    key = AUTOCOMPLETE_CACHE_KEY.format(
+        generation=get_generation(AUTOCOMPLETE_GENERATION_KEY), limit=limit, query=normalize_term(query)[:TERM_MAX_LENGTH].replace(' ', '_')
+    )
+    results = cache.get(key)
+    if results is None:
+        results = lookup(query, limit)
+        cache.set(key, results, AUTOCOMPLETE_CACHE_TIMEOUT)
+    return results
@@ -0,0 +1,167 @@
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+from rest_framework import serializers
+from logs.signals import bulk_log_actions
+from .models import Category, Product
+from .signals import products_bulk_changed
+
+UPSERT_BATCH_SIZE = 1000
+UPSERT_MAX_ROWS = 20000
+
+# Fields a row may set; 'sku' is the key and is never updated.
+UPSERT_FIELDS = ['name', 'description', 'price', 'stock_quantity', 'category', 'attributes', 'weight', 'dimensions', 'is_active']
+CREATE_REQUIRED_FIELDS = ['name', 'price', 'stock_quantity', 'category']
+
+
+class ProductUpsertRowSerializer(serializers.Serializer):
+    # Plain fields only (category is an id checked per batch), so validating
+    # thousands of rows does not cost a query per row.
+    sku = serializers.CharField(max_length=100)
+    name = serializers.CharField(max_length=255, required=False)
+    description = serializers.CharField(required=False, allow_blank=True)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    stock_quantity = serializers.IntegerField(min_value=0, required=False)
+    category = serializers.IntegerField(required=False)
+    attributes = serializers.JSONField(required=False)
+    weight = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
+    dimensions = serializers.CharField(max_length=100, required=False, allow_blank=True, allow_null=True)
+    is_active = serializers.BooleanField(required=False)
+
+
+class ProductUpserter:
+    """
+    Create or update a vendor's products keyed by SKU. Rows are validated, then written per
+    batch in one transaction with bulk_create/bulk_update; search/attribute/SKU indexes are
+    refreshed through products_bulk_changed and the audit log is written with one insert per
+    batch. `upsert(rows)` returns one result per row, in input order:
+    {'index', 'sku', 'status': 'created'|'updated'|'error', 'id' or 'errors'}.
+    """
+
+    def __init__(self, vendor, user=None, ip_address=None, using=DEFAULT_DB_ALIAS, batch_size=UPSERT_BATCH_SIZE):
+        self.vendor = vendor
+        self.user = user
+        self.ip_address = ip_address
+        self.using = using
+        self.batch_size = batch_size
+
+    def upsert(self, rows):
+        results = []
+        seen_skus = set()
+        for start in range(0, len(rows), self.batch_size):
+            results.extend(self._upsert_batch(list(enumerate(rows[start:start + self.batch_size], start=start)), seen_skus))
+        return results
+
+    def _upsert_batch(self, batch, seen_skus):
+        results = {}
+        valid = []
+        for index, row in batch:
+            serializer = ProductUpsertRowSerializer(data=row)
+            if not serializer.is_valid():
+                sku = row.get('sku') if isinstance(row, dict) else None
+                results[index] = {'index': index, 'sku': sku, 'status': 'error', 'errors': serializer.errors}
+                continue
+            data = serializer.validated_data
+            data['sku'] = data['sku'].strip()
+            if data['sku'] in seen_skus:
+                results[index] = {'index': index, 'sku': data['sku'], 'status': 'error',
+                                  'errors': {'sku': ['Duplicate SKU in this request.']}}
+                continue
+            seen_skus.add(data['sku'])
+            valid.append((index, data))
+
+        existing = {
+            p.sku: p for p in Product.objects.using(self.using).filter(sku__in=[d['sku'] for _, d in valid])
+        }
+        category_ids = set(Category.objects.using(self.using).filter(
+            id__in={d['category'] for _, d in valid if 'category' in d}
+        ).values_list('id', flat=True))
+
+        to_create, to_update, update_fields = [], [], set()
+        now = timezone.now()
+        for index, data in valid:
+            sku = data['sku']
+            errors = {}
+            if 'category' in data and data['category'] not in category_ids:
+                errors['category'] = [f"Invalid pk \"{data['category']}\" - object does not exist."]
+            product = existing.get(sku)
+            if product is not None and product.vendor_id != self.vendor.id:
+                errors['sku'] = ['This SKU is already used by another vendor.']
+            if product is None:
+                for field in CREATE_REQUIRED_FIELDS:
+                    if field not in data:
+                        errors[field] = ['This field is required to create a product.']
+            if errors:
+                results[index] = {'index': index, 'sku': sku, 'status': 'error', 'errors': errors}
+                continue
+
+            values = {field: data[field] for field in UPSERT_FIELDS if field in data}
+            if 'category' in values:
+                values['category_id'] = values.pop('category')
+            if product is None:
+                product = Product(vendor=self.vendor, sku=sku, **{'description': '', **values})
+                to_create.append((index, product))
+            else:
+                for field, value in values.items():
+                    setattr(product, field, value)
+                product.updated_at = now # bulk_update skips auto_now
+                update_fields.update(values)
+                to_update.append((index, product))
+
+        self._assign_slugs([p for _, p in to_create])
+        try:
+            with transaction.atomic(using=self.using):
+                Product.objects.using(self.using).bulk_create([p for _, p in to_create])
+                if to_update:
+                    Product.objects.using(self.using).bulk_update(
+                        [p for _, p in to_update], sorted(update_fields | {'updated_at'})
+                    )
+                changed = [p for _, p in to_create + to_update]
+                products_bulk_changed.send(sender=Product, product_ids=[p.pk for p in changed], using=self.using)
+                self._log(to_create, to_update)
+        except IntegrityError as e:
+            # A concurrent write took one of the SKUs/slugs: report the whole batch as failed.
+            for index, product in to_create + to_update:
+                results[index] = {'index': index, 'sku': product.sku, 'status': 'error', 'errors': {'non_field_errors': [str(e)]}}
+        else:
+            for index, product in to_create:
+                results[index] = {'index': index, 'sku': product.sku, 'status': 'created', 'id': product.pk}
+            for index, product in to_update:
+                results[index] = {'index': index, 'sku': product.sku, 'status': 'updated', 'id': product.pk}
+        return [results[index] for index, _ in batch]
+
+    def _assign_slugs(self, products):
+        # Product.slug is unique and not derived anywhere else: build it from name + SKU,
+        # suffixing the rare collisions, with one query per batch.
+        candidates = {p.sku: slugify(f'{p.name} {p.sku}')[:45].strip('-') or 'produit' for p in products}
+        taken = set(Product.objects.using(self.using).filter(
+            slug__in=set(candidates.values())
+        ).values_list('slug', flat=True))
+        if taken:
+            # Suffixed variants of the colliding slugs may exist too.
+            suffixed = Q()
+            for slug in taken:
+                suffixed |= Q(slug__startswith=f'{slug}-')
+            taken.update(Product.objects.using(self.using).filter(suffixed).values_list('slug', flat=True))
+        for product in products:
+            slug, suffix = candidates[product.sku], 2
+            while slug in taken:
+                slug = f'{candidates[product.sku]}-{suffix}'
+                suffix += 1
+            taken.add(slug)
+            product.slug = slug
+
+    def _log(self, created, updated):
+        entries = [
+            ('Product created' if status == 'created' else 'Product updated', {
+                'product_id': product.pk,
+                'product_name': product.name,
+                'vendor_id': self.vendor.id,
+                'changed_by_user_id': self.user.id if self.user else None,
+                'source': 'bulk_upsert',
+            })
+            for status, rows in (('created', created), ('updated', updated))
+            for _, product in rows
+        ]
+        bulk_log_actions(self.user, entries, ip_address=self.ip_address)
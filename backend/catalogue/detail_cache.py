@@ -0,0 +1,88 @@
+from django.core.cache import cache
+
+# Read-through cache of serialized product details (ProductViewSet.retrieve).
+# One entry per product holds what is needed to answer without touching the database:
+# the visibility data (is_active, owning vendor's user) checked against the requester,
+# the updated_at stamps the ETag is built from, and the serialized payload per host
+# (media URLs are absolute). A slug entry maps slugs to ids. Entries are deleted by the
+# signal receivers in catalogue.signals whenever the product, its images, vendor,
+# category or one of its related products change, and by catalogue.related after a
+# rebuild; the timeout only bounds how long a racing stale write can survive.
+PRODUCT_CACHE_KEY = 'catalogue:product:{pk}'
+PRODUCT_SLUG_CACHE_KEY = 'catalogue:product-slug:{slug}'
+PRODUCT_CACHE_TIMEOUT = 60 * 15
+PRODUCT_CACHE_HITS_KEY = 'catalogue:product-cache:hits'
+PRODUCT_CACHE_MISSES_KEY = 'catalogue:product-cache:misses'
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError: # First hit/miss since the counter was created or evicted
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_cached_product(lookup):
+    """Cache entry for a product id or slug, or None (counted as a miss)."""
+    pk = lookup if str(lookup).isdigit() else cache.get(PRODUCT_SLUG_CACHE_KEY.format(slug=lookup))
+    entry = cache.get(PRODUCT_CACHE_KEY.format(pk=pk)) if pk is not None else None
+    if entry is not None and not str(lookup).isdigit() and entry['slug'] != lookup:
+        entry = None # Slug changed since the mapping was written
+    return entry
+
+
+def record_hit():
+    _count(PRODUCT_CACHE_HITS_KEY)
+
+
+def record_miss():
+    _count(PRODUCT_CACHE_MISSES_KEY)
+
+
+def build_entry(product, timestamps, entry=None):
+    if entry is None or entry['timestamps'] != timestamps:
+        entry = {'variants': {}}
+    entry.update({
+        'pk': product.pk,
+        'slug': product.slug,
+        'is_active': product.is_active,
+        'vendor_user_id': product.vendor.user_id,
+        'timestamps': timestamps,
+    })
+    return entry
+
+
+def store_product(entry):
+    cache.set_many({
+        PRODUCT_CACHE_KEY.format(pk=entry['pk']): entry,
+        PRODUCT_SLUG_CACHE_KEY.format(slug=entry['slug']): entry['pk'],
+    }, PRODUCT_CACHE_TIMEOUT)
+
+
+def can_view(entry, user):
+    # Mirrors ProductViewSet.get_queryset: admins see everything, vendors their own
+    # products, everyone else active products.
+    role = getattr(user, 'role', None)
+    if role == 'admin':
+        return True
+    if role == 'vendor':
+        return entry['vendor_user_id'] == user.pk
+    return entry['is_active']
+
+
+def invalidate_products(product_ids):
+    product_ids = list(product_ids)
+    for start in range(0, len(product_ids), 1000):
+        cache.delete_many([PRODUCT_CACHE_KEY.format(pk=pk) for pk in product_ids[start:start + 1000]])
+
+
+def get_stats():
+    values = cache.get_many([PRODUCT_CACHE_HITS_KEY, PRODUCT_CACHE_MISSES_KEY])
+    hits, misses = values.get(PRODUCT_CACHE_HITS_KEY, 0), values.get(PRODUCT_CACHE_MISSES_KEY, 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / total, 4) if total else None}
+
+
+def reset_stats():
+    cache.delete_many([PRODUCT_CACHE_HITS_KEY, PRODUCT_CACHE_MISSES_KEY])
@@ -0,0 +1,122 @@
+import csv
+import json
+import zlib
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Streaming catalogue export (ProductViewSet.export and the export_catalogue command).
+# Products are read in keyset chunks on the primary key (each chunk is one product query
+# plus one image query), rendered chunk by chunk and handed to the caller as they are
+# produced, so memory stays bounded by the chunk size whatever the catalogue size and the
+# first bytes go out as soon as the first chunk is read.
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+}
+EXPORT_FIELDS = [
+    'id', 'sku', 'name', 'slug', 'description', 'price', 'stock_quantity', 'is_active',
+    'vendor_id', 'vendor_name', 'category_id', 'category_name', 'category_path',
+    'weight', 'dimensions', 'attributes', 'images', 'created_at', 'updated_at',
+]
+
+
+def iter_product_chunks(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield lists of products (vendor, category and images loaded), in id order."""
+    queryset = queryset.select_related('vendor', 'category').prefetch_related('images').order_by('pk')
+    last_pk = None
+    while True:
+        chunk_queryset = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk_queryset[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def export_row(product, request=None):
+    images = []
+    for image in sorted(product.images.all(), key=lambda image: (not image.is_primary, image.pk)):
+        url = default_storage.url(image.image.name)
+        images.append(request.build_absolute_uri(url) if request is not None else url)
+    return {
+        'id': product.pk,
+        'sku': product.sku or '',
+        'name': product.name,
+        'slug': product.slug,
+        'description': product.description,
+        'price': product.price,
+        'stock_quantity': product.stock_quantity,
+        'is_active': product.is_active,
+        'vendor_id': product.vendor_id,
+        'vendor_name': product.vendor.company_name,
+        'category_id': product.category_id,
+        'category_name': product.category.name,
+        'category_path': product.category.path,
+        'weight': product.weight,
+        'dimensions': product.dimensions or '',
+        'attributes': product.attributes or {},
+        'images': images,
+        'created_at': product.created_at,
+        'updated_at': product.updated_at,
+    }
+
+
+class _LineBuffer:
+    # csv.writer target collecting the rendered lines of one chunk.
+    def __init__(self):
+        self.lines = []
+
+    def write(self, value):
+        self.lines.append(value)
+
+
+def render_csv(chunks, request=None):
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.lines.pop()
+    for chunk in chunks:
+        for product in chunk:
+            row = export_row(product, request)
+            row['attributes'] = json.dumps(row['attributes'], cls=DjangoJSONEncoder, ensure_ascii=False)
+            row['images'] = ' '.join(row['images'])
+            row['created_at'], row['updated_at'] = row['created_at'].isoformat(), row['updated_at'].isoformat()
+            writer.writerow([row[field] for field in EXPORT_FIELDS])
+        yield ''.join(buffer.lines)
+        buffer.lines.clear()
+
+
+def render_jsonl(chunks, request=None):
+    for chunk in chunks:
+        yield ''.join(
+            json.dumps(export_row(product, request), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+            for product in chunk
+        )
+
+
+def encode(parts, compress=False):
+    """UTF-8 encode the rendered parts, gzip-compressing the stream when `compress` is set."""
+    if not compress:
+        for part in parts:
+            yield part.encode('utf-8')
+        return
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16) # gzip container
+    for part in parts:
+        data = compressor.compress(part.encode('utf-8'))
+        # Flush per chunk so the client keeps receiving data during a long export.
+        data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_products(queryset, export_format='csv', compress=False, request=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Iterator of bytes for the whole export of `queryset`."""
+    render = render_csv if export_format == 'csv' else render_jsonl
+    return encode(render(iter_product_chunks(queryset, chunk_size), request), compress=compress)
+
+
+def export_filename(export_format, compress=False):
+    extension = EXPORT_FORMATS[export_format][1]
+    return f'catalogue.{extension}.gz' if compress else f'catalogue.{extension}'
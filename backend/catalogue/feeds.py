@@ -0,0 +1,198 @@
+import csv
+import gzip
+import io
+import json
+from xml.sax.saxutils import escape
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Count, F, Max
+from django.utils import timezone
+from .models import FeedShard, Product
+
+# Sitemap and merchant feeds of the active products, written as gzip shards under
+# MEDIA_ROOT/feeds/<feed>/ with an index file per feed. Products are sharded by id range,
+# so an edit only ever touches its own shard. One aggregate query gives every shard's
+# watermark (latest updated_at of its products, vendors and categories) and product count;
+# only shards whose values differ from their FeedShard row are regenerated, shards left
+# without products are deleted, and the index is rewritten when anything changed.
+FEED_SHARD_SIZE = 10000 # ids per shard; keeps sitemap files under the 50 000 URL limit
+FEED_CHUNK_SIZE = 1000
+FEEDS_DIR = 'feeds'
+FEED_EXTENSIONS = {'sitemap': 'xml', 'merchant_xml': 'xml', 'merchant_csv': 'csv'}
+MERCHANT_CSV_FIELDS = [
+    'id', 'title', 'description', 'link', 'image_link', 'availability', 'price',
+    'brand', 'mpn', 'condition', 'product_type',
+]
+
+
+def shard_path(feed, number):
+    return f'{FEEDS_DIR}/{feed}/{feed}-{number}.{FEED_EXTENSIONS[feed]}.gz'
+
+
+def index_path(feed):
+    return f'{FEEDS_DIR}/{feed}/index.xml' if feed == 'sitemap' else f'{FEEDS_DIR}/{feed}/index.json'
+
+
+def absolute_url(path):
+    return settings.SITE_URL.rstrip('/') + path
+
+
+def feed_products():
+    return Product.objects.filter(is_active=True)
+
+
+def shard_states():
+    """{shard number: (watermark, product count)} for the active products, in one query."""
+    rows = (
+        feed_products().order_by()
+        .annotate(shard=F('id') / FEED_SHARD_SIZE).values('shard')
+        .annotate(
+            count=Count('id'), last=Max('updated_at'),
+            vendor_last=Max('vendor__updated_at'), category_last=Max('category__updated_at'),
+        )
+    )
+    return {
+        row['shard']: (max(row['last'], row['vendor_last'], row['category_last']), row['count'])
+        for row in rows
+    }
+
+
+def shard_products(number):
+    # Keyset chunks inside the shard's id range, vendor/category/images loaded per chunk.
+    queryset = (
+        feed_products()
+        .filter(id__gte=number * FEED_SHARD_SIZE, id__lt=(number + 1) * FEED_SHARD_SIZE)
+        .select_related('vendor', 'category').prefetch_related('images').order_by('id')
+    )
+    last_id = None
+    while True:
+        chunk = list((queryset if last_id is None else queryset.filter(id__gt=last_id))[:FEED_CHUNK_SIZE])
+        if not chunk:
+            return
+        yield from chunk
+        last_id = chunk[-1].id
+
+
+def product_item(product):
+    images = sorted(product.images.all(), key=lambda image: (not image.is_primary, image.pk))
+    return {
+        'id': product.sku or str(product.pk),
+        'title': product.name,
+        'description': product.description,
+        'link': absolute_url(settings.FEED_PRODUCT_URL.format(slug=product.slug)),
+        'image_link': absolute_url(default_storage.url(images[0].image.name)) if images else '',
+        'availability': 'in stock' if product.stock_quantity > 0 else 'out of stock',
+        'price': f'{product.price} {settings.FEED_CURRENCY}',
+        'brand': product.vendor.company_name,
+        'mpn': product.sku or '',
+        'condition': 'new',
+        'product_type': product.category.name,
+        'lastmod': product.updated_at,
+    }
+
+
+def write_sitemap(products, output):
+    output.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    output.write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+    for product in products:
+        item = product_item(product)
+        output.write(f"<url><loc>{escape(item['link'])}</loc><lastmod>{item['lastmod'].date().isoformat()}</lastmod></url>\n")
+    output.write('</urlset>\n')
+
+
+def write_merchant_xml(products, output):
+    output.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    output.write('<rss version="2.0" xmlns:g="http://base.google.com/ns/1.0"><channel>\n')
+    output.write(f'<title>AloAuto</title><link>{escape(absolute_url("/"))}</link>\n')
+    for product in products:
+        item = product_item(product)
+        fields = ''.join(f'<g:{name}>{escape(str(item[name]))}</g:{name}>' for name in MERCHANT_CSV_FIELDS if item[name])
+        output.write(f'<item>{fields}</item>\n')
+    output.write('</channel></rss>\n')
+
+
+def write_merchant_csv(products, output):
+    writer = csv.writer(output, delimiter='\t')
+    writer.writerow(MERCHANT_CSV_FIELDS)
+    for product in products:
+        item = product_item(product)
+        writer.writerow([' '.join(str(item[name]).split()) for name in MERCHANT_CSV_FIELDS])
+
+
+FEED_WRITERS = {
+    'sitemap': write_sitemap,
+    'merchant_xml': write_merchant_xml,
+    'merchant_csv': write_merchant_csv,
+}
+
+
+def render_shard(feed, number):
+    """Gzip bytes of one shard (mtime fixed, so identical content gives identical files)."""
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as compressed:
+        with io.TextIOWrapper(compressed, encoding='utf-8', newline='') as output:
+            FEED_WRITERS[feed](shard_products(number), output)
+    return buffer.getvalue()
+
+
+def _save(path, data):
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    return default_storage.save(path, ContentFile(data))
+
+
+def write_index(feed, shards):
+    if feed == 'sitemap':
+        entries = ''.join(
+            f'<sitemap><loc>{escape(absolute_url(default_storage.url(shard.file)))}</loc>'
+            f'<lastmod>{shard.watermark.isoformat()}</lastmod></sitemap>\n'
+            for shard in shards
+        )
+        content = (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n{entries}</sitemapindex>\n'
+        )
+    else:
+        content = json.dumps({
+            'feed': feed,
+            'generated_at': timezone.now().isoformat(),
+            'files': [
+                {'url': absolute_url(default_storage.url(shard.file)), 'products': shard.product_count,
+                 'updated_at': shard.watermark.isoformat()}
+                for shard in shards
+            ],
+        }, indent=2)
+    return _save(index_path(feed), content.encode('utf-8'))
+
+
+def generate_feed(feed, force=False, states=None):
+    """Bring one feed up to date. Returns {'written', 'unchanged', 'deleted'} shard counts."""
+    states = shard_states() if states is None else states
+    existing = {shard.number: shard for shard in FeedShard.objects.filter(feed=feed)}
+    stats = {'written': 0, 'unchanged': 0, 'deleted': 0}
+
+    for number, (watermark, count) in sorted(states.items()):
+        shard = existing.get(number)
+        if not force and shard is not None and (shard.watermark, shard.product_count) == (watermark, count):
+            stats['unchanged'] += 1
+            continue
+        path = _save(shard_path(feed, number), render_shard(feed, number))
+        FeedShard.objects.update_or_create(feed=feed, number=number, defaults={
+            'file': path, 'watermark': watermark, 'product_count': count, 'generated_at': timezone.now(),
+        })
+        stats['written'] += 1
+
+    for number in set(existing) - set(states):
+        default_storage.delete(existing[number].file)
+        existing[number].delete()
+        stats['deleted'] += 1
+
+    if force or stats['written'] or stats['deleted'] or not default_storage.exists(index_path(feed)):
+        write_index(feed, FeedShard.objects.filter(feed=feed).order_by('number'))
+    return stats
+
+
+def generate_feeds(feeds=None, force=False):
+    states = shard_states() # Shared by every feed: one aggregate per run
+    return {feed: generate_feed(feed, force=force, states=states) for feed in (feeds or FEED_WRITERS)}
@@ -0,0 +1,85 @@
+from decimal import Decimal, InvalidOperation
+from rest_framework import filters
+from .models import Category
+from .attributes import filter_by_attributes, parse_attribute_filters
+from .fitment import filter_products_for_vehicles, vehicles_matching
+from .search import search_products
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    Drop-in replacement for SearchFilter on products: uses the full-text index from
+    catalogue.search instead of icontains scans, and orders results by relevance.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').replace('\x00', '').strip()
+        if not query:
+            return queryset
+        return search_products(queryset, query)
+
+
+class ProductAttributeFilter(filters.BaseFilterBackend):
+    """
+    Filter products on their attributes through the normalized attribute index:
+    ?attr=color:Rouge&attr=color:Noir&attr=size:M keeps red or black products in size M.
+    """
+    attribute_param = 'attr'
+
+    def filter_queryset(self, request, queryset, view):
+        attribute_filters = parse_attribute_filters(request.query_params.getlist(self.attribute_param))
+        if not attribute_filters:
+            return queryset
+        return filter_by_attributes(queryset, attribute_filters)
+
+
+class ProductFitmentFilter(filters.BaseFilterBackend):
+    """
+    Restrict products to parts fitting a vehicle, either by id (?vehicle=12) or by
+    selection (?make=renault&model=clio&year=2015, optional &engine=1.5 dCi).
+    """
+    vehicle_params = ('vehicle', 'make', 'model', 'year', 'engine')
+
+    def filter_queryset(self, request, queryset, view):
+        params = {name: request.query_params.get(name, '').strip() for name in self.vehicle_params}
+        if not any(params.values()):
+            return queryset
+        try:
+            vehicle_id = int(params['vehicle']) if params['vehicle'] else None
+            year = int(params['year']) if params['year'] else None
+        except ValueError:
+            return queryset.none()
+        vehicles = vehicles_matching(
+            make=params['make'], model=params['model'], year=year, engine=params['engine'], vehicle_id=vehicle_id
+        )
+        return filter_products_for_vehicles(queryset, vehicles)
+
+
+class ProductListingFilter(filters.BaseFilterBackend):
+    """
+    Listing filters served from ProductListing columns: ?category=12 (the category and
+    its whole subtree, via the materialized path), ?vendor=3, ?price_min=/?price_max=
+    and ?in_stock=1.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        try:
+            if params.get('category'):
+                path = Category.objects.filter(id=int(params['category'])).values_list('path', flat=True).first()
+                if path is None:
+                    return queryset.none()
+                # LIKE 'path%', served on PostgreSQL by the varchar_pattern_ops index (a range
+                # would depend on the collation: en_US ignores '/' and misorders subtrees).
+                queryset = queryset.filter(category_path__startswith=path)
+            if params.get('vendor'):
+                queryset = queryset.filter(vendor_id=int(params['vendor']))
+            if params.get('price_min'):
+                queryset = queryset.filter(price__gte=Decimal(params['price_min']))
+            if params.get('price_max'):
+                queryset = queryset.filter(price__lte=Decimal(params['price_max']))
+        except (ValueError, InvalidOperation):
+            return queryset.none()
+        if params.get('in_stock') in ('1', 'true'):
+            queryset = queryset.filter(stock_quantity__gt=0)
+        return queryset
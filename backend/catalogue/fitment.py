@@ -0,0 +1,135 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.text import slugify
+from .models import Product, ProductFitment, Vehicle, VehicleMake, VehicleModel
+
+FITMENT_BATCH_SIZE = 5000
+
+
+def vehicles_matching(make=None, model=None, year=None, engine=None, vehicle_id=None):
+    """Vehicle queryset for a make/model/year(/engine) selection; slugs or names are accepted."""
+    vehicles = Vehicle.objects.all()
+    if vehicle_id:
+        vehicles = vehicles.filter(id=vehicle_id)
+    if make:
+        vehicles = vehicles.filter(model__make__slug=slugify(make))
+    if model:
+        vehicles = vehicles.filter(model__slug=slugify(model))
+    if year:
+        vehicles = vehicles.filter(year=year)
+    if engine:
+        vehicles = vehicles.filter(engine__iexact=engine)
+    return vehicles
+
+
+def filter_products_for_vehicles(queryset, vehicles):
+    """Restrict a product queryset to parts compatible with any of `vehicles`."""
+    fitting = ProductFitment.objects.filter(vehicle__in=vehicles.values('id')).values('product_id')
+    return queryset.filter(pk__in=fitting) # pk: also works on ProductListing
+
+
+class FitmentLoader:
+    """
+    Bulk loader for fitment rows (sku, make, model, year_from, year_to, engine, notes).
+    A year range is expanded to one Vehicle per year. Makes, models and vehicles are created
+    on first sight and cached in memory, and fitments are inserted with bulk_create, so a file
+    with hundreds of thousands of rows costs a few queries per batch.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS, batch_size=FITMENT_BATCH_SIZE):
+        self.using = using
+        self.batch_size = batch_size
+        self.makes = {m.slug: m.id for m in VehicleMake.objects.using(using).only('id', 'slug')}
+        self.models = {(m.make_id, m.slug): m.id for m in VehicleModel.objects.using(using).only('id', 'make_id', 'slug')}
+        self.vehicles = {}
+        self.loaded = 0
+        self.skipped = 0 # Fitments already present
+        self.errors = []
+
+    def _make_id(self, name):
+        slug = slugify(name)
+        if slug not in self.makes:
+            VehicleMake.objects.using(self.using).bulk_create([VehicleMake(name=name.strip(), slug=slug)], ignore_conflicts=True)
+            self.makes[slug] = VehicleMake.objects.using(self.using).get(slug=slug).id
+        return self.makes[slug]
+
+    def _model_id(self, make_id, name):
+        key = (make_id, slugify(name))
+        if key not in self.models:
+            VehicleModel.objects.using(self.using).bulk_create(
+                [VehicleModel(make_id=make_id, name=name.strip(), slug=key[1])], ignore_conflicts=True
+            )
+            self.models[key] = VehicleModel.objects.using(self.using).get(make_id=make_id, slug=key[1]).id
+        return self.models[key]
+
+    def _vehicle_ids(self, keys):
+        """Resolve (model_id, year, engine) keys to vehicle ids, creating the missing ones."""
+        missing = [key for key in keys if key not in self.vehicles]
+        if missing:
+            Vehicle.objects.using(self.using).bulk_create(
+                [Vehicle(model_id=m, year=y, engine=e) for m, y, e in missing], ignore_conflicts=True
+            )
+            model_ids = {m for m, _, _ in missing}
+            for vehicle_id, model_id, year, engine in Vehicle.objects.using(self.using).filter(
+                    model_id__in=model_ids).values_list('id', 'model_id', 'year', 'engine'):
+                self.vehicles[(model_id, year, engine)] = vehicle_id
+        return [self.vehicles[key] for key in keys]
+
+    def load(self, rows):
+        """Load an iterable of dict rows; returns the number of fitments inserted (existing ones are counted in `skipped`)."""
+        batch = []
+        for line_number, row in enumerate(rows, start=2): # Line 1 is the CSV header
+            batch.append((line_number, row))
+            if len(batch) >= self.batch_size:
+                self._load_batch(batch)
+                batch = []
+        if batch:
+            self._load_batch(batch)
+        return self.loaded
+
+    def _load_batch(self, batch):
+        parsed = []
+        for line_number, row in batch:
+            try:
+                sku = (row.get('sku') or '').strip()
+                make, model = (row.get('make') or '').strip(), (row.get('model') or '').strip()
+                if not (sku and make and model):
+                    raise ValueError('sku, make and model are required.')
+                year_from = int(row.get('year_from') or row.get('year'))
+                year_to = int(row.get('year_to') or year_from)
+                if year_to < year_from or year_to - year_from > 60:
+                    raise ValueError(f'Invalid year range {year_from}-{year_to}.')
+                parsed.append((line_number, sku, make, model, year_from, year_to,
+                               (row.get('engine') or '').strip(), (row.get('notes') or '').strip()[:255]))
+            except (TypeError, ValueError) as e:
+                self.errors.append({'row': line_number, 'error': str(e)})
+
+        products = dict(Product.objects.using(self.using).filter(sku__in={p[1] for p in parsed}).values_list('sku', 'id'))
+        fitments = []
+        keys = []
+        for line_number, sku, make, model, year_from, year_to, engine, notes in parsed:
+            if sku not in products:
+                self.errors.append({'row': line_number, 'error': f'Unknown SKU {sku}.'})
+                continue
+            model_id = self._model_id(self._make_id(make), model)
+            for year in range(year_from, year_to + 1):
+                keys.append((model_id, year, engine))
+                fitments.append(ProductFitment(product_id=products[sku], notes=notes))
+
+        with transaction.atomic(using=self.using):
+            for fitment, vehicle_id in zip(fitments, self._vehicle_ids(keys)):
+                fitment.vehicle_id = vehicle_id
+            # ignore_conflicts does not say which rows were skipped, so the pairs already
+            # present (or repeated in the batch) are left out up front with one query.
+            seen = set(
+                ProductFitment.objects.using(self.using)
+                .filter(product_id__in={f.product_id for f in fitments}, vehicle_id__in={f.vehicle_id for f in fitments})
+                .values_list('product_id', 'vehicle_id')
+            )
+            new = []
+            for fitment in fitments:
+                if (fitment.product_id, fitment.vehicle_id) not in seen:
+                    seen.add((fitment.product_id, fitment.vehicle_id))
+                    new.append(fitment)
+            ProductFitment.objects.using(self.using).bulk_create(new, batch_size=1000, ignore_conflicts=True)
+        self.loaded += len(new)
+        self.skipped += len(fitments) - len(new)
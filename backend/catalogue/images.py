@@ -0,0 +1,154 @@
+import hashlib
+import io
+import logging
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+from .detail_cache import invalidate_products
+from .listings import refresh_listings
+
+logger = logging.getLogger(__name__)
+
+# Derivatives generated for every ProductImage: name -> (max width, max height, format).
+# Images are only ever scaled down, keeping their aspect ratio.
+IMAGE_VARIANTS = {
+    'thumbnail': (150, 150, 'JPEG'),
+    'medium': (600, 600, 'JPEG'),
+    'webp': (1200, 1200, 'WEBP'),
+}
+VARIANT_EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+VARIANT_QUALITY = 82
+VARIANTS_DIR = 'products/variants'
+
+
+def compute_content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def variant_path(content_hash, name, image_format):
+    # Keyed by content hash, so identical uploads share one set of files.
+    return f'{VARIANTS_DIR}/{content_hash[:2]}/{content_hash}/{name}.{VARIANT_EXTENSIONS[image_format]}'
+
+
+def render_variants(data):
+    """
+    Render every variant of the image `data` (bytes). Returns {name: (format, bytes)}.
+    Pure CPU work with no Django access, so it can run in a worker process.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        source = ImageOps.exif_transpose(source)
+        rendered = {}
+        for name, (width, height, image_format) in IMAGE_VARIANTS.items():
+            image = source.copy()
+            image.thumbnail((width, height), Image.LANCZOS)
+            if image_format == 'JPEG' and image.mode != 'RGB':
+                # JPEG has no alpha channel: flatten transparent images onto white.
+                image = image.convert('RGBA')
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            elif image_format == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA')
+            output = io.BytesIO()
+            image.save(output, image_format, quality=VARIANT_QUALITY, optimize=image_format == 'JPEG')
+            rendered[name] = (image_format, output.getvalue())
+    return rendered
+
+
+def read_image(product_image):
+    with default_storage.open(product_image.image.name, 'rb') as image_file:
+        return image_file.read()
+
+
+def find_duplicate(product_image, content_hash, using=DEFAULT_DB_ALIAS):
+    """Another image with the same content whose variants are already on disk, if any."""
+    from .models import ProductImage
+
+    return (
+        ProductImage.objects.using(using)
+        .filter(content_hash=content_hash).exclude(pk=product_image.pk).exclude(variants={})
+        .only('id', 'image', 'variants').first()
+    )
+
+
+def save_variants(content_hash, rendered):
+    variants = {}
+    for name, (image_format, data) in rendered.items():
+        path = variant_path(content_hash, name, image_format)
+        if default_storage.exists(path):
+            default_storage.delete(path)
+        variants[name] = default_storage.save(path, ContentFile(data))
+    return variants
+
+
+def store_variants(product_image, content_hash, variants, image_name=None, using=DEFAULT_DB_ALIAS):
+    # queryset.update() so recording the result does not fire post_save again.
+    from .models import Product, ProductImage
+
+    # Variant URLs are part of the product payload (and its ETag).
+    Product.objects.using(using).filter(pk=product_image.product_id).update(updated_at=timezone.now())
+    invalidate_products([product_image.product_id])
+    refresh_listings([product_image.product_id], using=using)
+
+    fields = {'content_hash': content_hash, 'variants': variants}
+    if image_name and image_name != product_image.image.name:
+        duplicate_upload = product_image.image.name
+        fields['image'] = image_name
+        ProductImage.objects.using(using).filter(pk=product_image.pk).update(**fields)
+        # Only this row pointed at the duplicate upload; the shared original replaces it.
+        if not ProductImage.objects.using(using).filter(image=duplicate_upload).exists():
+            default_storage.delete(duplicate_upload)
+    else:
+        ProductImage.objects.using(using).filter(pk=product_image.pk).update(**fields)
+
+
+def generate_image_variants(product_image, force=False, using=DEFAULT_DB_ALIAS, data=None, rendered=None):
+    """
+    Hash the original of `product_image`, reuse the variants of an identical image when one
+    exists, otherwise render and store them. Returns the variants dict ({} when the file is
+    missing or not an image). `data`/`rendered` let callers pass work done elsewhere.
+    """
+    if not product_image.image:
+        return {}
+    try:
+        data = read_image(product_image) if data is None else data
+    except (FileNotFoundError, OSError) as e:
+        logger.warning(f"Cannot read original of ProductImage {product_image.pk}: {e}")
+        return {}
+    content_hash = compute_content_hash(data)
+    if not force and content_hash == product_image.content_hash and product_image.variants:
+        return product_image.variants
+
+    duplicate = find_duplicate(product_image, content_hash, using=using)
+    if duplicate is not None and not force:
+        store_variants(product_image, content_hash, duplicate.variants, image_name=duplicate.image.name, using=using)
+        return duplicate.variants
+
+    try:
+        rendered = render_variants(data) if rendered is None else rendered
+    except (UnidentifiedImageError, OSError, ValueError) as e:
+        logger.warning(f"Cannot render variants of ProductImage {product_image.pk}: {e}")
+        return {}
+    variants = save_variants(content_hash, rendered)
+    store_variants(product_image, content_hash, variants, using=using)
+    return variants
+
+
+def delete_unused_variants(content_hash, variants, using=DEFAULT_DB_ALIAS):
+    from .models import ProductImage
+
+    if not content_hash or ProductImage.objects.using(using).filter(content_hash=content_hash).exists():
+        return
+    for path in variants.values():
+        default_storage.delete(path)
+
+
+def variant_urls(product_image, request=None):
+    urls = {}
+    for name, path in (product_image.variants or {}).items():
+        url = default_storage.url(path)
+        urls[name] = request.build_absolute_uri(url) if request is not None else url
+    return urls
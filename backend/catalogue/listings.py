@@ -0,0 +1,90 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from .models import Category, Product, ProductListing
+
+# Maintenance of the ProductListing read model. Product-level changes (saves, image changes,
+# bulk imports) go through refresh_listings(); vendor and category renames are applied to
+# the listing rows directly with one UPDATE each.
+LISTING_BATCH_SIZE = 1000
+LISTING_UPDATE_FIELDS = [
+    'vendor', 'vendor_name', 'category', 'category_name', 'category_path', 'name', 'slug', 'sku',
+    'price', 'stock_quantity', 'is_active', 'image', 'thumbnail', 'created_at', 'updated_at',
+]
+
+
+def primary_image(product):
+    # Same choice as ProductSerializer.thumbnail: the primary image, else the first one.
+    images = sorted(product.images.all(), key=lambda image: (not image.is_primary, image.pk))
+    return images[0] if images else None
+
+
+def build_listing(product, now):
+    image = primary_image(product)
+    return ProductListing(
+        product_id=product.pk,
+        vendor_id=product.vendor_id,
+        vendor_name=product.vendor.company_name,
+        category_id=product.category_id,
+        category_name=product.category.name,
+        category_path=product.category.path,
+        name=product.name,
+        slug=product.slug,
+        sku=product.sku or '',
+        price=product.price,
+        stock_quantity=product.stock_quantity,
+        is_active=product.is_active,
+        image=image.image.name if image else '',
+        thumbnail=(image.variants or {}).get('thumbnail', '') if image else '',
+        created_at=product.created_at,
+        updated_at=now,
+    )
+
+
+def refresh_listings(product_ids, using=DEFAULT_DB_ALIAS, batch_size=LISTING_BATCH_SIZE):
+    """Upsert the listing rows of `product_ids` (and drop those of deleted products)."""
+    product_ids = list(product_ids)
+    now = timezone.now()
+    for start in range(0, len(product_ids), batch_size):
+        batch = product_ids[start:start + batch_size]
+        products = (
+            Product.objects.using(using).filter(id__in=batch)
+            .select_related('vendor', 'category').prefetch_related('images')
+        )
+        listings = [build_listing(product, now) for product in products]
+        with transaction.atomic(using=using):
+            ProductListing.objects.using(using).bulk_create(
+                listings, update_conflicts=True, unique_fields=['product'], update_fields=LISTING_UPDATE_FIELDS
+            )
+            missing = set(batch) - {listing.product_id for listing in listings}
+            if missing:
+                ProductListing.objects.using(using).filter(product_id__in=missing).delete()
+
+
+def rebuild_listings(using=DEFAULT_DB_ALIAS, batch_size=LISTING_BATCH_SIZE):
+    """Regenerate every listing row; returns the number of products processed."""
+    ids = list(Product.objects.using(using).order_by('id').values_list('id', flat=True))
+    refresh_listings(ids, using=using, batch_size=batch_size)
+    ProductListing.objects.using(using).exclude(product_id__in=Product.objects.using(using).values('id')).delete()
+    return len(ids)
+
+
+def update_vendor_listings(vendor, using=DEFAULT_DB_ALIAS):
+    ProductListing.objects.using(using).filter(vendor_id=vendor.pk).exclude(
+        vendor_name=vendor.company_name
+    ).update(vendor_name=vendor.company_name, updated_at=timezone.now())
+
+
+def update_category_paths(path, using=DEFAULT_DB_ALIAS):
+    # Moving a category re-roots the paths of its whole subtree (see Category._update_path).
+    subtree = Category.objects.using(using).filter(path__startswith=path).values('id')
+    current_path = Subquery(Category.objects.using(using).filter(pk=OuterRef('category_id')).values('path')[:1])
+    ProductListing.objects.using(using).filter(category_id__in=subtree).exclude(
+        category_path=current_path
+    ).update(category_path=current_path, updated_at=timezone.now())
+
+
+def update_category_listings(category, using=DEFAULT_DB_ALIAS):
+    ProductListing.objects.using(using).filter(category_id=category.pk).exclude(
+        category_name=category.name
+    ).update(category_name=category.name, updated_at=timezone.now())
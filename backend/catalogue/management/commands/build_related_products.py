@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from catalogue.related import (
+    build_related_products, RELATED_MAX_BASKET_SIZE, RELATED_MIN_CO_ORDERS, RELATED_TOP_K
+)
+
+class Command(BaseCommand):
+    help = 'Rebuilds the "frequently bought together" table (catalogue_relatedproduct) from order history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=RELATED_TOP_K, help='Related products kept per product.')
+        parser.add_argument('--min-co-orders', type=int, default=RELATED_MIN_CO_ORDERS, help='Orders two products must share.')
+        parser.add_argument('--max-basket-size', type=int, default=RELATED_MAX_BASKET_SIZE, help='Ignore orders with more distinct products.')
+
+    def handle(self, *args, **options):
+        self.stdout.write("Building frequently-bought-together table...")
+        started = time.monotonic()
+        rows = build_related_products(
+            top_k=options['top_k'], min_co_orders=options['min_co_orders'], max_basket_size=options['max_basket_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Wrote {rows} related product rows in {time.monotonic() - started:.1f}s.'))
@@ -0,0 +1,34 @@
+import sys
+from contextlib import nullcontext
+from django.core.management.base import BaseCommand
+from catalogue.models import Product
+from catalogue.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_products
+
+class Command(BaseCommand):
+    help = 'Streams the catalogue (products with images and attributes) to a CSV or JSONL file, optionally gzipped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file-format', choices=list(EXPORT_FORMATS), default='csv', help='Output format.')
+        parser.add_argument('--gzip', action='store_true', help='Gzip-compress the output.')
+        parser.add_argument('--output', help='Destination file (default: standard output).')
+        parser.add_argument('--vendor', type=int, help='Only export the products of this vendor id.')
+        parser.add_argument('--active-only', action='store_true', help='Skip inactive products.')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help='Products read per query.')
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.all()
+        if options['vendor']:
+            queryset = queryset.filter(vendor_id=options['vendor'])
+        if options['active_only']:
+            queryset = queryset.filter(is_active=True)
+
+        chunks = export_products(
+            queryset, options['file_format'], compress=options['gzip'], chunk_size=options['chunk_size']
+        )
+        written = 0
+        with open(options['output'], 'wb') if options['output'] else nullcontext(sys.stdout.buffer) as output:
+            for data in chunks:
+                output.write(data)
+                written += len(data)
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f"Exported catalogue to {options['output']} ({written} bytes)."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from catalogue.feeds import FEED_WRITERS, generate_feeds, index_path
+
+class Command(BaseCommand):
+    help = 'Writes the sitemap and merchant feeds of the active products (gzip shards + index) to MEDIA_ROOT, rewriting only changed shards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--feed', action='append', choices=list(FEED_WRITERS), help='Feed to generate (repeatable, default: all).')
+        parser.add_argument('--force', action='store_true', help='Rewrite every shard, changed or not.')
+
+    def handle(self, *args, **options):
+        results = generate_feeds(options['feed'], force=options['force'])
+        for feed, stats in results.items():
+            self.stdout.write(
+                f"{feed}: {stats['written']} shards written, {stats['unchanged']} unchanged, "
+                f"{stats['deleted']} deleted ({index_path(feed)})"
+            )
+        self.stdout.write(self.style.SUCCESS('Feeds are up to date.'))
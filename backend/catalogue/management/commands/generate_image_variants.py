@@ -0,0 +1,70 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from PIL import UnidentifiedImageError
+from catalogue.models import ProductImage
+from catalogue.images import compute_content_hash, generate_image_variants, read_image, render_variants
+
+
+def render_or_none(data):
+    # Runs in a worker process; a broken file must not take the whole pool down.
+    try:
+        return render_variants(data)
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Generates thumbnail, medium and WebP variants for product images, rendering in a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate variants for every image, not only the missing ones.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Number of rendering processes.')
+        parser.add_argument('--batch-size', type=int, default=200, help='Images read and rendered per batch.')
+
+    def handle(self, *args, **options):
+        queryset = ProductImage.objects.order_by('id')
+        if not options['force']:
+            queryset = queryset.filter(variants={})
+        ids = list(queryset.values_list('id', flat=True))
+        self.stdout.write(f"Generating variants for {len(ids)} images with {options['workers']} workers...")
+
+        done = reused = failed = 0
+        rendered_hashes = set()
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for start in range(0, len(ids), options['batch_size']):
+                batch = ProductImage.objects.filter(id__in=ids[start:start + options['batch_size']]).order_by('id')
+
+                # Read originals here (storage/DB stay in this process); render each distinct content once.
+                originals, to_render = [], {}
+                for product_image in batch:
+                    try:
+                        data = read_image(product_image)
+                    except OSError as e:
+                        failed += 1
+                        self.stdout.write(self.style.WARNING(f"Image {product_image.id}: cannot read {product_image.image.name} ({e})"))
+                        continue
+                    content_hash = compute_content_hash(data)
+                    originals.append((product_image, data, content_hash))
+                    if content_hash not in rendered_hashes:
+                        to_render.setdefault(content_hash, data)
+                hashes = list(to_render)
+                rendered = dict(zip(hashes, pool.map(render_or_none, [to_render[h] for h in hashes])))
+
+                for product_image, data, content_hash in originals:
+                    if content_hash in rendered_hashes:
+                        # Identical to an image handled earlier in this run: reuse its files.
+                        generate_image_variants(product_image, data=data)
+                        reused += 1
+                        continue
+                    if rendered.get(content_hash) is None:
+                        failed += 1
+                        self.stdout.write(self.style.WARNING(f"Image {product_image.id}: {product_image.image.name} is not a readable image"))
+                        continue
+                    generate_image_variants(product_image, force=options['force'], data=data, rendered=rendered[content_hash])
+                    rendered_hashes.add(content_hash)
+                    done += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully generated variants for {done} images ({reused} duplicates reused, {failed} failed).'
+        ))
@@ -0,0 +1,33 @@
+import csv
+from django.core.management.base import BaseCommand, CommandError
+from catalogue.fitment import FitmentLoader, FITMENT_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = (
+        'Bulk loads vehicle fitment data from a CSV file with the columns '
+        'sku, make, model, year_from, year_to (optional), engine (optional), notes (optional)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help='Path to the fitment CSV file.')
+        parser.add_argument('--batch-size', type=int, default=FITMENT_BATCH_SIZE, help='Rows processed per batch.')
+        parser.add_argument('--delimiter', default=',', help='CSV delimiter (default: ",").')
+
+    def handle(self, *args, **options):
+        loader = FitmentLoader(batch_size=options['batch_size'])
+        try:
+            with open(options['csv_path'], newline='', encoding='utf-8-sig') as csv_file:
+                reader = csv.DictReader(csv_file, delimiter=options['delimiter'])
+                missing = {'sku', 'make', 'model'} - set(reader.fieldnames or [])
+                if missing:
+                    raise CommandError(f"CSV missing required columns: {', '.join(sorted(missing))}")
+                self.stdout.write(f"Loading fitment data from {options['csv_path']}...")
+                loaded = loader.load(reader)
+        except OSError as e:
+            raise CommandError(f"Could not read {options['csv_path']}: {e}")
+
+        for error in loader.errors[:20]:
+            self.stdout.write(self.style.WARNING(f"Row {error['row']}: {error['error']}"))
+        if len(loader.errors) > 20:
+            self.stdout.write(self.style.WARNING(f"... and {len(loader.errors) - 20} more errors."))
+        self.stdout.write(self.style.SUCCESS(f'Successfully loaded {loaded} fitments ({loader.skipped} already present, {len(loader.errors)} rows rejected).'))
@@ -2,6 +2,8 @@ from django.core.management.base import BaseCommand
 from django.utils.text import slugify
 from faker import Faker
 from catalogue.models import Category, Product, ProductImage
+from catalogue.signals import products_bulk_changed
+from catalogue.tree import rebuild_category_paths
 from vendors.models import Vendor
 import random
 
@@ -33,17 +35,21 @@ class Command(BaseCommand):
         Category.objects.bulk_create(categories_to_create)
         self.stdout.write(self.style.SUCCESS(f'Successfully created {Category.objects.count()} base categories.'))
 
-        # Assign parent categories randomly for some
+        # Assign parent categories randomly for some.
+        # A category may only pick a parent that comes earlier in a shuffled order, so no cycles can form.
         all_categories = list(Category.objects.all())
         if len(all_categories) > 1:
-            for category in all_categories:
+            random.shuffle(all_categories)
+            categories_with_parent = []
+            for index, category in enumerate(all_categories[1:], start=1):
                 if random.random() < 0.3: # 30% chance to have a parent
-                    possible_parents = [p for p in all_categories if p.id != category.id]
-                    if possible_parents:
-                        category.parent = random.choice(possible_parents)
-                        category.save()
+                    category.parent = random.choice(all_categories[:index])
+                    categories_with_parent.append(category)
+            Category.objects.bulk_update(categories_with_parent, ['parent'])
             self.stdout.write(self.style.SUCCESS('Assigned parent categories for some categories.'))
 
+        # bulk_create/bulk_update skip Category.save(), so compute the materialized paths here
+        rebuild_category_paths()
 
         self.stdout.write("Creating products...")
         all_vendors = list(Vendor.objects.filter(status='active'))
@@ -108,6 +114,9 @@ class Command(BaseCommand):
             Product.objects.bulk_create(batch, ignore_conflicts=True) # ignore_conflicts for slugs/skus if uniqueness check above fails
             self.stdout.write(f"Created batch of {len(batch)} products...")
 
+        # bulk_create skips post_save, so let the search index (and other listeners) catch up
+        products_bulk_changed.send(sender=Product, product_ids=list(Product.objects.values_list('id', flat=True)))
+
         total_products_created = Product.objects.count()
         self.stdout.write(self.style.SUCCESS(f'Successfully created {total_products_created} products.'))
 
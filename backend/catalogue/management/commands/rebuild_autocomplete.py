@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from catalogue.autocomplete import rebuild_index, AUTOCOMPLETE_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Regenerates the autocomplete prefix index (catalogue_autocompleteterm) from the catalogue and orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=AUTOCOMPLETE_BATCH_SIZE, help='Products processed per batch.')
+
+    def handle(self, *args, **options):
+        self.stdout.write("Rebuilding autocomplete index...")
+        count = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt autocomplete index: {count} terms.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from catalogue.listings import rebuild_listings, LISTING_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Regenerates the denormalized product listing table (catalogue_productlisting) from the catalogue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=LISTING_BATCH_SIZE, help='Products processed per batch.')
+
+    def handle(self, *args, **options):
+        self.stdout.write("Rebuilding product listings...")
+        count = rebuild_listings(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt listings for {count} products.'))
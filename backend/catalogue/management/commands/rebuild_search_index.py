@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from catalogue.search import get_search_backend, INDEX_BATCH_SIZE
+
+class Command(BaseCommand):
+    help = 'Rebuilds the product full-text search index from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=INDEX_BATCH_SIZE, help='Number of products indexed per batch.')
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        self.stdout.write(f"Rebuilding product search index with {backend.__class__.__name__}...")
+        indexed = backend.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully indexed {indexed} products.'))
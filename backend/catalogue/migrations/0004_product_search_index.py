@@ -0,0 +1,71 @@
+from django.db import migrations
+
+# Creates the full-text index used by catalogue.search. The index is database specific,
+# so nothing here is reflected in the model state.
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS catalogue_product_fts USING fts5("
+    "name, description, tokenize = 'unicode61 remove_diacritics 2')",
+]
+SQLITE_DROP = [
+    "DROP TABLE IF EXISTS catalogue_product_fts",
+]
+
+POSTGRESQL_CREATE = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'fr_unaccent') THEN
+            CREATE TEXT SEARCH CONFIGURATION fr_unaccent (COPY = french);
+            ALTER TEXT SEARCH CONFIGURATION fr_unaccent
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem;
+        END IF;
+    END
+    $$
+    """,
+    "ALTER TABLE catalogue_product ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE INDEX IF NOT EXISTS catalogue_product_search_vector_gin ON catalogue_product USING gin (search_vector)",
+    "UPDATE catalogue_product SET search_vector = "
+    "setweight(to_tsvector('fr_unaccent', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('fr_unaccent', coalesce(description, '')), 'B')",
+]
+POSTGRESQL_DROP = [
+    "DROP INDEX IF EXISTS catalogue_product_search_vector_gin",
+    "ALTER TABLE catalogue_product DROP COLUMN IF EXISTS search_vector",
+    "DROP TEXT SEARCH CONFIGURATION IF EXISTS fr_unaccent",
+]
+
+
+def _run(schema_editor, statements_by_vendor):
+    for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement, params=None)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_CREATE, 'postgresql': POSTGRESQL_CREATE})
+    if schema_editor.connection.vendor == 'sqlite':
+        # The FTS5 table stores stemmed text produced in Python, so fill it the same way.
+        from catalogue.search import normalize_text
+        Product = apps.get_model('catalogue', 'Product')
+        rows = Product.objects.using(schema_editor.connection.alias).values_list('id', 'name', 'description')
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO catalogue_product_fts (rowid, name, description) VALUES (%s, %s, %s)",
+                [(pk, normalize_text(name), normalize_text(description)) for pk, name, description in rows]
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_DROP, 'postgresql': POSTGRESQL_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0003_product_dimensions_product_sku_product_weight_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
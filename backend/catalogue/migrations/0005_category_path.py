@@ -0,0 +1,40 @@
+# Generated by Django 5.0 on 2026-10-17 00:14
+
+from django.db import migrations, models
+
+
+def fill_category_paths(apps, schema_editor):
+    Category = apps.get_model('catalogue', 'Category')
+    categories = list(Category.objects.only('id', 'parent_id'))
+    children = {}
+    for category in categories:
+        children.setdefault(category.parent_id, []).append(category)
+    stack = [(c, '/') for c in children.get(None, [])]
+    while stack:
+        category, parent_path = stack.pop()
+        category.path = f'{parent_path}{category.pk}/'
+        category.depth = category.path.count('/') - 2
+        stack.extend((child, category.path) for child in children.get(category.pk, []))
+    # Categories caught in a parent cycle are unreachable from a root and keep an empty path.
+    Category.objects.bulk_update(categories, ['path', 'depth'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0004_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_category_paths, migrations.RunPython.noop),
+    ]
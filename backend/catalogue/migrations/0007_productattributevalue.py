@@ -0,0 +1,46 @@
+# Generated by Django 5.0 on 2026-10-17 00:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def index_existing_attributes(apps, schema_editor):
+    from catalogue.attributes import flatten_attributes
+    Product = apps.get_model('catalogue', 'Product')
+    ProductAttributeValue = apps.get_model('catalogue', 'ProductAttributeValue')
+    rows = []
+    for pk, attributes in Product.objects.values_list('id', 'attributes').iterator(chunk_size=2000):
+        rows.extend(ProductAttributeValue(product_id=pk, key=key, value=value) for key, value in flatten_attributes(attributes))
+        if len(rows) >= 2000:
+            ProductAttributeValue.objects.bulk_create(rows)
+            rows = []
+    ProductAttributeValue.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0006_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductAttributeValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('value', models.CharField(max_length=255)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attribute_values', to='catalogue.product')),
+            ],
+            options={
+                'verbose_name': "Valeur d'attribut",
+                'verbose_name_plural': "Valeurs d'attributs",
+                'indexes': [models.Index(fields=['key', 'value', 'product'], name='attribute_key_value_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='productattributevalue',
+            constraint=models.UniqueConstraint(fields=('product', 'key', 'value'), name='unique_product_attribute_value'),
+        ),
+        migrations.RunPython(index_existing_attributes, migrations.RunPython.noop),
+    ]
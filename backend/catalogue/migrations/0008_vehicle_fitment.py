@@ -0,0 +1,84 @@
+# Generated by Django 5.0 on 2026-10-17 00:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0007_productattributevalue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Vehicle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('engine', models.CharField(blank=True, default='', max_length=100)),
+            ],
+            options={
+                'verbose_name': 'Véhicule',
+                'verbose_name_plural': 'Véhicules',
+                'ordering': ['model', 'year', 'engine'],
+            },
+        ),
+        migrations.CreateModel(
+            name='VehicleMake',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Marque véhicule',
+                'verbose_name_plural': 'Marques véhicules',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductFitment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notes', models.CharField(blank=True, default='', max_length=255)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fitments', to='catalogue.product')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fitments', to='catalogue.vehicle')),
+            ],
+            options={
+                'verbose_name': 'Compatibilité',
+                'verbose_name_plural': 'Compatibilités',
+            },
+        ),
+        migrations.CreateModel(
+            name='VehicleModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100)),
+                ('make', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vehicle_models', to='catalogue.vehiclemake')),
+            ],
+            options={
+                'verbose_name': 'Modèle véhicule',
+                'verbose_name_plural': 'Modèles véhicules',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='model',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vehicles', to='catalogue.vehiclemodel'),
+        ),
+        migrations.AddConstraint(
+            model_name='productfitment',
+            constraint=models.UniqueConstraint(fields=('vehicle', 'product'), name='unique_product_fitment'),
+        ),
+        migrations.AddConstraint(
+            model_name='vehiclemodel',
+            constraint=models.UniqueConstraint(fields=('make', 'slug'), name='unique_vehicle_model_per_make'),
+        ),
+        migrations.AddConstraint(
+            model_name='vehicle',
+            constraint=models.UniqueConstraint(fields=('model', 'year', 'engine'), name='unique_vehicle'),
+        ),
+    ]
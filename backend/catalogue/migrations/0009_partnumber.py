@@ -0,0 +1,50 @@
+# Generated by Django 5.0 on 2026-10-17 00:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def index_existing_skus(apps, schema_editor):
+    from catalogue.partnumbers import normalize_part_number
+    Product = apps.get_model('catalogue', 'Product')
+    PartNumber = apps.get_model('catalogue', 'PartNumber')
+    rows = []
+    for pk, sku in Product.objects.filter(sku__isnull=False).values_list('id', 'sku').iterator(chunk_size=2000):
+        normalized = normalize_part_number(sku)
+        if normalized:
+            rows.append(PartNumber(product_id=pk, number=sku, normalized=normalized, kind='sku'))
+        if len(rows) >= 2000:
+            PartNumber.objects.bulk_create(rows, ignore_conflicts=True)
+            rows = []
+    PartNumber.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0008_vehicle_fitment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PartNumber',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.CharField(max_length=100)),
+                ('normalized', models.CharField(editable=False, max_length=100)),
+                ('kind', models.CharField(choices=[('oem', 'OEM'), ('aftermarket', 'Adaptable'), ('sku', 'Référence vendeur')], default='oem', max_length=20)),
+                ('brand', models.CharField(blank=True, default='', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='part_numbers', to='catalogue.product')),
+            ],
+            options={
+                'verbose_name': 'Référence pièce',
+                'verbose_name_plural': 'Références pièces',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='partnumber',
+            constraint=models.UniqueConstraint(fields=('normalized', 'product'), name='unique_part_number_per_product'),
+        ),
+        migrations.RunPython(index_existing_skus, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.0 on 2026-10-17 00:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def build_existing_listings(apps, schema_editor):
+    Product = apps.get_model('catalogue', 'Product')
+    ProductListing = apps.get_model('catalogue', 'ProductListing')
+    now = timezone.now()
+    ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(ids), 1000):
+        listings = []
+        for product in Product.objects.filter(id__in=ids[start:start + 1000]).select_related('vendor', 'category').prefetch_related('images'):
+            images = sorted(product.images.all(), key=lambda image: (not image.is_primary, image.pk))
+            image = images[0] if images else None
+            listings.append(ProductListing(
+                product_id=product.pk, vendor_id=product.vendor_id, vendor_name=product.vendor.company_name,
+                category_id=product.category_id, category_name=product.category.name, category_path=product.category.path,
+                name=product.name, slug=product.slug, sku=product.sku or '', price=product.price,
+                stock_quantity=product.stock_quantity, is_active=product.is_active,
+                image=image.image.name if image else '', thumbnail=(image.variants or {}).get('thumbnail', '') if image else '',
+                created_at=product.created_at, updated_at=now,
+            ))
+        ProductListing.objects.bulk_create(listings)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0010_productimage_variants'),
+        ('vendors', '0002_vendor_address_vendor_contact_email_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductListing',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='catalogue.product')),
+                ('vendor_name', models.CharField(max_length=255)),
+                ('category_name', models.CharField(max_length=255)),
+                ('category_path', models.CharField(blank=True, default='', max_length=255)),
+                ('name', models.CharField(max_length=255)),
+                ('slug', models.SlugField()),
+                ('sku', models.CharField(blank=True, default='', max_length=100)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('stock_quantity', models.PositiveIntegerField()),
+                ('is_active', models.BooleanField(default=True)),
+                ('image', models.CharField(blank=True, default='', max_length=255)),
+                ('thumbnail', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalogue.category')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='vendors.vendor')),
+            ],
+            options={
+                'verbose_name': 'Fiche catalogue',
+                'verbose_name_plural': 'Fiches catalogue',
+                'indexes': [models.Index(fields=['is_active', 'created_at', 'product'], name='listing_active_created_idx'), models.Index(fields=['is_active', 'category_path'], name='listing_active_category_idx'), models.Index(fields=['is_active', 'price'], name='listing_active_price_idx')],
+            },
+        ),
+        migrations.RunPython(build_existing_listings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.0 on 2026-10-17 00:34
+
+from django.db import migrations, models
+from django.db.models import Count
+
+def build_autocomplete_terms(apps, schema_editor):
+    from catalogue.autocomplete import compact_term, label_terms
+
+    Product = apps.get_model('catalogue', 'Product')
+    Category = apps.get_model('catalogue', 'Category')
+    Vendor = apps.get_model('vendors', 'Vendor')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    AutocompleteTerm = apps.get_model('catalogue', 'AutocompleteTerm')
+
+    def popularity(field):
+        return dict(OrderItem.objects.values(field).annotate(orders=Count('order', distinct=True)).values_list(field, 'orders'))
+
+    product_orders, category_orders, vendor_orders = (
+        popularity('product_id'), popularity('product__category_id'), popularity('product__vendor_id')
+    )
+    terms = []
+    for product in Product.objects.filter(is_active=True).only('id', 'name', 'slug', 'sku').iterator():
+        common = {'object_id': product.pk, 'label': product.name, 'slug': product.slug, 'popularity': product_orders.get(product.pk, 0)}
+        terms.extend(AutocompleteTerm(term=term, kind='product', **common) for term in label_terms(product.name))
+        if compact_term(product.sku):
+            terms.append(AutocompleteTerm(term=compact_term(product.sku)[:100], kind='sku', **common))
+    for category in Category.objects.all():
+        terms.extend(
+            AutocompleteTerm(term=term, kind='category', object_id=category.pk, label=category.name,
+                             slug=category.slug, popularity=category_orders.get(category.pk, 0))
+            for term in label_terms(category.name)
+        )
+    for vendor in Vendor.objects.filter(status='active'):
+        terms.extend(
+            AutocompleteTerm(term=term, kind='vendor', object_id=vendor.pk, label=vendor.company_name,
+                             popularity=vendor_orders.get(vendor.pk, 0))
+            for term in label_terms(vendor.company_name)
+        )
+    AutocompleteTerm.objects.bulk_create(terms, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0011_productlisting'),
+        ('orders', '0004_keyset_pagination_indexes'),
+        ('vendors', '0002_vendor_address_vendor_contact_email_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutocompleteTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100)),
+                ('kind', models.CharField(choices=[('product', 'Produit'), ('sku', 'Référence'), ('category', 'Catégorie'), ('vendor', 'Vendeur')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('label', models.CharField(max_length=255)),
+                ('slug', models.CharField(blank=True, default='', max_length=255)),
+                ('popularity', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': "Terme d'autocomplétion",
+                'verbose_name_plural': "Termes d'autocomplétion",
+                'indexes': [models.Index(fields=['term', 'popularity'], name='autocomplete_term_idx'), models.Index(fields=['kind', 'object_id'], name='autocomplete_object_idx')],
+            },
+        ),
+        migrations.RunPython(build_autocomplete_terms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0 on 2026-10-17 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0012_autocompleteterm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feed', models.CharField(choices=[('sitemap', 'Sitemap'), ('merchant_xml', 'Flux marchand (XML)'), ('merchant_csv', 'Flux marchand (CSV)')], max_length=20)),
+                ('number', models.PositiveIntegerField()),
+                ('file', models.CharField(max_length=255)),
+                ('watermark', models.DateTimeField()),
+                ('product_count', models.PositiveIntegerField()),
+                ('generated_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Fichier de flux',
+                'verbose_name_plural': 'Fichiers de flux',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='feedshard',
+            constraint=models.UniqueConstraint(fields=('feed', 'number'), name='unique_feed_shard'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0 on 2026-10-17 00:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0014_relatedproduct'),
+        ('vendors', '0002_vendor_address_vendor_contact_email_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='productlisting',
+            name='listing_active_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='productlisting',
+            name='listing_active_category_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='productlisting',
+            name='listing_active_price_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at', 'id'], name='product_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['vendor', 'is_active', 'created_at'], name='product_vendor_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at', 'product'], name='listing_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category_path'], name='listing_active_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['price'], name='listing_active_price_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0 on 2026-10-17 01:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0015_hot_query_indexes'),
+        ('vendors', '0002_vendor_address_vendor_contact_email_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='productlisting',
+            name='listing_active_category_idx',
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category_path'], name='listing_active_category_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0 on 2026-10-17 01:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0016_listing_category_pattern_index'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='partnumber',
+            name='unique_part_number_per_product',
+        ),
+        migrations.RemoveIndex(
+            model_name='autocompleteterm',
+            name='autocomplete_term_idx',
+        ),
+        migrations.AddIndex(
+            model_name='autocompleteterm',
+            index=models.Index(fields=['term', 'popularity'], name='autocomplete_term_idx', opclasses=['varchar_pattern_ops', 'int4_ops']),
+        ),
+        migrations.AddConstraint(
+            model_name='partnumber',
+            constraint=models.UniqueConstraint(fields=('normalized', 'product'), name='unique_part_number_per_product', opclasses=['varchar_pattern_ops', 'int8_ops']),
+        ),
+    ]
@@ -1,4 +1,7 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 from vendors.models import Vendor
 
 class Category(models.Model):
@@ -7,6 +10,10 @@ class Category(models.Model):
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='categories/', blank=True)
+    # Materialized path of ancestor ids, e.g. "/3/17/42/" for category 42 under 17 under 3.
+    # Maintained by save(); lets a whole (sub)tree be loaded with a single prefix query.
+    path = models.CharField(max_length=255, blank=True, default='', db_index=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -14,6 +21,42 @@ class Category(models.Model):
         verbose_name = 'Catégorie'
         verbose_name_plural = 'Catégories'
 
+    def __str__(self):
+        return self.name
+
+    def is_descendant_of(self, other):
+        return bool(other.path) and self.path.startswith(other.path)
+
+    def clean(self):
+        if self.parent_id and self.pk and (self.parent_id == self.pk or self.parent.is_descendant_of(self)):
+            raise ValidationError({'parent': 'A category cannot be moved under itself or one of its descendants.'})
+
+    def save(self, *args, **kwargs):
+        if self.parent_id and self.pk and (self.parent_id == self.pk or self.parent.is_descendant_of(self)):
+            raise ValueError('A category cannot be moved under itself or one of its descendants.')
+        super().save(*args, **kwargs)
+        self._update_path()
+
+    def _update_path(self):
+        old_path = self.path
+        if self.parent_id and not self.parent.path: # Parent was bulk-created without a path
+            self.parent._update_path()
+        parent_path = self.parent.path if self.parent_id else '/'
+        new_path = f'{parent_path}{self.pk}/'
+        new_depth = new_path.count('/') - 2
+        if new_path == old_path:
+            return
+        Category.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+        if old_path:
+            # Re-root the whole subtree in one statement.
+            Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+                depth=F('depth') + (new_depth - self.depth),
+            )
+        self.path, self.depth = new_path, new_depth
+        from .signals import category_path_changed
+        category_path_changed.send(sender=Category, instance=self, old_path=old_path, new_path=new_path, using=self._state.db)
+
 class Product(models.Model):
     vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='products')
     category = models.ForeignKey(Category, on_delete=models.PROTECT, related_name='products')
@@ -33,14 +76,261 @@ class Product(models.Model):
     class Meta:
         verbose_name = 'Produit'
         verbose_name_plural = 'Produits'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='product_created_id_idx'), # Keyset pagination
+            # What buyers page through (is_active=True): partial, so it only holds active rows
+            models.Index(fields=['created_at', 'id'], condition=models.Q(is_active=True), name='product_active_created_idx'),
+            models.Index(fields=['vendor', 'is_active', 'created_at'], name='product_vendor_active_idx'), # Vendor back office
+        ]
 
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='products/')
     alt_text = models.CharField(max_length=255, blank=True, null=True)
     is_primary = models.BooleanField(default=False)
+    # Filled in asynchronously by catalogue.images: sha256 of the original and the storage
+    # paths of its derivatives ({'thumbnail': ..., 'medium': ..., 'webp': ...}).
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True, editable=False)
+    variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = 'Image produit'
-        verbose_name_plural = 'Images produits'
\ No newline at end of file
+        verbose_name_plural = 'Images produits'
+
+class ProductAttributeValue(models.Model):
+    # Normalized copy of Product.attributes (one row per key/value pair), maintained by
+    # catalogue.attributes so attribute filters and facet counts never have to parse JSON.
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='attribute_values')
+    key = models.CharField(max_length=100)
+    value = models.CharField(max_length=255)
+
+    class Meta:
+        verbose_name = 'Valeur d\'attribut'
+        verbose_name_plural = 'Valeurs d\'attributs'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'key', 'value'], name='unique_product_attribute_value'),
+        ]
+        indexes = [
+            models.Index(fields=['key', 'value', 'product'], name='attribute_key_value_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key}={self.value}"
+
+
+class VehicleMake(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    slug = models.SlugField(max_length=100, unique=True)
+
+    class Meta:
+        verbose_name = 'Marque véhicule'
+        verbose_name_plural = 'Marques véhicules'
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class VehicleModel(models.Model):
+    make = models.ForeignKey(VehicleMake, on_delete=models.CASCADE, related_name='vehicle_models')
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100)
+
+    class Meta:
+        verbose_name = 'Modèle véhicule'
+        verbose_name_plural = 'Modèles véhicules'
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['make', 'slug'], name='unique_vehicle_model_per_make'),
+        ]
+
+    def __str__(self):
+        return f"{self.make.name} {self.name}"
+
+
+class Vehicle(models.Model):
+    # One row per model, model year and engine: the unit parts are declared compatible with.
+    model = models.ForeignKey(VehicleModel, on_delete=models.CASCADE, related_name='vehicles')
+    year = models.PositiveSmallIntegerField()
+    engine = models.CharField(max_length=100, blank=True, default='')
+
+    class Meta:
+        verbose_name = 'Véhicule'
+        verbose_name_plural = 'Véhicules'
+        ordering = ['model', 'year', 'engine']
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'year', 'engine'], name='unique_vehicle'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.year} {self.engine}".strip()
+
+
+class ProductFitment(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='fitments')
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='fitments')
+    notes = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        verbose_name = 'Compatibilité'
+        verbose_name_plural = 'Compatibilités'
+        constraints = [
+            # Also the index behind "which parts fit this vehicle": (vehicle) -> product ids
+            models.UniqueConstraint(fields=['vehicle', 'product'], name='unique_product_fitment'),
+        ]
+
+
+class PartNumber(models.Model):
+    # Cross-reference of OEM / aftermarket reference numbers to products. `normalized`
+    # (see catalogue.partnumbers.normalize_part_number) is what lookups run against.
+    KIND_CHOICES = (
+        ('oem', 'OEM'),
+        ('aftermarket', 'Adaptable'),
+        ('sku', 'Référence vendeur'),
+    )
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='part_numbers')
+    number = models.CharField(max_length=100)
+    normalized = models.CharField(max_length=100, editable=False)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='oem')
+    brand = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Référence pièce'
+        verbose_name_plural = 'Références pièces'
+        constraints = [
+            # Leading column `normalized` also serves exact and prefix (LIKE 'X%') lookups; the
+            # pattern ops (PostgreSQL only, ignored elsewhere) make the latter collation independent.
+            models.UniqueConstraint(
+                fields=['normalized', 'product'], opclasses=['varchar_pattern_ops', 'int8_ops'],
+                name='unique_part_number_per_product'
+            ),
+        ]
+
+    def __str__(self):
+        return self.number
+
+    def save(self, *args, **kwargs):
+        from .partnumbers import normalize_part_number
+        self.normalized = normalize_part_number(self.number)
+        super().save(*args, **kwargs)
+
+
+class ProductListing(models.Model):
+    # Flat read model of a product for public listings, maintained by catalogue.listings
+    # (signals, bulk imports, rebuild_product_listings) so listing pages never join
+    # vendor, category or images. `image`/`thumbnail` are storage paths of the primary image.
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='listing')
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='+')
+    vendor_name = models.CharField(max_length=255)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    category_name = models.CharField(max_length=255)
+    category_path = models.CharField(max_length=255, blank=True, default='')
+    name = models.CharField(max_length=255)
+    slug = models.SlugField()
+    sku = models.CharField(max_length=100, blank=True, default='')
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    stock_quantity = models.PositiveIntegerField()
+    is_active = models.BooleanField(default=True)
+    image = models.CharField(max_length=255, blank=True, default='')
+    thumbnail = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField() # Product.created_at
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Fiche catalogue'
+        verbose_name_plural = 'Fiches catalogue'
+        indexes = [
+            # Partial indexes over the active rows: `WHERE is_active` alone is not an equality
+            # some planners (SQLite) can match against a leading is_active column.
+            models.Index(fields=['created_at', 'product'], condition=models.Q(is_active=True), name='listing_active_created_idx'),
+            # Pattern ops (PostgreSQL only, ignored elsewhere) so LIKE 'path%' can use the index
+            # whatever the database collation.
+            models.Index(
+                fields=['category_path'], condition=models.Q(is_active=True), opclasses=['varchar_pattern_ops'],
+                name='listing_active_category_idx'
+            ),
+            models.Index(fields=['price'], condition=models.Q(is_active=True), name='listing_active_price_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class AutocompleteTerm(models.Model):
+    # Prefix index behind the autocomplete endpoint (see catalogue.autocomplete): one row per
+    # searchable word suffix of a product name, SKU, category or vendor name. `term` is
+    # accent-folded and lower-cased so a typed prefix becomes an index prefix scan.
+    KIND_CHOICES = (
+        ('product', 'Produit'),
+        ('sku', 'Référence'),
+        ('category', 'Catégorie'),
+        ('vendor', 'Vendeur'),
+    )
+
+    term = models.CharField(max_length=100)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    label = models.CharField(max_length=255)
+    slug = models.CharField(max_length=255, blank=True, default='')
+    popularity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Terme d\'autocomplétion'
+        verbose_name_plural = 'Termes d\'autocomplétion'
+        indexes = [
+            # Pattern ops (PostgreSQL only) so LIKE 'prefix%' uses the index whatever the collation.
+            models.Index(fields=['term', 'popularity'], opclasses=['varchar_pattern_ops', 'int4_ops'], name='autocomplete_term_idx'),
+            models.Index(fields=['kind', 'object_id'], name='autocomplete_object_idx'),
+        ]
+
+    def __str__(self):
+        return self.term
+
+
+class FeedShard(models.Model):
+    # One generated file of a product feed (see catalogue.feeds). Shard `number` holds the
+    # active products with number * FEED_SHARD_SIZE <= id < (number + 1) * FEED_SHARD_SIZE;
+    # `watermark` (latest updated_at of those products, their vendors and categories) and
+    # `product_count` are what the file was generated from, so unchanged shards are skipped.
+    FEED_CHOICES = (
+        ('sitemap', 'Sitemap'),
+        ('merchant_xml', 'Flux marchand (XML)'),
+        ('merchant_csv', 'Flux marchand (CSV)'),
+    )
+
+    feed = models.CharField(max_length=20, choices=FEED_CHOICES)
+    number = models.PositiveIntegerField()
+    file = models.CharField(max_length=255)
+    watermark = models.DateTimeField()
+    product_count = models.PositiveIntegerField()
+    generated_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Fichier de flux'
+        verbose_name_plural = 'Fichiers de flux'
+        constraints = [
+            models.UniqueConstraint(fields=['feed', 'number'], name='unique_feed_shard'),
+        ]
+
+    def __str__(self):
+        return self.file
+
+
+class RelatedProduct(models.Model):
+    # "Frequently bought together": the top products ordered with `product`, rebuilt
+    # offline from order history by catalogue.related. Read with a single lookup on the
+    # (product, rank) index.
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_products')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    co_orders = models.PositiveIntegerField(help_text="Number of orders containing both products")
+
+    class Meta:
+        verbose_name = 'Produit associé'
+        verbose_name_plural = 'Produits associés'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='unique_related_product_rank'),
+        ]
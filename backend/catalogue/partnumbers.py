@@ -0,0 +1,109 @@
+import re
+import unicodedata
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+PART_NUMBER_BATCH_SIZE = 2000
+
+_NON_ALPHANUMERIC_RE = re.compile(r'[^0-9A-Z]')
+
+
+def normalize_part_number(number):
+    """
+    Canonical form of a part number: accents dropped, upper-cased, every separator
+    removed and leading zeros stripped, so " 0 986-494.123 " and "986494123" compare equal.
+    """
+    number = unicodedata.normalize('NFKD', str(number or ''))
+    number = ''.join(c for c in number if not unicodedata.combining(c)).upper()
+    number = _NON_ALPHANUMERIC_RE.sub('', number)
+    return number.lstrip('0') or number[:1]
+
+
+def lookup_part_numbers(queryset, query, prefix=False):
+    """Filter a PartNumber queryset on a raw user query, exactly or by prefix, using the index."""
+    normalized = normalize_part_number(query)
+    if not normalized:
+        return queryset.none()
+    if prefix:
+        # LIKE 'X%', served on PostgreSQL by the varchar_pattern_ops unique index whatever the collation.
+        return queryset.filter(normalized__startswith=normalized)
+    return queryset.filter(normalized=normalized)
+
+
+def load_part_numbers(rows, using=DEFAULT_DB_ALIAS, batch_size=PART_NUMBER_BATCH_SIZE):
+    """
+    Bulk load cross references from dict rows with the keys sku, number, kind (optional,
+    default 'oem') and brand (optional). Returns (inserted_count, skipped_count, errors) where
+    errors is a list of {'row': n, 'error': message}; existing (number, product) pairs are skipped.
+    """
+    from .models import PartNumber, Product
+
+    valid_kinds = {choice[0] for choice in PartNumber.KIND_CHOICES}
+    inserted, skipped, errors, batch = 0, 0, [], []
+
+    def flush(batch):
+        skus = {row['sku'] for _, row in batch}
+        products = dict(Product.objects.using(using).filter(sku__in=skus).values_list('sku', 'id'))
+        part_numbers = []
+        for line_number, row in batch:
+            if row['sku'] not in products:
+                errors.append({'row': line_number, 'error': f"Unknown SKU {row['sku']}."})
+                continue
+            part_numbers.append(PartNumber(
+                product_id=products[row['sku']], number=row['number'], normalized=row['normalized'],
+                kind=row['kind'], brand=row['brand'],
+            ))
+        # ignore_conflicts does not say which rows were skipped, so the pairs already present
+        # (or repeated in the batch) are left out up front with one query.
+        seen = set(
+            PartNumber.objects.using(using)
+            .filter(normalized__in={p.normalized for p in part_numbers}, product_id__in={p.product_id for p in part_numbers})
+            .values_list('normalized', 'product_id')
+        )
+        new = []
+        for part_number in part_numbers:
+            if (part_number.normalized, part_number.product_id) not in seen:
+                seen.add((part_number.normalized, part_number.product_id))
+                new.append(part_number)
+        with transaction.atomic(using=using):
+            PartNumber.objects.using(using).bulk_create(new, batch_size=1000, ignore_conflicts=True)
+        return len(new), len(part_numbers) - len(new)
+
+    for line_number, row in enumerate(rows, start=2): # Line 1 is the header
+        sku = str(row.get('sku') or '').strip()
+        number = str(row.get('number') or '').strip()[:100]
+        kind = str(row.get('kind') or 'oem').strip().lower()
+        if not sku or not number:
+            errors.append({'row': line_number, 'error': 'sku and number are required.'})
+            continue
+        if kind not in valid_kinds:
+            errors.append({'row': line_number, 'error': f'Invalid kind {kind}. Valid kinds: {", ".join(sorted(valid_kinds))}.'})
+            continue
+        batch.append((line_number, {
+            'sku': sku, 'number': number, 'normalized': normalize_part_number(number),
+            'kind': kind, 'brand': str(row.get('brand') or '').strip()[:100],
+        }))
+        if len(batch) >= batch_size:
+            added, repeated = flush(batch)
+            inserted, skipped = inserted + added, skipped + repeated
+            batch = []
+    if batch:
+        added, repeated = flush(batch)
+        inserted, skipped = inserted + added, skipped + repeated
+    return inserted, skipped, errors
+
+
+def sync_sku_part_numbers(product_ids, using=DEFAULT_DB_ALIAS):
+    """Keep one 'sku' cross reference per product, mirroring Product.sku."""
+    from .models import PartNumber, Product
+
+    product_ids = list(product_ids)
+    for start in range(0, len(product_ids), PART_NUMBER_BATCH_SIZE):
+        batch = product_ids[start:start + PART_NUMBER_BATCH_SIZE]
+        rows = [
+            PartNumber(product_id=pk, number=sku, normalized=normalize_part_number(sku), kind='sku')
+            for pk, sku in Product.objects.using(using).filter(id__in=batch, sku__isnull=False).values_list('id', 'sku')
+            if normalize_part_number(sku)
+        ]
+        with transaction.atomic(using=using):
+            PartNumber.objects.using(using).filter(product_id__in=batch, kind='sku').delete()
+            PartNumber.objects.using(using).bulk_create(rows, ignore_conflicts=True)
@@ -0,0 +1,173 @@
+import numpy as np
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Max
+from django.utils import timezone
+from .detail_cache import invalidate_products
+from .models import Product, RelatedProduct
+
+# "Frequently bought together", computed offline from OrderItem history.
+# The (order, product) pairs are loaded into NumPy arrays, products are renumbered 0..P-1,
+# and every pair of distinct products sharing an order is encoded as one int64
+# (a * P + b); np.unique(return_counts=True) then gives the sparse co-occurrence matrix
+# in COO form. A lexsort by (product, -count, related) and a rank-within-group computed
+# from the group starts keep the top K per product, all without Python-level loops over
+# order items. Very large baskets (bulk/B2B orders) would add P^2 noise and are skipped.
+# The time of the last rebuild is kept in the cache: it is part of the product detail
+# validators, together with the latest change of the related products' listing rows.
+RELATED_TOP_K = 10
+RELATED_MIN_CO_ORDERS = 1
+RELATED_MAX_BASKET_SIZE = 50
+RELATED_FETCH_SIZE = 100000
+RELATED_BATCH_SIZE = 5000
+RELATED_VERSION_CACHE_KEY = 'catalogue:related-products:version'
+
+
+def load_order_pairs(using=DEFAULT_DB_ALIAS, fetch_size=RELATED_FETCH_SIZE):
+    """(order_ids, product_ids) int64 arrays, one entry per distinct order line product."""
+    from orders.models import OrderItem
+
+    rows = OrderItem.objects.using(using).order_by().values_list('order_id', 'product_id').iterator(chunk_size=fetch_size)
+    chunks, buffer = [], []
+    for row in rows:
+        buffer.append(row)
+        if len(buffer) == fetch_size:
+            chunks.append(np.array(buffer, dtype=np.int64))
+            buffer = []
+    if buffer:
+        chunks.append(np.array(buffer, dtype=np.int64))
+    if not chunks:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    pairs = np.unique(np.concatenate(chunks), axis=0) # Sorted by order, duplicates dropped
+    return pairs[:, 0], pairs[:, 1]
+
+
+def co_occurrences(order_ids, product_ids, max_basket_size=RELATED_MAX_BASKET_SIZE):
+    """
+    Sparse co-occurrence counts of the products in the same orders:
+    (products, related, counts) arrays over product ids, both directions included.
+    `order_ids` must be sorted (as returned by load_order_pairs).
+    """
+    empty = np.empty(0, dtype=np.int64)
+    if not len(order_ids):
+        return empty, empty, empty
+    product_ids_index, codes = np.unique(product_ids, return_inverse=True)
+    n_products = len(product_ids_index)
+
+    # Basket boundaries: each order's lines are contiguous since order_ids is sorted.
+    starts = np.flatnonzero(np.r_[True, order_ids[1:] != order_ids[:-1]])
+    sizes = np.diff(np.r_[starts, len(order_ids)])
+    keep = (sizes > 1) & (sizes <= max_basket_size)
+
+    keys = []
+    # Orders are grouped by basket size so every group is a dense (orders x size) matrix
+    # and the pairs of a group come out of one broadcast.
+    for size in np.unique(sizes[keep]):
+        group_starts = starts[keep & (sizes == size)]
+        baskets = codes[group_starts[:, None] + np.arange(size)] # (orders, size)
+        left = np.repeat(baskets, size, axis=1)
+        right = np.tile(baskets, (1, size))
+        distinct = left != right
+        keys.append(left[distinct] * n_products + right[distinct])
+    if not keys:
+        return empty, empty, empty
+    pair_keys, counts = np.unique(np.concatenate(keys), return_counts=True)
+    return product_ids_index[pair_keys // n_products], product_ids_index[pair_keys % n_products], counts
+
+
+def top_related(products, related, counts, top_k=RELATED_TOP_K, min_co_orders=RELATED_MIN_CO_ORDERS):
+    """Keep the `top_k` most co-ordered products of each product: (products, related, counts, ranks)."""
+    keep = counts >= min_co_orders
+    products, related, counts = products[keep], related[keep], counts[keep]
+    order = np.lexsort((related, -counts, products))
+    products, related, counts = products[order], related[order], counts[order]
+    group_starts = np.flatnonzero(np.r_[True, products[1:] != products[:-1]]) if len(products) else np.empty(0, dtype=np.int64)
+    group_sizes = np.diff(np.r_[group_starts, len(products)])
+    ranks = np.arange(len(products)) - np.repeat(group_starts, group_sizes)
+    top = ranks < top_k
+    return products[top], related[top], counts[top], ranks[top]
+
+
+def build_related_products(top_k=RELATED_TOP_K, min_co_orders=RELATED_MIN_CO_ORDERS,
+                           max_basket_size=RELATED_MAX_BASKET_SIZE, using=DEFAULT_DB_ALIAS,
+                           batch_size=RELATED_BATCH_SIZE):
+    """Recompute the whole RelatedProduct table. Returns the number of rows written."""
+    order_ids, product_ids = load_order_pairs(using=using)
+    products, related, counts = co_occurrences(order_ids, product_ids, max_basket_size)
+
+    # Only suggest products that can still be bought.
+    active = np.fromiter(
+        Product.objects.using(using).filter(is_active=True).values_list('id', flat=True).iterator(), dtype=np.int64
+    )
+    buyable = np.isin(related, active)
+    products, related, counts, ranks = top_related(
+        products[buyable], related[buyable], counts[buyable], top_k=top_k, min_co_orders=min_co_orders
+    )
+
+    with transaction.atomic(using=using):
+        previous = set(RelatedProduct.objects.using(using).values_list('product_id', flat=True).distinct())
+        RelatedProduct.objects.using(using).all().delete()
+        for start in range(0, len(products), batch_size):
+            stop = start + batch_size
+            RelatedProduct.objects.using(using).bulk_create([
+                RelatedProduct(product_id=p, related_id=r, co_orders=c, rank=k)
+                for p, r, c, k in zip(
+                    products[start:stop].tolist(), related[start:stop].tolist(),
+                    counts[start:stop].tolist(), ranks[start:stop].tolist(),
+                )
+            ])
+        changed = previous | set(np.unique(products).tolist())
+        transaction.on_commit(lambda: (set_related_version(), invalidate_products(changed)), using=using)
+    return len(products)
+
+
+def get_related_version():
+    """Time of the last build_related_products; a lost value is replaced by the current time."""
+    version = cache.get(RELATED_VERSION_CACHE_KEY)
+    if version is None:
+        version = timezone.now()
+        if not cache.add(RELATED_VERSION_CACHE_KEY, version, timeout=None):
+            version = cache.get(RELATED_VERSION_CACHE_KEY, version)
+    return version
+
+
+def set_related_version():
+    cache.set(RELATED_VERSION_CACHE_KEY, timezone.now(), timeout=None)
+
+
+def related_products_timestamps(product, using=DEFAULT_DB_ALIAS):
+    """Timestamps behind `product`'s frequently_bought_together: the last rebuild and the
+    latest listing change (name, price, image, deactivation) of its related products."""
+    last = (
+        RelatedProduct.objects.using(using).filter(product_id=product.pk)
+        .aggregate(last=Max('related__listing__updated_at'))['last']
+    )
+    return [get_related_version()] + ([last] if last else [])
+
+
+def get_related_products(product, request=None, using=DEFAULT_DB_ALIAS):
+    """Card data of the products bought with `product`: one query on the (product, rank) index,
+    joined with the listing rows of the related products."""
+    rows = (
+        RelatedProduct.objects.using(using)
+        .filter(product_id=product.pk, related__listing__is_active=True)
+        .order_by('rank')
+        .values(
+            'related_id', 'co_orders', 'related__listing__name', 'related__listing__slug',
+            'related__listing__price', 'related__listing__thumbnail', 'related__listing__image',
+        )
+    )
+    results = []
+    for row in rows:
+        thumbnail = row['related__listing__thumbnail'] or row['related__listing__image']
+        url = default_storage.url(thumbnail) if thumbnail else None
+        results.append({
+            'id': row['related_id'],
+            'name': row['related__listing__name'],
+            'slug': row['related__listing__slug'],
+            'price': str(row['related__listing__price']), # Same rendering as ProductSerializer
+            'thumbnail': request.build_absolute_uri(url) if url and request is not None else url,
+            'co_orders': row['co_orders'],
+        })
+    return results
@@ -0,0 +1,235 @@
+import re
+import unicodedata
+
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.db.models import F, FloatField, Func, Q, Value
+from django.db.models.expressions import RawSQL
+
+# Full-text search over Product.name / Product.description.
+#
+# The index lives next to catalogue_product and is managed here rather than on the model:
+#   - SQLite: an FTS5 virtual table (catalogue_product_fts) keyed by product id, holding
+#     text that has already been accent-folded and stemmed by normalize_text().
+#   - PostgreSQL: a tsvector column (catalogue_product.search_vector) with a GIN index,
+#     computed with the 'fr_unaccent' text search configuration (french stemmer + unaccent).
+# Both are created by migration 0004_product_search_index. Every backend exposes the same
+# interface: index_products(ids), remove_products(ids), rebuild() and search(queryset, query).
+
+FTS_TABLE = 'catalogue_product_fts'
+PG_SEARCH_CONFIG = 'fr_unaccent'
+
+# Relative weight of a match in the name vs. the description.
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+INDEX_BATCH_SIZE = 1000
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Very common French words that only add noise to the index.
+FRENCH_STOPWORDS = frozenset([
+    'a', 'au', 'aux', 'avec', 'ce', 'ces', 'dans', 'de', 'des', 'du', 'en', 'et', 'il',
+    'la', 'le', 'les', 'leur', 'mais', 'ou', 'par', 'pas', 'pour', 'sa', 'se', 'ses',
+    'son', 'sur', 'un', 'une', 'd', 'l',
+])
+
+# Suffixes removed by the light stemmer, tried longest first.
+FRENCH_SUFFIXES = tuple(sorted((
+    'issements', 'issement', 'atrices', 'ateurs', 'ations', 'ements', 'atrice', 'ateur',
+    'ation', 'ement', 'euses', 'iques', 'ables', 'ibles', 'istes', 'euse', 'ique', 'able',
+    'ible', 'iste', 'ages', 'age', 'eaux', 'eurs', 'eur', 'eux', 'aux', 'ees', 'ers', 'es',
+    'ee', 'er', 'e', 's', 'x',
+), key=len, reverse=True))
+
+
+def strip_accents(text):
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def stem_word(word):
+    # Light French stemmer: enough to fold plurals and common derivations
+    # ("freins"/"freinage", "lumineuse"/"lumineux") onto the same token.
+    if len(word) <= 3 or word.isdigit():
+        return word
+    for suffix in FRENCH_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            if suffix == 'aux':
+                return word[:-3] + 'al'
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    text = strip_accents((text or '').lower())
+    return [w for w in _WORD_RE.findall(text) if w not in FRENCH_STOPWORDS]
+
+
+def normalize_text(text):
+    return ' '.join(stem_word(w) for w in tokenize(text))
+
+
+class ProductRank(Func):
+    """
+    Correlated subquery returning the relevance of the outer product row. `sql` refers to
+    the outer product id as {product_id}, which is compiled from F('id') so the expression
+    keeps working when the queryset is itself used as a subquery (and gets aliased).
+    """
+    output_field = FloatField()
+
+    def __init__(self, sql, params):
+        super().__init__(F('id'))
+        self.sql, self.params = sql, list(params)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        id_sql, id_params = compiler.compile(self.source_expressions[0])
+        return '(%s)' % self.sql.format(product_id=id_sql), [*self.params, *id_params]
+
+
+class BaseSearchBackend:
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def index_products(self, product_ids):
+        raise NotImplementedError
+
+    def remove_products(self, product_ids):
+        raise NotImplementedError
+
+    def search(self, queryset, query):
+        """Return `queryset` restricted to products matching `query`, annotated with
+        `search_rank` (higher is better) and ordered by it."""
+        raise NotImplementedError
+
+    def rebuild(self, batch_size=INDEX_BATCH_SIZE):
+        from .models import Product
+
+        ids = list(Product.objects.using(self.using).order_by('id').values_list('id', flat=True))
+        for start in range(0, len(ids), batch_size):
+            self.index_products(ids[start:start + batch_size])
+        return len(ids)
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    def index_products(self, product_ids):
+        from .models import Product
+
+        product_ids = list(product_ids)
+        for start in range(0, len(product_ids), INDEX_BATCH_SIZE):
+            batch = product_ids[start:start + INDEX_BATCH_SIZE]
+            rows = Product.objects.using(self.using).filter(id__in=batch).values_list('id', 'name', 'description')
+            with self.connection.cursor() as cursor:
+                placeholders = ','.join(['%s'] * len(batch))
+                cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', batch)
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, name, description) VALUES (%s, %s, %s)',
+                    [(pk, normalize_text(name), normalize_text(description)) for pk, name, description in rows]
+                )
+
+    def remove_products(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        placeholders = ','.join(['%s'] * len(product_ids))
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', product_ids)
+
+    def build_match_expression(self, query):
+        terms = [stem_word(w) for w in tokenize(query)]
+        if not terms:
+            return None
+        # Every term must match; the last one is treated as a prefix so results
+        # follow the user while they are still typing.
+        quoted = ['"%s"' % t for t in terms]
+        quoted[-1] += '*'
+        return ' AND '.join(quoted)
+
+    def search(self, queryset, query):
+        match = self.build_match_expression(query)
+        if match is None:
+            return queryset.none()
+        matching = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        # bm25() is lower-is-better, negate it so every backend sorts on -search_rank.
+        rank = ProductRank(
+            f'SELECT -bm25({FTS_TABLE}, %s, %s) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {{product_id}}',
+            [NAME_WEIGHT, DESCRIPTION_WEIGHT, match]
+        )
+        return queryset.filter(id__in=matching).annotate(search_rank=rank).order_by('-search_rank', 'id')
+
+
+class PostgreSQLSearchBackend(BaseSearchBackend):
+    def index_products(self, product_ids):
+        product_ids = list(product_ids)
+        for start in range(0, len(product_ids), INDEX_BATCH_SIZE):
+            batch = product_ids[start:start + INDEX_BATCH_SIZE]
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE catalogue_product SET search_vector = "
+                    "setweight(to_tsvector(%s, coalesce(name, '')), 'A') || "
+                    "setweight(to_tsvector(%s, coalesce(description, '')), 'B') "
+                    "WHERE id = ANY(%s)",
+                    [PG_SEARCH_CONFIG, PG_SEARCH_CONFIG, batch]
+                )
+
+    def remove_products(self, product_ids):
+        # The vector lives on the product row and goes away with it.
+        pass
+
+    def search(self, queryset, query):
+        if not tokenize(query):
+            return queryset.none()
+        tsquery = f"websearch_to_tsquery('{PG_SEARCH_CONFIG}', %s)"
+        matching = RawSQL(f'SELECT id FROM catalogue_product WHERE search_vector @@ {tsquery}', [query])
+        # Weights are {D, C, B, A}; names (A) count ten times as much as descriptions (B).
+        rank = ProductRank(
+            f"SELECT ts_rank('{{{{0, 0, {DESCRIPTION_WEIGHT / NAME_WEIGHT}, 1}}}}', ranked.search_vector, {tsquery}) "
+            f"FROM catalogue_product AS ranked WHERE ranked.id = {{product_id}}",
+            [query]
+        )
+        return queryset.filter(id__in=matching).annotate(search_rank=rank).order_by('-search_rank', 'id')
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    # Fallback for databases without a dedicated index: the old icontains behaviour.
+    def index_products(self, product_ids):
+        pass
+
+    def remove_products(self, product_ids):
+        pass
+
+    def rebuild(self, batch_size=INDEX_BATCH_SIZE):
+        return 0
+
+    def search(self, queryset, query):
+        condition = Q()
+        for word in query.split():
+            condition &= Q(name__icontains=word) | Q(description__icontains=word)
+        return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+SEARCH_BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgreSQLSearchBackend,
+}
+
+
+def get_search_backend(using=DEFAULT_DB_ALIAS):
+    backend_class = SEARCH_BACKENDS.get(connections[using].vendor, SimpleSearchBackend)
+    return backend_class(using)
+
+
+def index_products(product_ids, using=DEFAULT_DB_ALIAS):
+    get_search_backend(using).index_products(product_ids)
+
+
+def remove_products(product_ids, using=DEFAULT_DB_ALIAS):
+    get_search_backend(using).remove_products(product_ids)
+
+
+def search_products(queryset, query):
+    return get_search_backend(queryset.db).search(queryset, query)
@@ -1,12 +1,22 @@
+from django.core.files.storage import default_storage
 from rest_framework import serializers
-from .models import Category, Product, ProductImage
+from aloauto.fieldsets import SparseFieldsetMixin
+from .images import variant_urls
+from .related import get_related_products
+from .models import Category, Product, ProductImage, VehicleMake, VehicleModel, Vehicle, PartNumber, ProductListing
+
+class ProductImageSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    # URLs of the generated derivatives (thumbnail, medium, webp); empty until they are ready.
+    variants = serializers.SerializerMethodField()
 
-class ProductImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'alt_text', 'is_primary', 'created_at']
+        fields = ['id', 'image', 'variants', 'alt_text', 'is_primary', 'created_at']
         read_only_fields = ['created_at']
 
+    def get_variants(self, obj):
+        return variant_urls(obj, self.context.get('request'))
+
 class CategorySerializer(serializers.ModelSerializer):
     children = serializers.SerializerMethodField()
 
@@ -16,25 +26,117 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['slug', 'created_at', 'updated_at']
 
     def get_children(self, obj):
-        # Avoid recursion if obj has no children or to prevent potential infinite loops if data is bad
-        if not obj.children.exists():
+        # When the view preloaded the tree (see catalogue.tree), children come from memory;
+        # otherwise fall back to one query per node.
+        children_map = self.context.get('children_map')
+        if children_map is not None:
+            children = children_map.get(obj.id, [])
+        else:
+            children = obj.children.all()
+        if not children:
             return []
-        return CategorySerializer(obj.children.all(), many=True).data
+        return CategorySerializer(children, many=True, context=self.context).data
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     vendor_name = serializers.CharField(source='vendor.company_name', read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
     images = ProductImageSerializer(many=True, read_only=True)
+    thumbnail = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
         fields = [
             'id', 'vendor', 'vendor_name', 'category', 'category_name',
             'name', 'slug', 'sku', 'description', 'price', 'stock_quantity',
-            'attributes', 'weight', 'dimensions', 'is_active', 'images',
+            'attributes', 'weight', 'dimensions', 'is_active', 'images', 'thumbnail',
             'created_at', 'updated_at'
         ]
         read_only_fields = [
             'vendor', 'vendor_name', 'category_name', 'slug',
             'images', 'created_at', 'updated_at'
-        ]
\ No newline at end of file
+        ]
+        # ?view=compact: what a product grid/card needs
+        fieldsets = {
+            'compact': ['id', 'name', 'slug', 'price', 'stock_quantity', 'thumbnail'],
+        }
+        fieldset_requires = {'thumbnail': ['images']}
+
+    def get_thumbnail(self, obj):
+        # Thumbnail of the primary image (or the first one), falling back to the original.
+        images = list(obj.images.all())
+        if not images:
+            return None
+        image = next((i for i in images if i.is_primary), images[0])
+        request = self.context.get('request')
+        url = variant_urls(image, request).get('thumbnail')
+        if url is None and image.image:
+            url = request.build_absolute_uri(image.image.url) if request is not None else image.image.url
+        return url
+
+class ProductDetailSerializer(ProductSerializer):
+    # Product detail only: a list would cost one more query per product.
+    frequently_bought_together = serializers.SerializerMethodField()
+
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + ['frequently_bought_together']
+
+    def get_frequently_bought_together(self, obj):
+        return get_related_products(obj, self.context.get('request'))
+
+class VehicleMakeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VehicleMake
+        fields = ['id', 'name', 'slug']
+
+class VehicleModelSerializer(serializers.ModelSerializer):
+    make_name = serializers.CharField(source='make.name', read_only=True)
+
+    class Meta:
+        model = VehicleModel
+        fields = ['id', 'make', 'make_name', 'name', 'slug']
+
+class VehicleSerializer(serializers.ModelSerializer):
+    make = serializers.CharField(source='model.make.name', read_only=True)
+    model_name = serializers.CharField(source='model.name', read_only=True)
+
+    class Meta:
+        model = Vehicle
+        fields = ['id', 'make', 'model', 'model_name', 'year', 'engine']
+
+
+class PartNumberSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source='product.name', read_only=True)
+    product_slug = serializers.CharField(source='product.slug', read_only=True)
+    product_price = serializers.DecimalField(source='product.price', max_digits=10, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = PartNumber
+        fields = ['id', 'number', 'normalized', 'kind', 'brand', 'product', 'product_name', 'product_slug', 'product_price']
+        read_only_fields = ['normalized']
+
+
+class ProductListingSerializer(serializers.ModelSerializer):
+    # Reads only the listing row: image URLs are built from the stored paths.
+    id = serializers.IntegerField(source='product_id', read_only=True)
+    image = serializers.SerializerMethodField()
+    thumbnail = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProductListing
+        fields = [
+            'id', 'name', 'slug', 'sku', 'price', 'stock_quantity', 'vendor', 'vendor_name',
+            'category', 'category_name', 'category_path', 'image', 'thumbnail', 'created_at'
+        ]
+
+    def build_url(self, path):
+        if not path:
+            return None
+        url = default_storage.url(path)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def get_image(self, obj):
+        return self.build_url(obj.image)
+
+    def get_thumbnail(self, obj):
+        return self.build_url(obj.thumbnail or obj.image)
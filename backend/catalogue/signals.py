@@ -0,0 +1,251 @@
+import logging
+from django.db.models.signals import post_save, post_delete
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.dispatch import receiver, Signal
+from django.utils import timezone
+from .models import Category, Product, ProductImage, RelatedProduct
+from vendors.models import Vendor
+from orders.signals import order_items_created
+from . import attributes, autocomplete, detail_cache, images, listings, partnumbers, search, tree
+
+logger = logging.getLogger(__name__)
+
+# Sent by code paths that write products in bulk (bulk_create/bulk_update, imports),
+# which bypass post_save. Receivers get the list of affected ids as `product_ids`.
+products_bulk_changed = Signal()
+
+# Sent once stock-only writes (orders.reservations) are committed, with `product_ids`.
+# Only the stock-dependent copies need refreshing, not the search/attribute indexes.
+products_stock_changed = Signal()
+
+# Sent by Category once its path (and its subtree's) has been rewritten, with
+# `instance`, `old_path`, `new_path` and `using`. post_save fires before paths are updated.
+category_path_changed = Signal()
+
+
+@receiver(post_save, sender=Product)
+def index_saved_product(sender, instance, raw=False, using=None, **kwargs):
+    if raw: # Loading fixtures
+        return
+    search.index_products([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Product)
+def index_saved_product_attributes(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'attributes' not in update_fields):
+        return
+    attributes.index_product_attributes([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Product)
+def sync_saved_product_sku(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'sku' not in update_fields):
+        return
+    partnumbers.sync_sku_part_numbers([instance.pk], using=using)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, instance, using=None, **kwargs):
+    search.remove_products([instance.pk], using=using)
+
+
+@receiver(products_bulk_changed)
+def index_bulk_changed_products(sender, product_ids, using=None, **kwargs):
+    search.index_products(product_ids, using=using or DEFAULT_DB_ALIAS)
+    attributes.index_product_attributes(product_ids, using=using or DEFAULT_DB_ALIAS)
+    partnumbers.sync_sku_part_numbers(product_ids, using=using or DEFAULT_DB_ALIAS)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_tree(sender, **kwargs):
+    tree.invalidate_category_tree()
+
+
+def enqueue_image_variants(product_image_id):
+    from .tasks import generate_product_image_variants_task
+    try:
+        generate_product_image_variants_task.delay(product_image_id)
+    except Exception as e: # Broker down: the upload itself must not fail
+        logger.warning(f"Could not queue variants for ProductImage {product_image_id} (run generate_image_variants later): {e}")
+
+
+@receiver(post_save, sender=ProductImage)
+def queue_image_variants(sender, instance, created=False, raw=False, using=None, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'image' not in update_fields):
+        return
+    transaction.on_commit(lambda: enqueue_image_variants(instance.pk), using=using)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def touch_image_product(sender, instance, raw=False, using=None, **kwargs):
+    # Images are nested in the product payload: bump updated_at so product ETags change.
+    if raw:
+        return
+    Product.objects.using(using).filter(pk=instance.product_id).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=ProductImage)
+def delete_image_variants(sender, instance, using=None, **kwargs):
+    images.delete_unused_variants(instance.content_hash, instance.variants or {}, using=using)
+
+
+def invalidate_product_details(product_ids, using=None):
+    # Now, and again once the transaction commits so a read racing the write
+    # cannot leave the pre-commit state in the cache.
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+    detail_cache.invalidate_products(product_ids)
+    transaction.on_commit(lambda: detail_cache.invalidate_products(product_ids), using=using)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_detail(sender, instance, using=None, **kwargs):
+    invalidate_product_details([instance.pk], using=using)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_image_product_detail(sender, instance, using=None, **kwargs):
+    invalidate_product_details([instance.product_id], using=using)
+
+
+@receiver(products_bulk_changed)
+def invalidate_bulk_changed_product_details(sender, product_ids, using=None, **kwargs):
+    invalidate_product_details(product_ids, using=using)
+
+
+def invalidate_related_product_details(product_ids, using=None):
+    # Products listing these as frequently bought together render their name, price and thumbnail.
+    ids = RelatedProduct.objects.using(using).filter(related_id__in=list(product_ids)).values_list('product_id', flat=True).distinct()
+    invalidate_product_details(ids, using=using)
+
+
+@receiver(post_save, sender=Product)
+def invalidate_saved_product_sources(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        invalidate_related_product_details([instance.pk], using=using)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_image_product_sources(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        invalidate_related_product_details([instance.product_id], using=using)
+
+
+@receiver(products_bulk_changed)
+def invalidate_bulk_changed_product_sources(sender, product_ids, using=None, **kwargs):
+    invalidate_related_product_details(product_ids, using=using)
+
+
+@receiver(products_stock_changed)
+def invalidate_stock_changed_product_details(sender, product_ids, using=None, **kwargs):
+    detail_cache.invalidate_products(product_ids)
+
+
+@receiver(post_save, sender=Vendor)
+def invalidate_vendor_product_details(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    ids = Product.objects.using(using).filter(vendor_id=instance.pk).values_list('id', flat=True)
+    invalidate_product_details(ids, using=using)
+
+
+@receiver(post_save, sender=Category)
+def invalidate_category_product_details(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    ids = Product.objects.using(using).filter(category_id=instance.pk).values_list('id', flat=True)
+    invalidate_product_details(ids, using=using)
+
+
+@receiver(post_save, sender=Product)
+def refresh_saved_product_listing(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    listings.refresh_listings([instance.pk], using=using)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def refresh_image_product_listing(sender, instance, raw=False, using=None, origin=None, **kwargs):
+    # Skip deletions cascading from the product (or vendor): its listing goes with it.
+    if raw or (origin is not None and getattr(origin, 'model', type(origin)) is not ProductImage):
+        return
+    listings.refresh_listings([instance.product_id], using=using)
+
+
+@receiver(products_bulk_changed)
+def refresh_bulk_changed_listings(sender, product_ids, using=None, **kwargs):
+    listings.refresh_listings(product_ids, using=using or DEFAULT_DB_ALIAS)
+
+
+@receiver(products_stock_changed)
+def refresh_stock_changed_listings(sender, product_ids, using=None, **kwargs):
+    listings.refresh_listings(product_ids, using=using or DEFAULT_DB_ALIAS)
+
+
+@receiver(post_save, sender=Vendor)
+def update_vendor_listings(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        listings.update_vendor_listings(instance, using=using)
+
+
+@receiver(post_save, sender=Category)
+def update_category_listings(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        listings.update_category_listings(instance, using=using)
+
+
+@receiver(category_path_changed)
+def update_moved_category_listings(sender, instance, new_path, using=None, **kwargs):
+    listings.update_category_paths(new_path, using=using or DEFAULT_DB_ALIAS)
+
+
+AUTOCOMPLETE_PRODUCT_FIELDS = {'name', 'slug', 'sku', 'is_active'}
+
+
+@receiver(post_save, sender=Product)
+def index_saved_product_autocomplete(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not AUTOCOMPLETE_PRODUCT_FIELDS & set(update_fields)):
+        return
+    autocomplete.index_products([instance.pk], using=using)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product_autocomplete(sender, instance, using=None, **kwargs):
+    autocomplete.index_products([instance.pk], using=using)
+
+
+@receiver(products_bulk_changed)
+def index_bulk_changed_autocomplete(sender, product_ids, using=None, **kwargs):
+    autocomplete.index_products(product_ids, using=using or DEFAULT_DB_ALIAS)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def index_category_autocomplete(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        autocomplete.index_categories([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Vendor)
+@receiver(post_delete, sender=Vendor)
+def index_vendor_autocomplete(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        autocomplete.index_vendors([instance.pk], using=using)
+
+
+@receiver(post_save, sender='orders.OrderItem')
+def count_ordered_product(sender, instance, created=False, raw=False, using=None, **kwargs):
+    if created and not raw:
+        autocomplete.record_order_items([instance.product_id], using=using)
+
+
+@receiver(order_items_created)
+def count_ordered_products(sender, order, product_ids, using=None, **kwargs):
+    autocomplete.record_order_items(product_ids, using=using or DEFAULT_DB_ALIAS)
@@ -0,0 +1,41 @@
+from celery import shared_task
+from .models import ProductImage
+from .images import generate_image_variants
+from .autocomplete import refresh_popularity as refresh_autocomplete_popularity
+from .feeds import generate_feeds
+from .related import build_related_products
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def generate_product_image_variants_task(self, product_image_id, force=False):
+    try:
+        product_image = ProductImage.objects.get(id=product_image_id)
+    except ProductImage.DoesNotExist:
+        logger.warning(f"Task ID: {self.request.id} - ProductImage {product_image_id} no longer exists, skipping variants.")
+        return {}
+    variants = generate_image_variants(product_image, force=force)
+    logger.info(f"Task ID: {self.request.id} - Generated {len(variants)} variants for ProductImage {product_image_id}.")
+    return variants
+
+
+@shared_task(bind=True)
+def refresh_autocomplete_popularity_task(self):
+    updated = refresh_autocomplete_popularity()
+    logger.info(f"Task ID: {self.request.id} - Refreshed popularity of {updated} autocomplete terms.")
+    return updated
+
+
+@shared_task(bind=True)
+def generate_feeds_task(self, force=False):
+    stats = generate_feeds(force=force)
+    logger.info(f"Task ID: {self.request.id} - Product feeds generated: {stats}")
+    return stats
+
+
+@shared_task(bind=True)
+def build_related_products_task(self):
+    rows = build_related_products()
+    logger.info(f"Task ID: {self.request.id} - Rebuilt {rows} frequently-bought-together rows.")
+    return rows
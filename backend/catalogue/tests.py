@@ -1,3 +1,187 @@
-from django.test import TestCase
+import base64
+import json
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+from aloauto.generations import get_generation
+from aloauto.testing import QueryBudgetMixin
+from accounts.models import User
+from vendors.models import Vendor
+from . import autocomplete
+from .models import Category, PartNumber, Product, ProductImage, RelatedProduct
+from .fitment import FitmentLoader
+from .partnumbers import load_part_numbers, lookup_part_numbers
+from .related import build_related_products
 
-# Create your tests here.
+
+class ProductQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(username='buyer', password='password123', role='buyer')
+        self.category = Category.objects.create(name='Freinage', slug='freinage')
+        self.vendors = [
+            Vendor.objects.create(
+                user=User.objects.create_user(username=f'vendor{i}', password='password123', role='vendor'),
+                company_name=f'Vendor {i}', tax_number=f'TAX{i}'
+            )
+            for i in range(3)
+        ]
+        self.client.force_authenticate(self.buyer)
+
+    def create_products(self, count):
+        for i in range(count):
+            product = Product.objects.create(
+                vendor=self.vendors[i % len(self.vendors)], category=self.category,
+                name=f'Plaquette {i}', slug=f'plaquette-{i}', description='Plaquettes de frein',
+                price=10, stock_quantity=5
+            )
+            ProductImage.objects.create(product=product, image=f'products/{i}-1.png', is_primary=True)
+            ProductImage.objects.create(product=product, image=f'products/{i}-2.png')
+
+    def test_product_list_stays_within_budget_for_any_page_size(self):
+        self.create_products(30)
+        for limit in (1, 30):
+            with self.assertQueryBudget('product-list'):
+                response = self.client.get('/api/catalogue/products/', {'limit': limit})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), limit)
+            self.assertEqual(len(response.data['results'][0]['images']), 2)
+
+    def test_product_detail_stays_within_budget(self):
+        self.create_products(1)
+        product = Product.objects.get()
+        with self.assertQueryBudget('product-detail'):
+            response = self.client.get(f'/api/catalogue/products/{product.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['vendor_name'], product.vendor.company_name)
+
+
+class KeysetCursorTests(APITestCase):
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user(username='buyer', password='password123', role='buyer'))
+
+    def get_with_cursor(self, position, reverse=False):
+        cursor = base64.urlsafe_b64encode(json.dumps([position, reverse]).encode('utf-8')).decode('ascii').rstrip('=')
+        return self.client.get('/api/catalogue/products/', {'cursor': cursor})
+
+    def test_first_page_with_empty_cursor(self):
+        self.assertEqual(self.client.get('/api/catalogue/products/', {'cursor': ''}).status_code, 200)
+
+    def test_malformed_cursor_is_not_found(self):
+        for position in (['garbage', '1'], ['2026-01-01T00:00:00Z', 'abc'], ['2026-01-01T00:00:00Z'], 'x'):
+            with self.subTest(position=position):
+                self.assertEqual(self.get_with_cursor(position).status_code, 404)
+        self.assertEqual(self.client.get('/api/catalogue/products/', {'cursor': '%%%'}).status_code, 404)
+
+
+class RelatedProductValidatorTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(User.objects.create_user(username='buyer', password='password123', role='buyer'))
+        category = Category.objects.create(name='Freinage', slug='freinage')
+        vendor = Vendor.objects.create(
+            user=User.objects.create_user(username='vendor', password='password123', role='vendor'),
+            company_name='Vendor', tax_number='TAX0'
+        )
+        self.product, self.related = [
+            Product.objects.create(
+                vendor=vendor, category=category, name=f'Plaquette {i}', slug=f'plaquette-{i}',
+                description='Plaquettes de frein', price=10, stock_quantity=5
+            )
+            for i in range(2)
+        ]
+        RelatedProduct.objects.create(product=self.product, related=self.related, rank=0, co_orders=3)
+
+    def get_detail(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(f'/api/catalogue/products/{self.product.pk}/', **headers)
+
+    def test_related_product_change_refreshes_the_detail(self):
+        etag = self.get_detail()['ETag']
+        self.related.price = 12
+        self.related.save()
+        response = self.get_detail(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['frequently_bought_together'][0]['price'], '12.00')
+
+    def test_rebuild_changes_the_validators(self):
+        etag = self.get_detail()['ETag']
+        self.assertEqual(self.get_detail(etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            build_related_products()
+        response = self.get_detail(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['frequently_bought_together'], []) # No order history
+
+
+class ListingCategoryFilterTests(APITestCase):
+    def test_category_filter_includes_the_subtree(self):
+        vendor = Vendor.objects.create(
+            user=User.objects.create_user(username='vendor', password='password123', role='vendor'),
+            company_name='Vendor', tax_number='TAX0'
+        )
+        root = Category.objects.create(name='Freinage', slug='freinage')
+        child = Category.objects.create(name='Plaquettes', slug='plaquettes', parent=root)
+        other = Category.objects.create(name='Filtration', slug='filtration')
+        for category in (root, child, other):
+            Product.objects.create(
+                vendor=vendor, category=category, name=category.name, slug=category.slug,
+                description=category.name, price=10, stock_quantity=5
+            )
+        response = self.client.get('/api/catalogue/listings/', {'category': root.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(row['name'] for row in response.data['results']), ['Freinage', 'Plaquettes'])
+
+
+class PrefixLookupTests(APITestCase):
+    def setUp(self):
+        vendor = Vendor.objects.create(
+            user=User.objects.create_user(username='vendor', password='password123', role='vendor'),
+            company_name='Vendor', tax_number='TAX0'
+        )
+        category = Category.objects.create(name='Freinage', slug='freinage')
+        self.product = Product.objects.create(
+            vendor=vendor, category=category, name='Plaquettes de frein avant', slug='plaquettes-avant',
+            sku='PQ-100', description='Plaquettes', price=10, stock_quantity=5
+        )
+
+    def test_part_number_prefix(self):
+        PartNumber.objects.create(product=self.product, number='0 986-494.123')
+        PartNumber.objects.create(product=self.product, number='986 500')
+        found = lookup_part_numbers(PartNumber.objects.all(), '986-49', prefix=True)
+        self.assertEqual([part.number for part in found], ['0 986-494.123'])
+
+    def test_autocomplete_prefix_with_spaces(self):
+        results = autocomplete.lookup('frein av')
+        self.assertIn({'kind': 'product', 'id': self.product.pk, 'label': self.product.name, 'slug': self.product.slug}, results)
+        self.assertEqual(autocomplete.lookup('frein ar'), [])
+
+    def test_autocomplete_cache_survives_writes_that_keep_the_terms(self):
+        generation = get_generation(autocomplete.AUTOCOMPLETE_GENERATION_KEY)
+        self.product.stock_quantity = 3
+        self.product.save()
+        self.assertEqual(get_generation(autocomplete.AUTOCOMPLETE_GENERATION_KEY), generation)
+        self.product.name = 'Plaquettes de frein arrière'
+        self.product.save()
+        self.assertNotEqual(get_generation(autocomplete.AUTOCOMPLETE_GENERATION_KEY), generation)
+        self.assertEqual(autocomplete.lookup('frein av'), [])
+
+    def test_reloading_part_numbers_counts_only_new_rows(self):
+        rows = [{'sku': 'PQ-100', 'number': '0 986-494.123'}, {'sku': 'PQ-100', 'number': '986 500'}]
+        self.assertEqual(load_part_numbers(rows), (2, 0, []))
+        self.assertEqual(load_part_numbers(rows + [{'sku': 'PQ-100', 'number': '1234'}, {'sku': 'PQ-100', 'number': '12-34'}]), (1, 3, []))
+
+
+class FitmentLoaderTests(APITestCase):
+    def test_reloading_fitments_counts_only_new_rows(self):
+        vendor = Vendor.objects.create(
+            user=User.objects.create_user(username='vendor', password='password123', role='vendor'),
+            company_name='Vendor', tax_number='TAX0'
+        )
+        Product.objects.create(
+            vendor=vendor, category=Category.objects.create(name='Freinage', slug='freinage'), name='Plaquettes',
+            slug='plaquettes', sku='PQ-100', description='Plaquettes', price=10, stock_quantity=5
+        )
+        rows = [{'sku': 'PQ-100', 'make': 'Renault', 'model': 'Clio', 'year_from': '2010', 'year_to': '2012'}]
+        self.assertEqual(FitmentLoader().load(rows), 3)
+        loader = FitmentLoader()
+        self.assertEqual(loader.load(rows + [{'sku': 'PQ-100', 'make': 'Renault', 'model': 'Clio', 'year': '2013'}]), 1)
+        self.assertEqual(loader.skipped, 3)
@@ -0,0 +1,71 @@
+from collections import defaultdict
+from django.core.cache import cache
+from aloauto.generations import bump_generation, get_generation
+from .models import Category
+
+# The category tree is small, read on every page and rarely written, so the serialized
+# tree is cached. Entries are keyed by a generation number that is bumped whenever a
+# Category is saved or deleted (see catalogue.signals), which drops every cached variant at once.
+CATEGORY_TREE_CACHE_KEY = 'catalogue:category-tree:{generation}:{variant}'
+CATEGORY_TREE_GENERATION_KEY = 'catalogue:category-tree:generation'
+CATEGORY_TREE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def build_children_map(categories):
+    """Group already-loaded categories by parent id, keeping the input order."""
+    children_map = defaultdict(list)
+    for category in categories:
+        children_map[category.parent_id].append(category)
+    return children_map
+
+
+def load_subtree(root):
+    """Load `root` and all its descendants with one query and return the children map."""
+    return build_children_map(Category.objects.filter(path__startswith=root.path).order_by('id'))
+
+
+def load_tree():
+    """Load every category with one query and return the children map (roots under None)."""
+    return build_children_map(Category.objects.order_by('id'))
+
+
+def get_tree_generation():
+    return get_generation(CATEGORY_TREE_GENERATION_KEY)
+
+
+def get_category_tree(serialize, variant='default'):
+    """
+    Return the nested representation of the whole tree, as produced by `serialize(roots, children_map)`.
+    `variant` distinguishes representations that depend on the request (e.g. absolute media URLs).
+    """
+    key = CATEGORY_TREE_CACHE_KEY.format(generation=get_tree_generation(), variant=variant)
+    tree = cache.get(key)
+    if tree is None:
+        children_map = load_tree()
+        tree = serialize(children_map.get(None, []), children_map)
+        cache.set(key, tree, CATEGORY_TREE_CACHE_TIMEOUT)
+    return tree
+
+
+def invalidate_category_tree():
+    bump_generation(CATEGORY_TREE_GENERATION_KEY)
+
+
+def rebuild_category_paths():
+    """Recompute path/depth for every category in memory and write them back in bulk.
+    Needed after Category.objects.bulk_create(), which bypasses save()."""
+    categories = list(Category.objects.only('id', 'parent_id', 'path', 'depth'))
+    children_map = build_children_map(categories)
+    changed = []
+    stack = [(c, '/') for c in children_map.get(None, [])]
+    while stack:
+        category, parent_path = stack.pop()
+        path = f'{parent_path}{category.pk}/'
+        depth = path.count('/') - 2
+        if (category.path, category.depth) != (path, depth):
+            category.path, category.depth = path, depth
+            changed.append(category)
+        stack.extend((child, path) for child in children_map.get(category.pk, []))
+    Category.objects.bulk_update(changed, ['path', 'depth'], batch_size=500)
+    invalidate_category_tree()
+    return len(changed)
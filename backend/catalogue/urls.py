@@ -1,10 +1,19 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
-from .views import CategoryViewSet, ProductViewSet
+from .views import (
+    CategoryViewSet, ProductViewSet, VehicleMakeViewSet, VehicleModelViewSet, VehicleViewSet, PartNumberViewSet,
+    ProductListingViewSet, AutocompleteViewSet
+)
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet)
 router.register(r'products', ProductViewSet, basename='product')
+router.register(r'vehicle-makes', VehicleMakeViewSet)
+router.register(r'vehicle-models', VehicleModelViewSet)
+router.register(r'vehicles', VehicleViewSet)
+router.register(r'part-numbers', PartNumberViewSet, basename='partnumber')
+router.register(r'listings', ProductListingViewSet, basename='listing')
+router.register(r'autocomplete', AutocompleteViewSet, basename='autocomplete')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,11 +1,32 @@
-from rest_framework import viewsets, filters
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_cache_control
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Category, Product, ProductImage
-from .serializers import CategorySerializer, ProductSerializer, ProductImageSerializer
+from .models import Category, Product, ProductImage, VehicleMake, VehicleModel, Vehicle, PartNumber, ProductListing
+from .serializers import (
+    CategorySerializer, ProductSerializer, ProductDetailSerializer, ProductImageSerializer,
+    VehicleMakeSerializer, VehicleModelSerializer, VehicleSerializer, PartNumberSerializer,
+    ProductListingSerializer
+)
+from .partnumbers import lookup_part_numbers
+from .filters import ProductAttributeFilter, ProductFitmentFilter, ProductListingFilter, ProductSearchFilter
+from .attributes import compute_facets
+from .bulk import ProductUpserter, UPSERT_MAX_ROWS
+from .export import EXPORT_FORMATS, export_filename, export_products
+from logs.signals import get_request_ip
+from vendors.models import Vendor
+from . import autocomplete, detail_cache, tree
+from .related import related_products_timestamps
 from vendors.permissions import IsVendorOwner
+from aloauto.pagination import KeysetPagination
+from aloauto.conditional import ConditionalGetMixin, make_etag
+from aloauto.fieldsets import fieldset_queryset, fieldset_requested
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Category.objects.filter(parent=None)
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
@@ -13,20 +34,293 @@ class CategoryViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter]
     search_fields = ['name']
 
-class ProductViewSet(viewsets.ModelViewSet):
+    def serialize_tree(self, roots, children_map):
+        context = self.get_serializer_context()
+        context['children_map'] = children_map
+        return self.get_serializer(roots, many=True, context=context).data
+
+    def get_tree_etag(self, *parts):
+        # The tree generation changes whenever any category is saved or deleted.
+        return make_etag('category-tree', tree.get_tree_generation(), *parts, self.get_request_signature())
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, self.get_tree_etag(), None, self.list_response)
+
+    def list_response(self):
+        request = self.request
+        if request.query_params.get(filters.SearchFilter.search_param):
+            roots = self.filter_queryset(self.get_queryset())
+            data = self.serialize_tree(roots, tree.load_tree())
+        else:
+            # Media URLs are absolute, so cache one tree per host.
+            data = tree.get_category_tree(self.serialize_tree, variant=request.build_absolute_uri('/'))
+        page = self.paginate_queryset(data)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+
+        def respond():
+            context = self.get_serializer_context()
+            context['children_map'] = tree.load_subtree(instance)
+            return Response(self.get_serializer(instance, context=context).data)
+        return self.conditional_response(request, self.get_tree_etag(instance.pk), None, respond)
+
+class ProductViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated, IsVendorOwner]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [
+        DjangoFilterBackend, ProductFitmentFilter, ProductAttributeFilter,
+        ProductSearchFilter, filters.OrderingFilter
+    ]
     filterset_fields = ['category', 'vendor', 'is_active']
-    search_fields = ['name', 'description']
+    search_fields = ['name', 'description'] # Served by the full-text index, see catalogue.search
     ordering_fields = ['price', 'created_at', 'name']
+    pagination_class = KeysetPagination # ?cursor= switches to (created_at, id) keyset pages
+    conditional_related = ('vendor', 'category') # vendor_name / category_name are in the payload
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return ProductDetailSerializer # Adds frequently_bought_together
+        return super().get_serializer_class()
 
     def get_queryset(self):
         if self.request.user.role == 'admin':
-            return Product.objects.all()
+            queryset = Product.objects.all()
         elif self.request.user.role == 'vendor':
-            return Product.objects.filter(vendor__user=self.request.user)
-        return Product.objects.filter(is_active=True)
+            queryset = Product.objects.filter(vendor__user=self.request.user)
+        else:
+            queryset = Product.objects.filter(is_active=True)
+        if self.action in ('list', 'retrieve') and fieldset_requested(self.request):
+            # ?fields= / ?omit= / ?view=: fetch only what is rendered, plus the columns
+            # used for keyset cursors and ETags.
+            if self.action == 'retrieve':
+                return fieldset_queryset(
+                    queryset.select_related('vendor', 'category'), self.get_serializer(),
+                    extra_fields=('updated_at', 'vendor__updated_at', 'category__updated_at')
+                )
+            return fieldset_queryset(queryset, self.get_serializer(), extra_fields=('created_at',))
+        # ProductSerializer reads vendor.company_name, category.name and nests images:
+        # load them up front so a page costs the same number of queries whatever its size.
+        return queryset.select_related('vendor', 'category').prefetch_related('images')
+
+    def get_object_timestamps(self, obj):
+        timestamps = super().get_object_timestamps(obj)
+        if self.action == 'retrieve':
+            timestamps += related_products_timestamps(obj) # frequently_bought_together
+        return timestamps
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag, last_modified = self.get_queryset_validators(queryset)
+        return self.conditional_response(request, etag, last_modified, lambda: self.list_response(queryset))
+
+    def get_object(self):
+        # Products are addressed by id or by slug (/products/plaquettes-bosch-0986/).
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        if str(lookup).isdigit():
+            return super().get_object()
+        obj = get_object_or_404(self.filter_queryset(self.get_queryset()), slug=lookup)
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    def retrieve(self, request, *args, **kwargs):
+        if set(request.query_params) - {'format'}:
+            # Filters or a sparse fieldset: not the cached representation.
+            instance = self.get_object()
+            etag, last_modified = self.get_object_validators(instance)
+            return self.conditional_response(
+                request, etag, last_modified, lambda: Response(self.get_serializer(instance).data)
+            )
+
+        # Read-through cache (catalogue.detail_cache). Reads are allowed to everyone by
+        # IsVendorOwner, so visibility is the only check a cached entry needs.
+        variant = request.build_absolute_uri('/')
+        entry = detail_cache.get_cached_product(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        if entry is not None and detail_cache.can_view(entry, request.user) and variant in entry['variants']:
+            detail_cache.record_hit()
+            data = entry['variants'][variant]
+        else:
+            detail_cache.record_miss()
+            instance = self.get_object()
+            data = self.get_serializer(instance).data
+            entry = detail_cache.build_entry(instance, self.get_object_timestamps(instance), entry)
+            entry['variants'][variant] = data
+            detail_cache.store_product(entry)
+        etag, last_modified = self.validators_from_timestamps(Product._meta.label, entry['pk'], entry['timestamps'])
+        return self.conditional_response(request, etag, last_modified, lambda: Response(data))
+
+    @action(detail=False, methods=['get', 'delete'], url_path='cache-stats')
+    def cache_stats(self, request):
+        """Hit/miss counters of the product detail cache; DELETE resets them."""
+        if request.user.role != 'admin':
+            return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+        if request.method == 'DELETE':
+            detail_cache.reset_stats()
+        return Response(detail_cache.get_stats())
+
+    def list_response(self, queryset):
+        request = self.request
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        else:
+            response = Response(self.get_serializer(queryset, many=True).data)
+
+        # ?facets=1 (all keys) or ?facets=color,size adds attribute counts for the whole result set
+        facets_param = request.query_params.get('facets')
+        if facets_param and isinstance(response.data, dict):
+            keys = None if facets_param in ('1', 'true', 'all') else [k.strip() for k in facets_param.split(',') if k.strip()]
+            response.data['facets'] = compute_facets(queryset, keys)
+        return response
 
     def perform_create(self, serializer):
-        serializer.save(vendor=self.request.user.vendor_profile)
\ No newline at end of file
+        serializer.save(vendor=self.request.user.vendor_profile)
+
+    @action(detail=False, methods=['post'], url_path='bulk-upsert')
+    def bulk_upsert(self, request):
+        """
+        Create or update up to UPSERT_MAX_ROWS products in one request, keyed by SKU.
+        Body: a list of products, or {"products": [...]} (admins add "vendor": <id>).
+        """
+        rows = request.data.get('products') if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list) or not rows:
+            return Response({'error': 'Expected a non-empty list of products.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > UPSERT_MAX_ROWS:
+            return Response({'error': f'At most {UPSERT_MAX_ROWS} products per request.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.user.role == 'vendor':
+            vendor = Vendor.objects.filter(user=request.user).first()
+        elif request.user.role == 'admin' and isinstance(request.data, dict):
+            vendor = Vendor.objects.filter(id=request.data.get('vendor')).first()
+        else:
+            return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+        if vendor is None:
+            return Response({'error': 'Vendor not found.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        upserter = ProductUpserter(vendor, user=request.user, ip_address=get_request_ip(request))
+        results = upserter.upsert(rows)
+        summary = {state: sum(1 for r in results if r['status'] == state) for state in ('created', 'updated', 'error')}
+        return Response({**summary, 'results': results})
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream the products visible to the user (list filters apply) with their images and
+        attributes: ?file_format=csv|jsonl, &gzip=1 to compress. Admins and vendors only.
+        """
+        if request.user.role not in ('admin', 'vendor'):
+            return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+        export_format = request.query_params.get('file_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response({'error': f"file_format must be one of: {', '.join(EXPORT_FORMATS)}."}, status=status.HTTP_400_BAD_REQUEST)
+        compress = request.query_params.get('gzip') in ('1', 'true')
+
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            export_products(queryset, export_format, compress=compress, request=request),
+            content_type='application/gzip' if compress else f'{EXPORT_FORMATS[export_format][0]}; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(export_format, compress)}"'
+        return response
+
+# Vehicle reference data, used to build make -> model -> year selectors.
+# Fitting parts are listed with the fitment filters on ProductViewSet (?vehicle= or ?make=&model=&year=).
+class VehicleMakeViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = VehicleMake.objects.all()
+    serializer_class = VehicleMakeSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    lookup_field = 'slug'
+    pagination_class = None
+    filter_backends = [filters.SearchFilter]
+    search_fields = ['name']
+
+class VehicleModelViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = VehicleModel.objects.select_related('make')
+    serializer_class = VehicleModelSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = None
+    filterset_fields = {'make__slug': ['exact'], 'make': ['exact']}
+
+class VehicleViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Vehicle.objects.select_related('model__make')
+    serializer_class = VehicleSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    filterset_fields = {'model': ['exact'], 'model__slug': ['exact'], 'model__make__slug': ['exact'], 'year': ['exact']}
+
+
+class PartNumberViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Part number lookup: ?q=0 986 494 123 matches the normalized number exactly,
+    add &match=prefix to list every reference starting with it.
+    """
+    serializer_class = PartNumberSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['kind', 'product']
+
+    def get_queryset(self):
+        queryset = PartNumber.objects.select_related('product')
+        user = self.request.user
+        if not (user.is_authenticated and user.role == 'admin'):
+            queryset = queryset.filter(product__is_active=True)
+        if self.action == 'list':
+            query = self.request.query_params.get('q', '')
+            prefix = self.request.query_params.get('match') == 'prefix'
+            queryset = lookup_part_numbers(queryset, query, prefix=prefix)
+        return queryset.order_by('normalized', 'product_id')
+
+
+class ListingKeysetPagination(KeysetPagination):
+    ordering = ('-created_at', '-product')
+
+
+class ProductListingViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Public catalogue listing, read from the denormalized ProductListing table only
+    (no joins): filters by category subtree, vendor, price, stock, vehicle fitment
+    and attributes, ordering by price, name or date.
+    """
+    serializer_class = ProductListingSerializer
+    permission_classes = [AllowAny]
+    filter_backends = [ProductListingFilter, ProductFitmentFilter, ProductAttributeFilter, filters.OrderingFilter]
+    ordering_fields = ['price', 'created_at', 'name']
+    pagination_class = ListingKeysetPagination
+    lookup_field = 'slug'
+
+    def get_queryset(self):
+        return ProductListing.objects.filter(is_active=True).order_by('-created_at', '-product')
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag, last_modified = self.get_queryset_validators(queryset)
+        return self.conditional_response(request, etag, last_modified, lambda: self.list_response(queryset))
+
+    def list_response(self, queryset):
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data)
+
+
+class AutocompleteViewSet(viewsets.ViewSet):
+    """
+    Typeahead: ?q=plaq&limit=10 returns the products, categories and vendors whose name
+    (or the product SKU) has a word starting with the query, most ordered first.
+    Answers come from the AutocompleteTerm index and are cached per query.
+    """
+    permission_classes = [AllowAny]
+
+    def list(self, request):
+        query = request.query_params.get('q', '').strip()
+        try:
+            limit = int(request.query_params.get('limit', autocomplete.AUTOCOMPLETE_DEFAULT_LIMIT))
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, autocomplete.AUTOCOMPLETE_MAX_LIMIT))
+        response = Response({'query': query, 'results': autocomplete.cached_lookup(query, limit)})
+        # Same answer for everyone: let browsers and proxies keep it briefly.
+        patch_cache_control(response, public=True, max_age=60)
+        return response
@@ -41,10 +41,10 @@ class ERPSyncLogAdmin(admin.ModelAdmin):
 
 @admin.register(FileUploadLog)
 class FileUploadLogAdmin(admin.ModelAdmin):
-    list_display = ('timestamp', 'original_file_name', 'file_type', 'status', 'uploaded_by_display', 'processed_rows', 'error_rows')
-    list_filter = ('file_type', 'status', 'timestamp', 'uploaded_by__email') # Filter by email
+    list_display = ('timestamp', 'original_file_name', 'file_type', 'import_type', 'status', 'uploaded_by_display', 'processed_rows', 'error_rows')
+    list_filter = ('file_type', 'import_type', 'status', 'timestamp', 'uploaded_by__email') # Filter by email
     search_fields = ('original_file_name', 'file_name', 'uploaded_by__email', 'error_details__icontains')
-    readonly_fields = ('timestamp', 'file_name', 'original_file_name', 'file_type', 'status',
+    readonly_fields = ('timestamp', 'file_name', 'original_file_name', 'file_type', 'import_type', 'status',
                        'processed_rows', 'error_rows', 'error_details_pretty', 'uploaded_by_display_detail')
 
     def uploaded_by_display(self, obj):
@@ -65,7 +65,7 @@ class FileUploadLogAdmin(admin.ModelAdmin):
     error_details_pretty.short_description = 'Error Details (Formatted)'
 
     fieldsets = (
-        (None, {'fields': ('timestamp', 'original_file_name', 'file_name', 'file_type', 'status', 'uploaded_by_display_detail')}),
+        (None, {'fields': ('timestamp', 'original_file_name', 'file_name', 'file_type', 'import_type', 'status', 'uploaded_by_display_detail')}),
         ('Processing Stats', {'fields': ('processed_rows', 'error_rows')}),
         ('Formatted Error Details', {'fields': ('error_details_pretty',), 'classes': ('collapse',)}),
     )
@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-17 00:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0002_erpsynclog_records_affected_erpsynclog_run_time_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='erpsynclog',
+            index=models.Index(fields=['timestamp', 'id'], name='erpsynclog_timestamp_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fileuploadlog',
+            index=models.Index(fields=['timestamp', 'id'], name='fileuploadlog_timestamp_id_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-17 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0003_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fileuploadlog',
+            name='import_type',
+            field=models.CharField(choices=[('products', 'Products'), ('part_numbers', 'Part Numbers (OEM / cross references)')], default='products', max_length=20),
+        ),
+    ]
@@ -30,6 +30,9 @@ class ERPSyncLog(models.Model):
         verbose_name = "ERP Sync Log"
         verbose_name_plural = "ERP Sync Logs"
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='erpsynclog_timestamp_id_idx'), # Keyset pagination
+        ]
 
     def __str__(self):
         return f"{self.get_sync_type_display()} at {self.timestamp.strftime('%Y-%m-%d %H:%M')} - {self.get_status_display()}"
@@ -41,6 +44,10 @@ class FileUploadLog(models.Model):
         ('excel', 'Excel (XLSX)'),
         # Add other types as needed
     ]
+    IMPORT_TYPE_CHOICES = [
+        ('products', 'Products'),
+        ('part_numbers', 'Part Numbers (OEM / cross references)'),
+    ]
     STATUS_CHOICES = [
         ('uploaded', 'Uploaded'),
         ('validating', 'Validating'),
@@ -55,6 +62,7 @@ class FileUploadLog(models.Model):
     file_name = models.CharField(max_length=255, help_text="Stored file name/path after upload.")
     original_file_name = models.CharField(max_length=255, help_text="Original name of the uploaded file.")
     file_type = models.CharField(max_length=10, choices=FILE_TYPE_CHOICES)
+    import_type = models.CharField(max_length=20, choices=IMPORT_TYPE_CHOICES, default='products')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploaded')
 
     processed_rows = models.PositiveIntegerField(default=0)
@@ -66,6 +74,9 @@ class FileUploadLog(models.Model):
         verbose_name = "File Upload Log"
         verbose_name_plural = "File Upload Logs"
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='fileuploadlog_timestamp_id_idx'), # Keyset pagination
+        ]
 
     def __str__(self):
         user_str = str(self.uploaded_by) if self.uploaded_by else "Unknown user"
@@ -20,6 +20,7 @@ class FileUploadLogSerializer(serializers.ModelSerializer):
             'file_name',
             'original_file_name',
             'file_type',
+            'import_type',
             'status',
             'processed_rows',
             'error_rows',
@@ -1,6 +1,7 @@
 from celery import shared_task
 from .models import ERPSyncLog, FileUploadLog
 from catalogue.models import Product # Corrected import path
+from catalogue.partnumbers import load_part_numbers
 import pandas as pd
 import io
 from django.core.files.storage import default_storage
@@ -77,6 +78,7 @@ def process_uploaded_product_file_task(self, file_upload_log_id, file_content_st
     logger.info(f"Task ID: {self.request.id} - Starting processing for file: {upload_log_entry.original_file_name}, Log ID: {upload_log_entry.id}")
 
     processed_count = 0
+    inserted_count = skipped_count = None # Loaders that skip rows already imported (part numbers)
     error_count = 0
     error_list = []
 
@@ -92,7 +94,20 @@ def process_uploaded_product_file_task(self, file_upload_log_id, file_content_st
                 raise FileNotFoundError(f"File not found at path: {file_path}")
             file_like_obj = default_storage.open(file_path, 'r') # Assuming text mode for CSV
 
-        if upload_log_entry.file_type == 'csv':
+        if upload_log_entry.file_type == 'csv' and upload_log_entry.import_type == 'part_numbers':
+            # Cross references: sku, number[, kind, brand]. Read as text so leading zeros survive.
+            try:
+                df = pd.read_csv(file_like_obj, dtype=str, keep_default_na=False)
+            except Exception as pd_e:
+                raise ValueError(f"Error parsing CSV file: {pd_e}")
+            required_columns = {'sku', 'number'}
+            if not required_columns.issubset(df.columns):
+                raise ValueError(f"CSV missing required columns. Found: {list(df.columns)}, Required minimum: {list(required_columns)}")
+            inserted_count, skipped_count, error_list = load_part_numbers(df.to_dict('records'))
+            processed_count = inserted_count + skipped_count
+            error_count = len(error_list)
+
+        elif upload_log_entry.file_type == 'csv':
             try:
                 # Assuming CSV has headers: sku, name, description, price, stock_quantity, category_slug, vendor_id
                 # This is a placeholder; actual column names and mapping logic would be more complex.
@@ -141,7 +156,13 @@ def process_uploaded_product_file_task(self, file_upload_log_id, file_content_st
         else:
             upload_log_entry.status = 'completed'
 
-        upload_log_entry.message = f"Processed file {upload_log_entry.original_file_name}. {processed_count} rows processed, {error_count} errors."
+        if skipped_count is None:
+            upload_log_entry.message = f"Processed file {upload_log_entry.original_file_name}. {processed_count} rows processed, {error_count} errors."
+        else:
+            upload_log_entry.message = (
+                f"Processed file {upload_log_entry.original_file_name}. {inserted_count} rows inserted, "
+                f"{skipped_count} already present, {error_count} errors."
+            )
         logger.info(f"Task ID: {self.request.id} - Finished processing for file: {upload_log_entry.original_file_name}. Status: {upload_log_entry.status}")
 
     except FileNotFoundError as fnf_e:
@@ -1,6 +1,7 @@
 from rest_framework import viewsets, permissions, status as http_status, parsers
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from aloauto.pagination import KeysetPagination
 from .models import ERPSyncLog, FileUploadLog
 from .serializers import ERPSyncLogSerializer, FileUploadLogSerializer
 from .tasks import process_uploaded_product_file_task
@@ -17,15 +18,21 @@ class IsAdminUser(permissions.BasePermission):
         return request.user and request.user.is_authenticated and \
                (request.user.is_staff or (hasattr(request.user, 'role') and request.user.role == 'admin'))
 
+class TimestampKeysetPagination(KeysetPagination):
+    # Integration logs have no created_at; they are ordered by their auto_now_add timestamp.
+    ordering = ('-timestamp', '-id')
+
 class ERPSyncLogViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = ERPSyncLog.objects.all().order_by('-timestamp')
     serializer_class = ERPSyncLogSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = TimestampKeysetPagination # ?cursor= switches to (timestamp, id) keyset pages
 
 class FileUploadLogViewSet(viewsets.ModelViewSet):
     queryset = FileUploadLog.objects.all().order_by('-timestamp')
     serializer_class = FileUploadLogSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = TimestampKeysetPagination # ?cursor= switches to (timestamp, id) keyset pages
     # Define parser_classes at the class level if they apply to most actions,
     # or override per action if needed (as done for upload_product_file).
     parser_classes = [parsers.MultiPartParser, parsers.FormParser, parsers.JSONParser]
@@ -37,6 +44,7 @@ class FileUploadLogViewSet(viewsets.ModelViewSet):
     def upload_product_file(self, request):
         file_obj = request.FILES.get('file')
         file_type_param = request.data.get('file_type', '').lower()
+        import_type_param = request.data.get('import_type', 'products').lower()
 
         if not file_obj:
             return Response({'error': 'File not provided.'}, status=http_status.HTTP_400_BAD_REQUEST)
@@ -55,6 +63,9 @@ class FileUploadLogViewSet(viewsets.ModelViewSet):
         if file_type_param not in [choice[0] for choice in FileUploadLog.FILE_TYPE_CHOICES]:
             return Response({'error': f'Unsupported file type: {file_type_param}. Supported: {[c[0] for c in FileUploadLog.FILE_TYPE_CHOICES]}'}, status=http_status.HTTP_400_BAD_REQUEST)
 
+        if import_type_param not in [choice[0] for choice in FileUploadLog.IMPORT_TYPE_CHOICES]:
+            return Response({'error': f'Unsupported import type: {import_type_param}. Supported: {[c[0] for c in FileUploadLog.IMPORT_TYPE_CHOICES]}'}, status=http_status.HTTP_400_BAD_REQUEST)
+
         # Path for saving: integrations/uploads/filename_with_uuid.ext
         # default_storage.save handles the MEDIA_ROOT internally.
         upload_subdir = os.path.join('integrations', 'uploads')
@@ -73,6 +84,7 @@ class FileUploadLogViewSet(viewsets.ModelViewSet):
             original_file_name=original_filename,
             file_name=saved_file_path,
             file_type=file_type_param,
+            import_type=import_type_param,
             status='uploaded',
             uploaded_by=request.user if request.user.is_authenticated else None
         )
@@ -16,4 +16,9 @@ class Log(models.Model):
     class Meta:
         verbose_name = 'Journal'
         verbose_name_plural = 'Journaux'
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='log_created_idx'), # Default ordering
+            models.Index(fields=['action', 'created_at'], name='log_action_created_idx'),
+            models.Index(fields=['user', 'created_at'], name='log_user_created_idx'),
+        ]
\ No newline at end of file
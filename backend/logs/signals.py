@@ -40,6 +40,15 @@ def log_action(user_obj, action_description, details_dict=None, ip_address=None)
         ip_address=ip_address
     )
 
+def bulk_log_actions(user_obj, entries, ip_address=None, batch_size=1000):
+    # Same rows as log_action, for bulk operations: `entries` is a list of
+    # (action_description, details_dict) written with one INSERT per batch.
+    user = user_obj if user_obj and user_obj.is_authenticated else None
+    Log.objects.bulk_create([
+        Log(user=user, action=action, details=details if details is not None else {}, ip_address=ip_address)
+        for action, details in entries
+    ], batch_size=batch_size)
+
 @receiver(user_logged_in)
 def log_user_login(sender, request, user, **kwargs): # 'request' and 'user' are standard args for this signal
     ip = get_request_ip(request)
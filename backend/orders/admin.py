@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, OrderItem, Cart, CartItem, Wishlist
+from .models import Order, OrderItem, Cart, CartItem, StockReservation, VendorOrder, Wishlist
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -75,3 +75,17 @@ class WishlistAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'created_at')
     filter_horizontal = ('products',)
     readonly_fields = ('created_at', 'updated_at')
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'product', 'quantity', 'status', 'cart', 'order', 'expires_at')
+    list_filter = ('status',)
+    raw_id_fields = ('cart', 'user', 'product', 'order')
+    readonly_fields = ('created_at', 'updated_at')
+
+@admin.register(VendorOrder)
+class VendorOrderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'order', 'vendor', 'status', 'subtotal', 'item_count', 'created_at')
+    list_filter = ('status',)
+    raw_id_fields = ('order', 'vendor')
+    readonly_fields = ('subtotal', 'item_count', 'created_at', 'updated_at')
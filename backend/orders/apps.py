@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class OrdersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'orders'
+
+    def ready(self):
+        from catalogue.signals import products_bulk_changed
+        from . import signals
+        products_bulk_changed.connect(signals.invalidate_bulk_product_cart_totals, dispatch_uid='orders-bulk-product-cart-totals')
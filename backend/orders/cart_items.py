@@ -0,0 +1,74 @@
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from catalogue.models import Product
+from .cart_totals import invalidate_cart_totals
+from .models import Cart, CartItem
+
+# Cart item writes. A cart holds at most one line per product (unique_cart_product), so
+# adding a product already in the cart raises its quantity instead of adding a line, and
+# setting quantities in bulk is one DELETE for the lines set to 0 and one
+# INSERT ... ON CONFLICT (cart, product) DO UPDATE for the others, whatever their number.
+# Both bypass post_save, hence the explicit cart totals invalidation. Additions lock the
+# cart row first, like checkout and guest cart merges, so they queue behind a merge
+# instead of being overwritten by its absolute quantities.
+
+
+class UnknownProducts(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f"Unknown or inactive products {self.product_ids}")
+
+
+def check_products(product_ids, using=DEFAULT_DB_ALIAS):
+    found = set(Product.objects.using(using).filter(pk__in=product_ids, is_active=True).values_list('pk', flat=True))
+    if found != set(product_ids):
+        raise UnknownProducts(set(product_ids) - found)
+
+
+def lock_cart(cart, using=DEFAULT_DB_ALIAS):
+    # A no-op on SQLite, which serializes writers anyway.
+    Cart.objects.using(using).select_for_update().filter(pk=cart.pk).values_list('pk', flat=True).first()
+
+
+def add_cart_item(cart, product_id, quantity=1, using=DEFAULT_DB_ALIAS):
+    """Add `quantity` units of a product to `cart`. Returns (item, created)."""
+    check_products([product_id], using)
+    lines = CartItem.objects.using(using).filter(cart=cart, product_id=product_id)
+    with transaction.atomic(using=using):
+        lock_cart(cart, using)
+        if not lines.update(quantity=F('quantity') + quantity, updated_at=timezone.now()):
+            try:
+                with transaction.atomic(using=using):
+                    item = CartItem.objects.using(using).create(cart=cart, product_id=product_id, quantity=quantity)
+                return item, True
+            except IntegrityError: # Added concurrently: fall back to the increment
+                lines.update(quantity=F('quantity') + quantity, updated_at=timezone.now())
+        invalidate_cart_totals([cart.pk], using=using)
+    return lines.select_related('product').get(), False
+
+
+def set_cart_items(cart, quantities, replace=False, using=DEFAULT_DB_ALIAS):
+    """
+    Set the quantity of every product in `quantities` ({product_id: quantity}) in one
+    transaction; 0 removes the line. With `replace`, lines of other products are removed too.
+    """
+    kept = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+    removed = [product_id for product_id, quantity in quantities.items() if quantity <= 0]
+    if kept:
+        check_products(kept, using)
+    with transaction.atomic(using=using):
+        lines = CartItem.objects.using(using).filter(cart=cart)
+        if replace:
+            lines.exclude(product_id__in=kept).delete()
+        elif removed:
+            lines.filter(product_id__in=removed).delete()
+        if kept:
+            now = timezone.now()
+            CartItem.objects.using(using).bulk_create(
+                [CartItem(cart=cart, product_id=product_id, quantity=quantity, updated_at=now) for product_id, quantity in kept.items()],
+                update_conflicts=True,
+                unique_fields=['cart', 'product'],
+                update_fields=['quantity', 'updated_at'],
+            )
+        invalidate_cart_totals([cart.pk], using=using)
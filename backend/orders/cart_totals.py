@@ -0,0 +1,73 @@
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from .models import CartItem
+
+# Cart totals (line count, item count, subtotal, shipping weight), computed by one
+# aggregate query over the cart's items joined with their products and cached per cart,
+# so the cart badge and mini-cart never load or serialize the products themselves.
+# orders.signals deletes a cart's entry when one of its items changes and the entries of
+# every cart holding a product whose price or weight changes.
+CART_TOTALS_CACHE_KEY = 'orders:cart-totals:{pk}'
+CART_TOTALS_CACHE_TIMEOUT = 60 * 60
+CENT = Decimal('0.01')
+
+
+def empty_totals():
+    return {'lines': 0, 'item_count': 0, 'subtotal': Decimal('0.00'), 'weight': Decimal('0.00')}
+
+
+def compute_cart_totals(cart_ids, using=DEFAULT_DB_ALIAS):
+    """{cart id: totals} for `cart_ids`, in one query."""
+    amount = DecimalField(max_digits=14, decimal_places=2)
+    rows = (
+        CartItem.objects.using(using).filter(cart_id__in=cart_ids).order_by().values('cart_id')
+        .annotate(
+            lines=Count('id'),
+            item_count=Sum('quantity'),
+            subtotal=Sum(F('quantity') * F('product__price'), output_field=amount),
+            weight=Sum(F('quantity') * F('product__weight'), output_field=amount), # Products without a weight count as 0
+        )
+    )
+    totals = {cart_id: empty_totals() for cart_id in cart_ids}
+    for row in rows:
+        totals[row['cart_id']] = {
+            'lines': row['lines'],
+            'item_count': row['item_count'],
+            'subtotal': Decimal(row['subtotal']).quantize(CENT),
+            'weight': Decimal(row['weight'] or 0).quantize(CENT),
+        }
+    return totals
+
+
+def get_cart_totals(cart_ids, using=DEFAULT_DB_ALIAS):
+    """Cached totals of `cart_ids`; the missing ones are computed together and stored."""
+    keys = {cart_id: CART_TOTALS_CACHE_KEY.format(pk=cart_id) for cart_id in cart_ids}
+    cached = cache.get_many(keys.values())
+    totals = {cart_id: cached[key] for cart_id, key in keys.items() if key in cached}
+    missing = [cart_id for cart_id in keys if cart_id not in totals]
+    if missing:
+        computed = compute_cart_totals(missing, using=using)
+        cache.set_many({keys[cart_id]: value for cart_id, value in computed.items()}, CART_TOTALS_CACHE_TIMEOUT)
+        totals.update(computed)
+    return totals
+
+
+def invalidate_cart_totals(cart_ids, using=DEFAULT_DB_ALIAS):
+    keys = [CART_TOTALS_CACHE_KEY.format(pk=cart_id) for cart_id in set(cart_ids)]
+    if keys:
+        cache.delete_many(keys)
+        # Again once committed, so a read racing the transaction cannot leave stale totals behind.
+        transaction.on_commit(lambda: cache.delete_many(keys), using=using)
+
+
+def invalidate_product_carts(product_ids, using=DEFAULT_DB_ALIAS, batch_size=500):
+    product_ids = list(product_ids)
+    cart_ids = set()
+    for start in range(0, len(product_ids), batch_size):
+        cart_ids.update(
+            CartItem.objects.using(using).filter(product_id__in=product_ids[start:start + batch_size])
+            .values_list('cart_id', flat=True).distinct()
+        )
+    invalidate_cart_totals(cart_ids, using=using)
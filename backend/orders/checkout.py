@@ -0,0 +1,95 @@
+from decimal import Decimal
+from django.db import DEFAULT_DB_ALIAS, transaction
+from accounts.models import Address
+from .cart_items import lock_cart
+from .models import CartItem, Order, OrderItem
+from .reservations import commit_reservations, release_reservations, reserve_stock
+from .signals import order_items_created
+
+# Cart -> Order conversion. Everything happens in one transaction with a fixed number of
+# queries, whatever the number of lines: the cart row is locked, its lines are read joined
+# with their products, stock is reserved with one conditional UPDATE (orders.reservations),
+# the order and all its lines are inserted with one INSERT each, and the cart is emptied
+# with one DELETE. Prices and addresses are copied onto the order, so later catalogue or
+# address book edits never change what was bought.
+
+
+class CheckoutError(Exception):
+    def __init__(self, detail):
+        self.detail = detail
+        super().__init__(detail)
+
+
+def format_address(address):
+    if address is None:
+        return None
+    return f"{address.street}, {address.city}, {address.state}, {address.postal_code}, {address.country}"
+
+
+def checkout_cart(cart, user, shipping_address_id, payment_method, billing_address_id=None,
+                  shipping_method=None, notes='', using=DEFAULT_DB_ALIAS):
+    """
+    Turn `cart` into a new Order for `user`. Raises CheckoutError for an invalid cart or
+    address and reservations.InsufficientStock when a product ran out; nothing is written then.
+    """
+    billing_address_id = billing_address_id or shipping_address_id
+    with transaction.atomic(using=using):
+        # Concurrent checkouts, merges and additions on the same cart wait here.
+        lock_cart(cart, using)
+
+        addresses = {
+            address.pk: address
+            for address in Address.objects.using(using).filter(user=user, pk__in={shipping_address_id, billing_address_id})
+        }
+        if shipping_address_id not in addresses or billing_address_id not in addresses:
+            raise CheckoutError({'shipping_address': ['Unknown address.']} if shipping_address_id not in addresses
+                                else {'billing_address': ['Unknown address.']})
+
+        lines = list(
+            CartItem.objects.using(using).filter(cart=cart).order_by('id')
+            .values_list('product_id', 'quantity', 'product__price', 'product__is_active', 'product__name')
+        )
+        if not lines:
+            raise CheckoutError({'cart': ['The cart is empty.']})
+        unavailable = sorted({name for _, _, _, is_active, name in lines if not is_active})
+        if unavailable:
+            raise CheckoutError({'cart': [f'No longer available: {", ".join(unavailable)}.']})
+
+        # Lines of the same product are merged into one order line.
+        merged = {}
+        for product_id, quantity, price, _, _ in lines:
+            merged[product_id] = (merged.get(product_id, (0, price))[0] + quantity, price)
+        total = sum((price * quantity for quantity, price in merged.values()), Decimal('0'))
+
+        # A previous hold on this cart (carts/<id>/reserve/) is replaced by the final one.
+        release_reservations(cart=cart, using=using)
+        reservations = reserve_stock(
+            [(product_id, quantity) for product_id, (quantity, _) in merged.items()], cart=cart, user=user, using=using
+        )
+
+        order = Order.objects.using(using).create(
+            user=user,
+            status='new',
+            total_amount=total,
+            shipping_address=addresses[shipping_address_id],
+            billing_address=addresses[billing_address_id],
+            shipping_address_snapshot=format_address(addresses[shipping_address_id]),
+            billing_address_snapshot=format_address(addresses[billing_address_id]),
+            payment_method=payment_method,
+            shipping_method=shipping_method,
+            notes=notes or '',
+        )
+        OrderItem.objects.using(using).bulk_create([
+            OrderItem(
+                order=order, product_id=product_id, quantity=quantity,
+                unit_price=price, price_at_purchase=price, total_price=price * quantity,
+            )
+            for product_id, (quantity, price) in merged.items()
+        ])
+        if not commit_reservations(reservations, order, using=using):
+            # Released or expired by a concurrent sweep: raising rolls the order back.
+            raise CheckoutError({'cart': ['The stock reservation expired, please try again.']})
+        CartItem.objects.using(using).filter(cart=cart).delete()
+        # Writes the vendor sub-orders (orders.vendor_orders) in the same transaction.
+        order_items_created.send(sender=OrderItem, order=order, product_ids=list(merged), using=using)
+    return order
@@ -0,0 +1,155 @@
+import secrets
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from catalogue.models import Product
+from .cart_items import check_products, lock_cart, set_cart_items
+from .models import Cart, CartItem
+
+# Guest carts live in the cache (Redis in production, local memory in development and
+# tests) under an opaque token, as {product_id: quantity}; every write renews the TTL and
+# abandoned carts simply expire, so browsing without an account never writes to the
+# database. On login (GuestCartTokenObtainPairSerializer or carts/merge_guest/) the entry
+# is claimed with cache.delete(), which only one caller can win, and its quantities are
+# added to the user's Cart in one transaction, with the cart row locked.
+# A write reads the entry, edits it and sets it back; writes to the same cart (two tabs,
+# mobile retries) are serialized by a per-token lock taken with cache.add(), so none of
+# them is lost. The lock expires on its own if its holder dies.
+GUEST_CART_CACHE_KEY = 'orders:guest-cart:{token}'
+GUEST_CART_LOCK_KEY = 'orders:guest-cart-lock:{token}'
+GUEST_CART_TTL = 60 * 60 * 24 * 14
+GUEST_CART_MAX_LINES = 100
+GUEST_CART_LOCK_TIMEOUT = 10
+GUEST_CART_LOCK_WAIT = 2 # Seconds a write waits for the lock before giving up
+CENT = Decimal('0.01')
+
+
+class GuestCartFull(Exception):
+    pass
+
+
+class GuestCartNotFound(Exception):
+    pass
+
+
+class GuestCartBusy(Exception):
+    pass
+
+
+def _key(token):
+    return GUEST_CART_CACHE_KEY.format(token=token)
+
+
+def create_guest_cart():
+    token = secrets.token_urlsafe(24)
+    cache.set(_key(token), {}, GUEST_CART_TTL)
+    return token
+
+
+def get_guest_cart(token):
+    """{product_id: quantity} of the guest cart, or None if it does not exist (or expired)."""
+    return cache.get(_key(token)) if token else None
+
+
+@contextmanager
+def _locked(token):
+    key, owner = GUEST_CART_LOCK_KEY.format(token=token), secrets.token_hex(8)
+    deadline = time.monotonic() + GUEST_CART_LOCK_WAIT
+    while not cache.add(key, owner, GUEST_CART_LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            raise GuestCartBusy("The guest cart is being updated, please retry")
+        time.sleep(0.05)
+    try:
+        yield
+    finally:
+        if cache.get(key) == owner: # Not expired and taken over meanwhile
+            cache.delete(key)
+
+
+def _update(token, update):
+    with _locked(token):
+        items = get_guest_cart(token)
+        if items is None:
+            raise GuestCartNotFound(token)
+        items = update(dict(items))
+        if len(items) > GUEST_CART_MAX_LINES:
+            raise GuestCartFull(f"A guest cart holds at most {GUEST_CART_MAX_LINES} products")
+        cache.set(_key(token), items, GUEST_CART_TTL)
+    return items
+
+
+def add_guest_cart_item(token, product_id, quantity=1):
+    """Add `quantity` units of a product to the guest cart; returns the cart's items."""
+    check_products([product_id])
+
+    def update(items):
+        items[product_id] = items.get(product_id, 0) + quantity
+        return items
+    return _update(token, update)
+
+
+def set_guest_cart_items(token, quantities, replace=False):
+    """Set many quantities (0 removes the line); `replace` also drops the unlisted lines."""
+    kept = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+    if kept:
+        check_products(kept)
+
+    def update(items):
+        items = {} if replace else {product_id: quantity for product_id, quantity in items.items() if product_id not in quantities}
+        items.update(kept)
+        return items
+    return _update(token, update)
+
+
+def delete_guest_cart(token):
+    return cache.delete(_key(token))
+
+
+def guest_cart_lines(items):
+    """Lines and totals of a guest cart, from one query on the products still buyable."""
+    products = Product.objects.filter(pk__in=items, is_active=True).order_by('pk').values('pk', 'name', 'slug', 'price', 'weight')
+    lines, subtotal, weight = [], Decimal('0'), Decimal('0')
+    for product in products:
+        quantity = items[product['pk']]
+        lines.append({
+            'product_id': product['pk'], 'name': product['name'], 'slug': product['slug'],
+            'price': product['price'], 'quantity': quantity, 'total_price': product['price'] * quantity,
+        })
+        subtotal += product['price'] * quantity
+        weight += (product['weight'] or 0) * quantity
+    totals = {
+        'lines': len(lines), 'item_count': sum(line['quantity'] for line in lines),
+        'subtotal': subtotal.quantize(CENT), 'weight': Decimal(weight).quantize(CENT),
+    }
+    return lines, totals
+
+
+def merge_guest_cart(token, user, using=DEFAULT_DB_ALIAS):
+    """
+    Add the guest cart's quantities to `user`'s cart and drop the guest cart. Returns the
+    user's Cart, or None if there was nothing to merge (unknown, expired or already merged).
+    Products that can no longer be bought are left out.
+    """
+    with _locked(token): # A write in progress is not lost with the claimed entry
+        items = get_guest_cart(token)
+        if items is None or not delete_guest_cart(token): # Someone else claimed it first
+            return None
+    try:
+        with transaction.atomic(using=using):
+            cart, _ = Cart.objects.using(using).get_or_create(user=user)
+            # Concurrent additions to the cart wait until the quantities below are written,
+            # so none is lost between the read and the upsert.
+            lock_cart(cart, using)
+            buyable = set(Product.objects.using(using).filter(pk__in=items, is_active=True).values_list('pk', flat=True))
+            existing = dict(
+                CartItem.objects.using(using).filter(cart=cart, product_id__in=buyable).values_list('product_id', 'quantity')
+            )
+            quantities = {product_id: existing.get(product_id, 0) + quantity for product_id, quantity in items.items() if product_id in buyable}
+            if quantities:
+                set_cart_items(cart, quantities, using=using)
+    except Exception:
+        cache.set(_key(token), items, GUEST_CART_TTL) # Give the guest cart back so the merge can be retried
+        raise
+    return cart
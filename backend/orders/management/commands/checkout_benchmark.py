@@ -0,0 +1,152 @@
+import statistics
+import threading
+import time
+import uuid
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.test.utils import CaptureQueriesContext
+from accounts.models import Address, User
+from catalogue.models import Category, Product
+from orders.checkout import checkout_cart
+from orders.models import Cart, CartItem, Order, OrderItem, StockReservation
+from orders.reservations import InsufficientStock
+from vendors.models import Vendor
+
+class Command(BaseCommand):
+    help = 'Benchmarks concurrent checkouts on scratch data: queries per checkout, latency, throughput and stock consistency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=20, help='Concurrent checkouts.')
+        parser.add_argument('--lines', type=int, default=10, help='Products in each cart.')
+        parser.add_argument('--stock', type=int, help='Units of each product (default: one per buyer, so every checkout fits).')
+        parser.add_argument('--keep', action='store_true', help='Keep the scratch users, products and orders afterwards.')
+
+    def handle(self, *args, **options):
+        buyers, lines = options['buyers'], options['lines']
+        if buyers < 1 or lines < 1:
+            raise CommandError('--buyers and --lines must be positive.')
+        stock = buyers if options['stock'] is None else options['stock']
+        tag = uuid.uuid4().hex[:8]
+        scratch = self.create_scratch_data(tag, buyers + 2, lines, stock)
+        try:
+            self.check_query_count(scratch, lines)
+            self.run_concurrent(scratch, buyers, lines)
+        finally:
+            if not options['keep']:
+                self.delete_scratch_data(scratch)
+
+    def create_scratch_data(self, tag, user_count, lines, stock):
+        vendor_user = User.objects.create_user(username=f'bench-vendor-{tag}', password=None, role='vendor')
+        vendor = Vendor.objects.create(user=vendor_user, company_name=f'Bench {tag}', tax_number=f'BENCH-{tag}', status='active')
+        category = Category.objects.create(name=f'Bench {tag}', slug=f'bench-{tag}')
+        products = [
+            Product.objects.create(
+                vendor=vendor, category=category, name=f'Bench product {tag} {i}', slug=f'bench-{tag}-{i}',
+                description='Checkout benchmark', price=Decimal('10.00') + i, stock_quantity=stock + 2, # check_query_count() takes 2
+            )
+            for i in range(lines)
+        ]
+        users = User.objects.bulk_create([
+            User(username=f'bench-buyer-{tag}-{i}', role='buyer') for i in range(user_count)
+        ])
+        addresses = Address.objects.bulk_create([
+            Address(user=user, street='1 Rue du Test', city='Tunis', state='Tunis', postal_code='1000', country='Tunisie')
+            for user in users
+        ])
+        carts = Cart.objects.bulk_create([Cart(user=user) for user in users])
+        return {
+            'users': [vendor_user] + users, 'category': category, 'products': products,
+            'buyers': list(zip(users, addresses, carts)), 'stock': stock,
+        }
+
+    def fill_cart(self, cart, products):
+        CartItem.objects.bulk_create([CartItem(cart=cart, product=product, quantity=1) for product in products])
+
+    def check_query_count(self, scratch, lines):
+        # Two buyers are set aside: one checks out a single product, the other the full cart.
+        counts = {}
+        for (user, address, cart), size in zip(scratch['buyers'][-2:], (1, lines)):
+            self.fill_cart(cart, scratch['products'][:size])
+            with CaptureQueriesContext(connection) as context:
+                checkout_cart(cart, user, shipping_address_id=address.pk, payment_method='cash')
+            counts[size] = len(context.captured_queries)
+        self.stdout.write(f"Queries per checkout: {counts[1]} for 1 line, {counts[lines]} for {lines} lines.")
+        if counts[1] != counts[lines]:
+            raise CommandError('The number of queries depends on the cart size.')
+
+    def run_concurrent(self, scratch, buyers, lines):
+        products = scratch['products']
+        product_ids = [product.pk for product in products]
+        Product.objects.filter(pk__in=product_ids).update(stock_quantity=scratch['stock']) # Undo check_query_count()
+        initial = dict(Product.objects.filter(pk__in=product_ids).values_list('pk', 'stock_quantity'))
+        for _, _, cart in scratch['buyers'][:buyers]:
+            self.fill_cart(cart, products)
+
+        results = {'ordered': 0, 'insufficient': 0, 'errors': 0}
+        latencies = []
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(buyers)
+
+        def buyer(user, address, cart):
+            start_barrier.wait()
+            try:
+                started, outcome = time.perf_counter(), 'errors'
+                for attempt in range(100): # SQLite serializes writers: retry when the database is locked
+                    try:
+                        checkout_cart(cart, user, shipping_address_id=address.pk, payment_method='cash')
+                        outcome = 'ordered'
+                        break
+                    except InsufficientStock:
+                        outcome = 'insufficient'
+                        break
+                    except OperationalError:
+                        time.sleep(0.005 * (1 + attempt % 10))
+                with lock:
+                    results[outcome] += 1
+                    latencies.append((time.perf_counter() - started) * 1000)
+            finally:
+                connection.close()
+
+        self.stdout.write(f"{buyers} concurrent checkouts of {lines} products, {scratch['stock']} units each...")
+        started = time.monotonic()
+        threads = [threading.Thread(target=buyer, args=entry) for entry in scratch['buyers'][:buyers]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f"{results['ordered']} ordered, {results['insufficient']} refused, {results['errors']} failed in {elapsed:.2f}s "
+            f"({buyers / elapsed:.1f} checkouts/s); latency p50 {statistics.median(latencies):.1f}ms, p95 {p95:.1f}ms."
+        )
+
+        # Every unit that left the stock is on an order line, and no cart that ordered kept its items.
+        final = dict(Product.objects.filter(pk__in=product_ids).values_list('pk', 'stock_quantity'))
+        ordered = {pk: 0 for pk in product_ids}
+        for product_id, quantity in OrderItem.objects.filter(
+            order__user__in=[user for user, _, _ in scratch['buyers'][:buyers]]
+        ).values_list('product_id', 'quantity'):
+            ordered[product_id] += quantity
+        orders = Order.objects.filter(user__in=[user for user, _, _ in scratch['buyers'][:buyers]]).count()
+        consistent = (
+            all(initial[pk] - final[pk] == ordered[pk] for pk in product_ids)
+            and orders == results['ordered']
+            and CartItem.objects.filter(cart__in=[cart for _, _, cart in scratch['buyers'][:buyers]]).count()
+            == (buyers - results['ordered']) * lines
+        )
+        if consistent:
+            self.stdout.write(self.style.SUCCESS('OK: stock, orders and carts agree.'))
+        else:
+            raise CommandError('Stock, orders and carts disagree: units were oversold or lost.')
+
+    def delete_scratch_data(self, scratch):
+        users = scratch['users']
+        Order.objects.filter(user__in=users).delete()
+        StockReservation.objects.filter(product__in=scratch['products']).delete()
+        Product.objects.filter(pk__in=[product.pk for product in scratch['products']]).delete()
+        scratch['category'].delete()
+        User.objects.filter(pk__in=[user.pk for user in users]).delete()
@@ -4,6 +4,7 @@ from faker import Faker
 from accounts.models import User
 from catalogue.models import Product
 from orders.models import Cart, CartItem, Wishlist, Order, OrderItem
+from orders.signals import order_items_created
 import random
 
 class Command(BaseCommand):
@@ -221,6 +222,8 @@ class Command(BaseCommand):
 
                 if items_for_this_order_instances:
                     OrderItem.objects.bulk_create(items_for_this_order_instances)
+                    # bulk_create skips post_save: vendor sub-orders and popularity counts listen to this instead
+                    order_items_created.send(sender=OrderItem, order=order, product_ids=[item.product_id for item in items_for_this_order_instances])
                     order_item_count += len(items_for_this_order_instances)
                     order.total_amount = round(current_order_total, 2)
                     order.save()
@@ -0,0 +1,76 @@
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from catalogue.models import Product
+from orders.models import StockReservation
+from orders.reservations import InsufficientStock, release_reservations, reserve_stock
+
+class Command(BaseCommand):
+    help = 'Hammers one product with concurrent stock reservations and checks nothing was oversold'
+
+    def add_arguments(self, parser):
+        parser.add_argument('product', type=int, help='Id of the product to reserve.')
+        parser.add_argument('--buyers', type=int, default=20, help='Concurrent threads.')
+        parser.add_argument('--attempts', type=int, default=10, help='Reservations tried by each buyer.')
+        parser.add_argument('--quantity', type=int, default=1, help='Units per reservation.')
+        parser.add_argument('--set-stock', type=int, help='Reset the product stock to this value first.')
+        parser.add_argument('--keep', action='store_true', help='Keep the reservations (and the stock taken) afterwards.')
+
+    def handle(self, *args, **options):
+        product_id = options['product']
+        if options['set_stock'] is not None:
+            Product.objects.filter(pk=product_id).update(stock_quantity=options['set_stock'])
+        initial = Product.objects.filter(pk=product_id).values_list('stock_quantity', flat=True).first()
+        if initial is None:
+            raise CommandError(f"Product {product_id} does not exist.")
+
+        results = {'reserved': 0, 'insufficient': 0, 'errors': 0}
+        reservation_ids = []
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(options['buyers'])
+
+        def buyer():
+            start_barrier.wait()
+            try:
+                for _ in range(options['attempts']):
+                    outcome, ids = 'errors', []
+                    for _ in range(20): # SQLite serializes writers: retry when the database is locked
+                        try:
+                            ids = [r.pk for r in reserve_stock([(product_id, options['quantity'])])]
+                            outcome = 'reserved'
+                            break
+                        except InsufficientStock:
+                            outcome = 'insufficient'
+                            break
+                        except OperationalError:
+                            time.sleep(0.01)
+                    with lock:
+                        results[outcome] += 1
+                        reservation_ids.extend(ids)
+            finally:
+                connection.close()
+
+        self.stdout.write(f"Product {product_id}: {initial} in stock, {options['buyers']} buyers x {options['attempts']} attempts of {options['quantity']} unit(s)...")
+        started = time.monotonic()
+        threads = [threading.Thread(target=buyer) for _ in range(options['buyers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        final = Product.objects.filter(pk=product_id).values_list('stock_quantity', flat=True).get()
+        reserved_units = sum(StockReservation.objects.filter(pk__in=reservation_ids).values_list('quantity', flat=True))
+        attempts = options['buyers'] * options['attempts']
+        self.stdout.write(
+            f"{results['reserved']} reserved, {results['insufficient']} refused, {results['errors']} failed "
+            f"in {elapsed:.2f}s ({attempts / elapsed:.0f} attempts/s); stock {initial} -> {final}, {reserved_units} units reserved."
+        )
+        consistent = initial - final == reserved_units and final >= 0 and (final < options['quantity'] or not results['insufficient'])
+        if not options['keep']:
+            release_reservations(reservation_ids=reservation_ids)
+        if consistent:
+            self.stdout.write(self.style.SUCCESS('OK: no unit was oversold.'))
+        else:
+            raise CommandError('Stock and reservations disagree: units were oversold or lost.')
@@ -0,0 +1,65 @@
+# Generated by Django 5.0 on 2026-10-17 00:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_vendor_orders(apps, schema_editor):
+    # One aggregate per batch of orders; the table is new, so plain inserts.
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    VendorOrder = apps.get_model('orders', 'VendorOrder')
+    db = schema_editor.connection.alias
+    last_id = 0
+    while True:
+        batch = list(Order.objects.using(db).filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:500])
+        if not batch:
+            return
+        rows = (
+            OrderItem.objects.using(db).filter(order_id__in=batch).order_by()
+            .values('order_id', 'product__vendor_id', 'order__status', 'order__created_at')
+            .annotate(subtotal=Sum('total_price'), item_count=Sum('quantity'))
+        )
+        VendorOrder.objects.using(db).bulk_create([
+            VendorOrder(
+                order_id=row['order_id'], vendor_id=row['product__vendor_id'], status=row['order__status'],
+                subtotal=row['subtotal'], item_count=row['item_count'], created_at=row['order__created_at'],
+            )
+            for row in rows
+        ])
+        last_id = batch[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_hot_query_indexes'),
+        ('vendors', '0002_vendor_address_vendor_contact_email_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('new', 'Nouvelle'), ('confirmed', 'Confirmée'), ('shipped', 'Expédiée'), ('delivered', 'Livrée'), ('cancelled', 'Annulée')], default='new', max_length=20)),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('item_count', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vendor_orders', to='orders.order')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='vendor_orders', to='vendors.vendor')),
+            ],
+            options={
+                'verbose_name': 'Commande vendeur',
+                'verbose_name_plural': 'Commandes vendeur',
+                'indexes': [models.Index(fields=['vendor', 'created_at', 'id'], name='vendororder_vendor_created_idx'), models.Index(fields=['vendor', 'status'], name='vendororder_vendor_status_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='vendororder',
+            constraint=models.UniqueConstraint(fields=('order', 'vendor'), name='unique_vendor_order'),
+        ),
+        migrations.RunPython(backfill_vendor_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0 on 2026-10-17 00:53
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    # Duplicate (cart, product) lines are merged into the oldest one before the constraint is added.
+    CartItem = apps.get_model('orders', 'CartItem')
+    db = schema_editor.connection.alias
+    duplicates = (
+        CartItem.objects.using(db).order_by().values('cart_id', 'product_id')
+        .annotate(lines=Count('id'), quantity=Sum('quantity'), keep=Min('id')).filter(lines__gt=1)
+    )
+    for row in list(duplicates):
+        CartItem.objects.using(db).filter(pk=row['keep']).update(quantity=row['quantity'])
+        CartItem.objects.using(db).filter(cart_id=row['cart_id'], product_id=row['product_id']).exclude(pk=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0015_hot_query_indexes'),
+        ('orders', '0007_vendororder'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'product'), name='unique_cart_product'),
+        ),
+    ]
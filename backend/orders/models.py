@@ -14,6 +14,16 @@ class CartItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # One line per product: adding it again raises the quantity (orders.cart_items)
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_product'),
+        ]
+
+    @property
+    def total_price(self):
+        return self.product.price * self.quantity
+
 class Wishlist(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     products = models.ManyToManyField(Product, related_name='wishlists')
@@ -28,6 +38,14 @@ class Order(models.Model):
         ('delivered', 'Livrée'),
         ('cancelled', 'Annulée'),
     )
+    # Allowed status changes (see orders.transitions); delivered and cancelled are final.
+    STATUS_TRANSITIONS = {
+        'new': ('confirmed', 'cancelled'),
+        'confirmed': ('shipped', 'cancelled'),
+        'shipped': ('delivered', 'cancelled'),
+        'delivered': (),
+        'cancelled': (),
+    }
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='orders')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='new')
@@ -42,6 +60,12 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='order_created_id_idx'), # Keyset pagination
+            models.Index(fields=['user', 'created_at'], name='order_user_created_idx'), # A buyer's orders, newest first
+        ]
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
@@ -49,4 +73,63 @@ class OrderItem(models.Model):
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     price_at_purchase = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text="Price of the item at the time of purchase")
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
-    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Vendor order lookups and per-product order counts join from the product side
+            models.Index(fields=['product', 'order'], name='orderitem_product_order_idx'),
+        ]
+
+
+class VendorOrder(models.Model):
+    # One vendor's share of an order (see orders.vendor_orders), so vendor listings and
+    # dashboards read one indexed table instead of joining order items to products.
+    # created_at is the order's date; status follows the order's.
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='vendor_orders')
+    vendor = models.ForeignKey('vendors.Vendor', on_delete=models.PROTECT, related_name='vendor_orders')
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, default='new')
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    item_count = models.PositiveIntegerField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Commande vendeur'
+        verbose_name_plural = 'Commandes vendeur'
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'vendor'], name='unique_vendor_order'),
+        ]
+        indexes = [
+            models.Index(fields=['vendor', 'created_at', 'id'], name='vendororder_vendor_created_idx'), # Listings, newest first
+            models.Index(fields=['vendor', 'status'], name='vendororder_vendor_status_idx'), # Dashboard counts
+        ]
+
+
+class StockReservation(models.Model):
+    # Units held for a cart during checkout (see orders.reservations). The units are taken
+    # off Product.stock_quantity when the reservation is made and given back if it is
+    # released or expires; a committed reservation has become part of an order.
+    STATUS_CHOICES = (
+        ('active', 'Active'),
+        ('committed', 'Validée'),
+        ('released', 'Libérée'),
+        ('expired', 'Expirée'),
+    )
+
+    cart = models.ForeignKey(Cart, on_delete=models.SET_NULL, null=True, blank=True, related_name='reservations')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='reservations')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Réservation de stock'
+        verbose_name_plural = 'Réservations de stock'
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='reservation_expiry_idx'), # Expiry sweep
+        ]
@@ -0,0 +1,160 @@
+from collections import Counter
+from datetime import timedelta
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Case, F, Q, When
+from django.utils import timezone
+from catalogue.models import Product
+from catalogue.signals import products_stock_changed
+from .models import StockReservation
+
+# Stock reservations held during checkout. Reserving takes the units off
+# Product.stock_quantity right away with one conditional UPDATE:
+#   UPDATE product SET stock_quantity = CASE id WHEN 1 THEN stock_quantity - 2 ... END
+#   WHERE (id = 1 AND stock_quantity >= 2) OR ...
+# The database evaluates the condition and the decrement on the locked row, so two
+# buyers can never both take the last unit; if any product falls short, nothing is
+# reserved. Releasing (or expiring, see release_expired_reservations) gives the units back
+# the same way, and committing attaches the reservation to its order for good.
+RESERVATION_TTL = timedelta(minutes=15)
+EXPIRY_BATCH_SIZE = 500
+
+
+class InsufficientStock(Exception):
+    def __init__(self, shortages, requested=None):
+        # {product_id: units still available}, {product_id: units asked for}
+        self.shortages = shortages
+        self.requested = requested or {}
+        super().__init__(f"Insufficient stock for products {sorted(shortages)}")
+
+
+def stock_shortages(quantities, using=DEFAULT_DB_ALIAS):
+    """{product_id: units available} for the products of `quantities` that have fewer units than asked."""
+    available = dict(Product.objects.using(using).filter(pk__in=quantities).values_list('pk', 'stock_quantity'))
+    return {
+        product_id: available.get(product_id, 0)
+        for product_id, quantity in quantities.items() if available.get(product_id, 0) < quantity
+    }
+
+
+def _adjust_stock(quantities, sign, using, require_stock=False):
+    # One UPDATE for every product in `quantities` ({product_id: units}); returns the row count.
+    if not quantities:
+        return 0
+    condition = Q()
+    for product_id, quantity in quantities.items():
+        condition |= Q(pk=product_id, stock_quantity__gte=quantity) if require_stock else Q(pk=product_id)
+    return Product.objects.using(using).filter(condition).update(
+        stock_quantity=Case(
+            *[When(pk=product_id, then=F('stock_quantity') + sign * quantity) for product_id, quantity in quantities.items()]
+        ),
+        updated_at=timezone.now(),
+    )
+
+
+def _stock_changed(product_ids, using):
+    product_ids = list(product_ids)
+    transaction.on_commit(
+        lambda: products_stock_changed.send(sender=Product, product_ids=product_ids, using=using), using=using
+    )
+
+
+def restock(quantities, using=DEFAULT_DB_ALIAS):
+    """Put units back into stock ({product_id: units}) with one UPDATE; returns the number of products updated."""
+    if not quantities:
+        return 0
+    updated = _adjust_stock(quantities, 1, using)
+    _stock_changed(quantities, using)
+    return updated
+
+
+def reserve_stock(items, cart=None, user=None, ttl=RESERVATION_TTL, using=DEFAULT_DB_ALIAS):
+    """
+    Hold `items` ((product_id, quantity) pairs) for `ttl`. Returns the new reservations,
+    or raises InsufficientStock with what is left of the missing products.
+    """
+    quantities = Counter()
+    for product_id, quantity in items:
+        quantities[product_id] += quantity
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+    if not quantities:
+        return []
+
+    with transaction.atomic(using=using):
+        if _adjust_stock(quantities, -1, using, require_stock=True) != len(quantities):
+            transaction.set_rollback(True, using=using)
+            reservations = None
+        else:
+            expires_at = timezone.now() + ttl
+            reservations = StockReservation.objects.using(using).bulk_create([
+                StockReservation(cart=cart, user=user, product_id=product_id, quantity=quantity, expires_at=expires_at)
+                for product_id, quantity in quantities.items()
+            ])
+            _stock_changed(quantities, using)
+    if reservations is None:
+        # Read after the rollback, so the products that did have enough are not undercounted.
+        # Callers running inside a larger transaction should read stock_shortages(e.requested)
+        # again once it has ended.
+        raise InsufficientStock(stock_shortages(quantities, using), quantities)
+    return reservations
+
+
+def _release(queryset, status, using):
+    """Give back the units of the active reservations in `queryset`; returns how many were released."""
+    with transaction.atomic(using=using):
+        rows = list(
+            queryset.filter(status='active').select_for_update(skip_locked=True)
+            .values_list('pk', 'product_id', 'quantity')
+        )
+        if not rows:
+            return 0
+        quantities = Counter()
+        for _, product_id, quantity in rows:
+            quantities[product_id] += quantity
+        # Conditional on the status so a reservation committed meanwhile is not given back twice.
+        released = StockReservation.objects.using(using).filter(
+            pk__in=[pk for pk, _, _ in rows], status='active'
+        ).update(status=status, updated_at=timezone.now())
+        if released != len(rows):
+            transaction.set_rollback(True, using=using)
+            return 0
+        restock(quantities, using)
+    return released
+
+
+def release_reservations(cart=None, reservation_ids=None, using=DEFAULT_DB_ALIAS):
+    queryset = StockReservation.objects.using(using).all()
+    if cart is not None:
+        queryset = queryset.filter(cart=cart)
+    if reservation_ids is not None:
+        queryset = queryset.filter(pk__in=reservation_ids)
+    return _release(queryset, 'released', using)
+
+
+def release_expired_reservations(batch_size=EXPIRY_BATCH_SIZE, using=DEFAULT_DB_ALIAS):
+    """Expire every overdue active reservation, batch by batch. Returns the number expired."""
+    total = 0
+    while True:
+        overdue = StockReservation.objects.using(using).filter(status='active', expires_at__lte=timezone.now())
+        batch = list(overdue.order_by('expires_at').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return total
+        expired = _release(StockReservation.objects.using(using).filter(pk__in=batch), 'expired', using)
+        if not expired: # Locked by a concurrent sweep or commit
+            return total
+        total += expired
+
+
+def commit_reservations(reservations, order, using=DEFAULT_DB_ALIAS):
+    """
+    Attach active, unexpired reservations to `order`. Returns False (and commits nothing)
+    if any of them expired or was released in the meantime; the caller must then reserve again.
+    """
+    ids = [reservation.pk for reservation in reservations]
+    with transaction.atomic(using=using):
+        committed = StockReservation.objects.using(using).filter(
+            pk__in=ids, status='active', expires_at__gt=timezone.now()
+        ).update(status='committed', order=order, updated_at=timezone.now())
+        if committed != len(ids):
+            transaction.set_rollback(True, using=using)
+            return False
+    return True
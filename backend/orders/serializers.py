@@ -1,8 +1,16 @@
+import logging
 from rest_framework import serializers
-from .models import Cart, CartItem, Order, OrderItem, Wishlist
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .models import Cart, CartItem, Order, OrderItem, StockReservation, VendorOrder, Wishlist
 from catalogue.serializers import ProductSerializer
+from aloauto.fieldsets import SparseFieldsetMixin
+from .cart_totals import get_cart_totals
+from .guest_carts import merge_guest_cart
+from .transitions import TRANSITION_MAX_ORDERS
 
-class CartItemSerializer(serializers.ModelSerializer):
+logger = logging.getLogger(__name__)
+
+class CartItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     product_id = serializers.IntegerField(write_only=True)
     total_price = serializers.DecimalField(
@@ -15,16 +23,36 @@ class CartItemSerializer(serializers.ModelSerializer):
         model = CartItem
         fields = ['id', 'cart', 'product', 'product_id', 'quantity', 'total_price']
         read_only_fields = ['cart']
+        extra_kwargs = {'quantity': {'min_value': 1}}
+
+class CartTotalsSerializer(serializers.Serializer):
+    lines = serializers.IntegerField()
+    item_count = serializers.IntegerField()
+    subtotal = serializers.DecimalField(max_digits=14, decimal_places=2)
+    weight = serializers.DecimalField(max_digits=14, decimal_places=2)
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
-    total = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    total = serializers.SerializerMethodField()
+    totals = serializers.SerializerMethodField()
 
     class Meta:
         model = Cart
-        fields = ['id', 'items', 'total', 'created_at', 'updated_at']
+        fields = ['id', 'items', 'total', 'totals', 'created_at', 'updated_at']
+
+    def _cart_totals(self, cart):
+        # Cached aggregate (orders.cart_totals), shared by both fields
+        if getattr(self, '_totals_cart', None) != cart.pk:
+            self._totals_cart, self._totals = cart.pk, get_cart_totals([cart.pk])[cart.pk]
+        return self._totals
+
+    def get_total(self, cart):
+        return self.get_totals(cart)['subtotal']
 
-class OrderItemSerializer(serializers.ModelSerializer):
+    def get_totals(self, cart):
+        return CartTotalsSerializer(self._cart_totals(cart)).data
+
+class OrderItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     # price_at_purchase = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True) # Ensure it's read-only after creation
 
@@ -42,7 +70,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         read_only_fields = ['product', 'unit_price', 'price_at_purchase', 'total_price']
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     
     class Meta:
@@ -53,9 +81,65 @@ class OrderSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['status', 'total_amount']
 
-class WishlistSerializer(serializers.ModelSerializer):
+class VendorOrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = VendorOrder
+        fields = ['id', 'order', 'vendor', 'status', 'subtotal', 'item_count', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+class CartItemQuantitySerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0) # 0 removes the line
+
+class CartItemsSetSerializer(serializers.Serializer):
+    items = CartItemQuantitySerializer(many=True, allow_empty=False, max_length=500)
+    replace = serializers.BooleanField(default=False) # Remove the lines not listed (full cart sync)
+
+class GuestCartLineSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    name = serializers.CharField()
+    slug = serializers.CharField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    quantity = serializers.IntegerField()
+    total_price = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+class GuestCartTokenObtainPairSerializer(TokenObtainPairSerializer):
+    # Login (api/token/) that also merges the guest cart whose token is sent as `guest_cart`
+    guest_cart = serializers.CharField(required=False, write_only=True)
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        if attrs.get('guest_cart'):
+            # A failed merge must not fail the login: the guest cart is kept for carts/merge_guest/.
+            try:
+                cart = merge_guest_cart(attrs['guest_cart'], self.user)
+            except Exception:
+                logger.exception(f"Could not merge guest cart into the cart of user {self.user.pk}")
+                cart = None
+            data['cart'] = cart.pk if cart is not None else None
+        return data
+
+class OrderTransitionSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=TRANSITION_MAX_ORDERS)
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+    strict = serializers.BooleanField(default=False) # All or nothing
+
+class CheckoutSerializer(serializers.Serializer):
+    shipping_address = serializers.IntegerField()
+    billing_address = serializers.IntegerField(required=False, allow_null=True) # Defaults to the shipping address
+    payment_method = serializers.CharField(max_length=50)
+    shipping_method = serializers.CharField(max_length=50, required=False, allow_null=True, allow_blank=True)
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+
+class WishlistSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     products = ProductSerializer(many=True, read_only=True)
     
     class Meta:
         model = Wishlist
-        fields = ['id', 'products', 'created_at']
\ No newline at end of file
+        fields = ['id', 'products', 'created_at']
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockReservation
+        fields = ['id', 'cart', 'product', 'quantity', 'status', 'order', 'expires_at', 'created_at']
+        read_only_fields = fields
@@ -0,0 +1,50 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver, Signal
+from .cart_totals import invalidate_cart_totals, invalidate_product_carts
+from .vendor_orders import sync_vendor_order_status, sync_vendor_orders
+
+# Sent after order lines are written with bulk_create (checkout), which bypasses
+# post_save. Receivers get the order as `order` and the ordered `product_ids`.
+order_items_created = Signal()
+
+
+# Vendor sub-orders (orders.vendor_orders) follow the order lines and the order status.
+
+@receiver(order_items_created)
+def sync_created_vendor_orders(sender, order, using=None, **kwargs):
+    sync_vendor_orders([order.pk], using=using or DEFAULT_DB_ALIAS)
+
+
+@receiver([post_save, post_delete], sender='orders.OrderItem')
+def sync_order_item_vendor_orders(sender, instance, raw=False, using=None, **kwargs):
+    if raw: # Loading fixtures: the other lines of the order may not be loaded yet
+        return
+    sync_vendor_orders([instance.order_id], using=using or DEFAULT_DB_ALIAS)
+
+
+@receiver(post_save, sender='orders.Order')
+def sync_order_status(sender, instance, created, raw=False, using=None, **kwargs):
+    if created or raw: # No lines yet, or loading fixtures
+        return
+    sync_vendor_order_status(instance, using=using or DEFAULT_DB_ALIAS)
+
+
+# Cached cart totals (orders.cart_totals) are dropped when they may have changed.
+
+@receiver([post_save, post_delete], sender='orders.CartItem')
+def invalidate_cart_item_totals(sender, instance, using=None, **kwargs):
+    invalidate_cart_totals([instance.cart_id], using=using or DEFAULT_DB_ALIAS)
+
+
+@receiver(post_save, sender='catalogue.Product')
+def invalidate_product_cart_totals(sender, instance, created, update_fields=None, using=None, **kwargs):
+    if created or (update_fields is not None and not {'price', 'weight'} & set(update_fields)):
+        return
+    invalidate_product_carts([instance.pk], using=using or DEFAULT_DB_ALIAS)
+
+
+def invalidate_bulk_product_cart_totals(sender, product_ids, using=None, **kwargs):
+    # Connected to catalogue.signals.products_bulk_changed in OrdersConfig.ready(): that
+    # module imports this one, so it cannot be imported back from here.
+    invalidate_product_carts(product_ids, using=using or DEFAULT_DB_ALIAS)
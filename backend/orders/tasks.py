@@ -0,0 +1,12 @@
+from celery import shared_task
+from .reservations import release_expired_reservations
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task(bind=True)
+def release_expired_reservations_task(self):
+    expired = release_expired_reservations()
+    if expired:
+        logger.info(f"Task ID: {self.request.id} - Released {expired} expired stock reservations.")
+    return expired
@@ -1,3 +1,279 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
+from django.core import serializers
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+from aloauto.testing import QueryBudgetMixin
+from accounts.models import Address, User
+from catalogue.models import Category, Product
+from vendors.models import Vendor
+from .cart_items import UnknownProducts, add_cart_item, set_cart_items
+from .checkout import CheckoutError, checkout_cart
+from .guest_carts import (
+    GUEST_CART_LOCK_KEY, GuestCartBusy, add_guest_cart_item, create_guest_cart, get_guest_cart, merge_guest_cart, set_guest_cart_items
+)
+from .models import Cart, CartItem, Order, OrderItem, StockReservation, VendorOrder
+from .reservations import InsufficientStock, release_expired_reservations, release_reservations, reserve_stock
+from .transitions import transition_orders
 
-# Create your tests here.
+
+class OrderTestData:
+    def setUp(self):
+        self.buyer = User.objects.create_user(username='buyer', password='password123', role='buyer')
+        self.admin = User.objects.create_user(username='admin', password='password123', role='admin')
+        self.address = Address.objects.create(
+            user=self.buyer, street='1 rue de la Paix', city='Tunis', state='Tunis', postal_code='1000', country='TN'
+        )
+        self.category = Category.objects.create(name='Freinage', slug='freinage')
+        self.vendor = Vendor.objects.create(
+            user=User.objects.create_user(username='vendor', password='password123', role='vendor'),
+            company_name='Vendor', tax_number='TAX0'
+        )
+        self.cart = Cart.objects.create(user=self.buyer)
+
+    def create_products(self, count, stock=5, prefix=''):
+        return [
+            Product.objects.create(
+                vendor=self.vendor, category=self.category, name=f'Plaquette {prefix}{i}', slug=f'plaquette-{prefix}{i}',
+                description='Plaquettes de frein', price=10, stock_quantity=stock
+            )
+            for i in range(count)
+        ]
+
+    def fill_cart(self, products, quantity=1):
+        CartItem.objects.bulk_create([CartItem(cart=self.cart, product=product, quantity=quantity) for product in products])
+
+    def checkout(self, products, quantity=1):
+        self.fill_cart(products, quantity)
+        return checkout_cart(self.cart, self.buyer, self.address.pk, 'card')
+
+
+class OrderTransitionTests(OrderTestData, APITestCase):
+    def test_cancelling_orders_gives_their_stock_back(self):
+        product, other = self.create_products(2)
+        orders = [self.checkout([product]), self.checkout([product, other], quantity=2)]
+        self.assertEqual(Product.objects.get(pk=product.pk).stock_quantity, 2)
+
+        results = transition_orders([order.pk for order in orders], 'cancelled', user=self.admin)
+        self.assertEqual([result['status'] for result in results], ['updated', 'updated'])
+        self.assertEqual(Product.objects.get(pk=product.pk).stock_quantity, 5)
+        self.assertEqual(Product.objects.get(pk=other.pk).stock_quantity, 5)
+        self.assertFalse(StockReservation.objects.filter(status='committed').exists())
+
+    def test_other_transitions_keep_stock(self):
+        product, = self.create_products(1)
+        order = self.checkout([product], quantity=3)
+        transition_orders([order.pk], 'confirmed', user=self.admin)
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'confirmed')
+        self.assertEqual(Product.objects.get(pk=product.pk).stock_quantity, 2)
+
+    def test_orders_that_took_no_stock_give_none_back(self):
+        product, = self.create_products(1)
+        order = Order.objects.create(user=self.buyer, total_amount=30, payment_method='card')
+        OrderItem.objects.create(order=order, product=product, quantity=3, unit_price=10, total_price=30)
+        transition_orders([order.pk], 'cancelled', user=self.admin)
+        self.assertEqual(Product.objects.get(pk=product.pk).stock_quantity, 5)
+
+    def test_cancelling_a_shipped_order_keeps_stock(self):
+        product, = self.create_products(1)
+        order = self.checkout([product], quantity=3)
+        transition_orders([order.pk], 'confirmed', user=self.admin)
+        transition_orders([order.pk], 'shipped', user=self.admin)
+        transition_orders([order.pk], 'cancelled', user=self.admin)
+        self.assertEqual(Product.objects.get(pk=product.pk).stock_quantity, 2)
+        self.assertEqual(StockReservation.objects.get().status, 'committed')
+
+    def test_cancelled_orders_are_not_restocked_twice(self):
+        product, = self.create_products(1)
+        order = self.checkout([product])
+        transition_orders([order.pk], 'cancelled', user=self.admin)
+        results = transition_orders([order.pk], 'cancelled', user=self.admin)
+        self.assertEqual(results[0]['status'], 'error')
+        self.assertEqual(Product.objects.get(pk=product.pk).stock_quantity, 5)
+
+
+class VendorOrderTests(OrderTestData, APITestCase):
+    def test_checkout_writes_one_vendor_order_per_vendor(self):
+        order = self.checkout(self.create_products(2), quantity=2)
+        vendor_order = VendorOrder.objects.get(order=order)
+        self.assertEqual((vendor_order.vendor, vendor_order.item_count, vendor_order.subtotal), (self.vendor, 4, 40))
+
+    def test_loading_fixtures_does_not_sync_vendor_orders(self):
+        order = self.checkout(self.create_products(1))
+        fixture = serializers.serialize('json', OrderItem.objects.filter(order=order))
+        VendorOrder.objects.all().delete()
+        for item in serializers.deserialize('json', fixture):
+            item.save()
+        self.assertFalse(VendorOrder.objects.exists())
+
+
+class CheckoutTests(OrderTestData, APITestCase):
+    def test_checkout_of_a_product_out_of_stock_writes_nothing(self):
+        product, = self.create_products(1, stock=1)
+        with self.assertRaises(InsufficientStock):
+            self.checkout([product], quantity=2)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.filter(cart=self.cart).count(), 1)
+
+    def test_checkout_with_an_expired_reservation_writes_nothing(self):
+        product, = self.create_products(1)
+        with mock.patch('orders.checkout.commit_reservations', return_value=False):
+            with self.assertRaises(CheckoutError):
+                self.checkout([product], quantity=2)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertEqual(Product.objects.get(pk=product.pk).stock_quantity, 5)
+        self.assertEqual(CartItem.objects.filter(cart=self.cart).count(), 1)
+
+    def test_out_of_stock_response_counts_the_cart_held_units(self):
+        product, = self.create_products(1)
+        self.fill_cart([product], quantity=3)
+        self.client.force_authenticate(self.buyer)
+        self.client.post(f'/api/orders/carts/{self.cart.pk}/reserve/')
+        CartItem.objects.filter(cart=self.cart).update(quantity=6)
+        response = self.client.post(
+            f'/api/orders/carts/{self.cart.pk}/checkout/', {'shipping_address': self.address.pk, 'payment_method': 'card'}
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['available'], {str(product.pk): 2})
+
+
+class CheckoutQueryBudgetTests(QueryBudgetMixin, OrderTestData, APITestCase):
+    def checkout_queries(self, lines):
+        CartItem.objects.filter(cart=self.cart).delete()
+        self.fill_cart(self.create_products(lines, prefix=f'{lines}-'))
+        self.client.force_authenticate(self.buyer)
+        with self.assertQueryBudget('cart-checkout') as queries:
+            response = self.client.post(
+                f'/api/orders/carts/{self.cart.pk}/checkout/', {'shipping_address': self.address.pk, 'payment_method': 'card'}
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['items']), lines)
+        return len(queries)
+
+    def test_checkout_queries_do_not_depend_on_cart_size(self):
+        self.assertEqual(self.checkout_queries(1), self.checkout_queries(8))
+
+
+class CartItemTests(OrderTestData, APITestCase):
+    def items(self):
+        return dict(CartItem.objects.filter(cart=self.cart).values_list('product_id', 'quantity'))
+
+    def test_adding_a_product_twice_raises_its_quantity(self):
+        product, = self.create_products(1)
+        self.assertTrue(add_cart_item(self.cart, product.pk, 2)[1])
+        item, created = add_cart_item(self.cart, product.pk, 3)
+        self.assertFalse(created)
+        self.assertEqual(item.quantity, 5)
+        self.assertEqual(self.items(), {product.pk: 5})
+
+    def test_add_item_answers_201_then_200(self):
+        product, = self.create_products(1)
+        self.client.force_authenticate(self.buyer)
+        url = f'/api/orders/carts/{self.cart.pk}/add_item/'
+        self.assertEqual(self.client.post(url, {'product_id': product.pk, 'quantity': 1}).status_code, 201)
+        self.assertEqual(self.client.post(url, {'product_id': product.pk, 'quantity': 2}).status_code, 200)
+        self.assertEqual(self.items(), {product.pk: 3})
+
+    def test_set_cart_items_upserts_and_removes(self):
+        kept, removed, added = self.create_products(3)
+        self.fill_cart([kept, removed])
+        set_cart_items(self.cart, {kept.pk: 4, removed.pk: 0, added.pk: 1})
+        self.assertEqual(self.items(), {kept.pk: 4, added.pk: 1})
+
+    def test_set_items_with_replace_drops_unlisted_lines(self):
+        kept, dropped = self.create_products(2)
+        self.fill_cart([kept, dropped])
+        self.client.force_authenticate(self.buyer)
+        response = self.client.post(
+            f'/api/orders/carts/{self.cart.pk}/set_items/',
+            {'items': [{'product_id': kept.pk, 'quantity': 2}], 'replace': True}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.items(), {kept.pk: 2})
+
+    def test_unknown_products_change_nothing(self):
+        product, = self.create_products(1)
+        with self.assertRaises(UnknownProducts):
+            set_cart_items(self.cart, {product.pk: 1, product.pk + 1000: 1})
+        self.assertEqual(self.items(), {})
+
+
+class GuestCartTests(OrderTestData, APITestCase):
+    def test_guest_cart_merge_adds_to_the_user_cart(self):
+        kept, added = self.create_products(2)
+        add_cart_item(self.cart, kept.pk, 2)
+        token = create_guest_cart()
+        set_guest_cart_items(token, {kept.pk: 1, added.pk: 3})
+        self.assertEqual(merge_guest_cart(token, self.buyer), self.cart)
+        self.assertEqual(
+            dict(CartItem.objects.filter(cart=self.cart).values_list('product_id', 'quantity')), {kept.pk: 3, added.pk: 3}
+        )
+        self.assertIsNone(merge_guest_cart(token, self.buyer)) # Already merged
+
+    def test_writes_wait_for_the_cart_lock(self):
+        product, = self.create_products(1)
+        token = create_guest_cart()
+        with mock.patch('orders.guest_carts.GUEST_CART_LOCK_WAIT', 0.1):
+            cache.add(GUEST_CART_LOCK_KEY.format(token=token), 'other writer')
+            with self.assertRaises(GuestCartBusy):
+                add_guest_cart_item(token, product.pk)
+            cache.delete(GUEST_CART_LOCK_KEY.format(token=token))
+            self.assertEqual(add_guest_cart_item(token, product.pk, 2), {product.pk: 2})
+        response = self.client.post(f'/api/orders/guest-carts/{token}/add_item/', {'product_id': product.pk, 'quantity': 1})
+        self.assertEqual(response.data['items'][0]['quantity'], 3)
+
+    def test_a_failed_merge_still_logs_in(self):
+        product, = self.create_products(1)
+        token = create_guest_cart()
+        set_guest_cart_items(token, {product.pk: 1})
+        with mock.patch('orders.guest_carts.set_cart_items', side_effect=UnknownProducts([product.pk])):
+            with self.assertLogs('orders.serializers', 'ERROR'):
+                response = self.client.post('/api/token/', {'username': 'buyer', 'password': 'password123', 'guest_cart': token})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data)
+        self.assertIsNone(response.data['cart'])
+        self.assertEqual(get_guest_cart(token), {product.pk: 1}) # Kept for a later merge
+
+
+class ReservationTests(OrderTestData, APITestCase):
+    def stock(self, product):
+        return Product.objects.get(pk=product.pk).stock_quantity
+
+    def test_reserve_is_all_or_nothing(self):
+        plenty, scarce = self.create_products(2)
+        Product.objects.filter(pk=scarce.pk).update(stock_quantity=1)
+        with self.assertRaises(InsufficientStock) as raised:
+            reserve_stock([(plenty.pk, 2), (scarce.pk, 2)], cart=self.cart)
+        self.assertEqual(raised.exception.shortages, {scarce.pk: 1})
+        self.assertEqual(self.stock(plenty), 5)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_release_gives_the_units_back(self):
+        product, = self.create_products(1)
+        reserve_stock([(product.pk, 3)], cart=self.cart)
+        self.assertEqual(self.stock(product), 2)
+        self.assertEqual(release_reservations(cart=self.cart), 1)
+        self.assertEqual(self.stock(product), 5)
+        self.assertEqual(release_reservations(cart=self.cart), 0) # Nothing left to release
+
+    def test_expiry_sweep_releases_overdue_reservations_only(self):
+        overdue, current = self.create_products(2)
+        reserve_stock([(overdue.pk, 2)], cart=self.cart, ttl=timedelta(seconds=-1))
+        reserve_stock([(current.pk, 2)], cart=self.cart)
+        self.assertEqual(release_expired_reservations(), 1)
+        self.assertEqual(self.stock(overdue), 5)
+        self.assertEqual(self.stock(current), 3)
+        self.assertEqual(StockReservation.objects.get(product=overdue).status, 'expired')
+
+    def test_failed_reserve_keeps_the_previous_hold_and_reports_what_is_left(self):
+        product, = self.create_products(1)
+        self.fill_cart([product], quantity=3)
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(self.client.post(f'/api/orders/carts/{self.cart.pk}/reserve/').status_code, 201)
+        CartItem.objects.filter(cart=self.cart).update(quantity=6)
+        response = self.client.post(f'/api/orders/carts/{self.cart.pk}/reserve/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['available'], {str(product.pk): 2})
+        self.assertEqual(self.stock(product), 2)
+        self.assertEqual(StockReservation.objects.get().status, 'active')
@@ -0,0 +1,108 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils import timezone
+from logs.signals import bulk_log_actions
+from .models import Order, StockReservation, VendorOrder
+from .reservations import restock
+
+# Order status changes, following Order.STATUS_TRANSITIONS. Any number of orders moves in
+# one transaction: the orders are read (and locked) with one query, the allowed ones are
+# moved with one UPDATE per batch, guarded on their previous status, their vendor
+# sub-orders follow with one UPDATE, and the audit log gets one INSERT. Orders cancelled
+# before shipping give back the units their committed stock reservations took, with one
+# CASE UPDATE (see orders.reservations); orders that never reserved stock (created through
+# the API, the admin or populate_orders) give nothing back, and shipped goods have left the
+# warehouse, so cancelling them does not restock either. UPDATE skips post_save, so
+# log_order_change is not involved; the log rows carry the same action text.
+TRANSITION_BATCH_SIZE = 1000
+TRANSITION_MAX_ORDERS = 10000
+RESTOCKED_STATUSES = ('new', 'confirmed') # Cancelling from these gives the stock back
+
+
+def allowed_sources(status):
+    """Statuses an order can be moved to `status` from."""
+    return [source for source, targets in Order.STATUS_TRANSITIONS.items() if status in targets]
+
+
+def can_transition(current, status):
+    return status in Order.STATUS_TRANSITIONS.get(current, ())
+
+
+def restock_orders(order_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Give back the units taken by the committed reservations of `order_ids`, which become
+    released. Returns {product_id: units} restocked.
+    """
+    quantities = {}
+    for start in range(0, len(order_ids), TRANSITION_BATCH_SIZE):
+        batch = order_ids[start:start + TRANSITION_BATCH_SIZE]
+        reservations = StockReservation.objects.using(using).filter(order_id__in=batch, status='committed')
+        rows = list(reservations.select_for_update().values_list('pk', 'product_id', 'quantity'))
+        if not rows:
+            continue
+        reservations.filter(pk__in=[pk for pk, _, _ in rows]).update(status='released', updated_at=timezone.now())
+        for _, product_id, quantity in rows:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+    restock(quantities, using)
+    return quantities
+
+
+def transition_orders(order_ids, status, queryset=None, user=None, ip_address=None, strict=False, using=DEFAULT_DB_ALIAS):
+    """
+    Move the orders of `order_ids` (taken from `queryset`, all orders by default) to `status`.
+    Returns one result per id, in input order: {'id', 'status': 'updated'|'error'|'skipped', ...}.
+    With `strict`, nothing is changed unless every order can move (the others are 'skipped').
+    """
+    if status not in Order.STATUS_TRANSITIONS:
+        raise ValueError(f"Unknown order status {status!r}")
+    order_ids = list(dict.fromkeys(order_ids))
+    queryset = (Order.objects.all() if queryset is None else queryset).using(using)
+
+    with transaction.atomic(using=using):
+        current = {}
+        for start in range(0, len(order_ids), TRANSITION_BATCH_SIZE):
+            batch = order_ids[start:start + TRANSITION_BATCH_SIZE]
+            current.update(
+                (pk, (previous, user_id, total_amount))
+                for pk, previous, user_id, total_amount in queryset.select_for_update().filter(pk__in=batch)
+                .values_list('pk', 'status', 'user_id', 'total_amount')
+            )
+
+        results, movable = [], []
+        for pk in order_ids:
+            if pk not in current:
+                results.append({'id': pk, 'status': 'error', 'error': 'Order not found.'})
+            elif not can_transition(current[pk][0], status):
+                results.append({'id': pk, 'status': 'error', 'error': f'Cannot go from {current[pk][0]} to {status}.'})
+            else:
+                results.append({'id': pk, 'status': 'updated', 'previous_status': current[pk][0]})
+                movable.append(pk)
+        if strict and len(movable) != len(order_ids):
+            return [
+                {'id': result['id'], 'status': 'skipped'} if result['status'] == 'updated' else result
+                for result in results
+            ]
+        if not movable:
+            return results
+
+        now = timezone.now()
+        sources = allowed_sources(status)
+        for start in range(0, len(movable), TRANSITION_BATCH_SIZE):
+            batch = movable[start:start + TRANSITION_BATCH_SIZE]
+            Order.objects.using(using).filter(pk__in=batch, status__in=sources).update(status=status, updated_at=now)
+            VendorOrder.objects.using(using).filter(order_id__in=batch).update(status=status, updated_at=now)
+        if status == 'cancelled':
+            restock_orders([pk for pk in movable if current[pk][0] in RESTOCKED_STATUSES], using=using)
+
+        bulk_log_actions(user, [
+            (f"Order status updated to {status}", {
+                'order_id': pk,
+                'status': status,
+                'previous_status': current[pk][0],
+                'total_amount': float(current[pk][2]) if current[pk][2] is not None else None,
+                'user_id': current[pk][1],
+                'changed_by_user_id': user.id if user else None,
+                'source': 'transition',
+            })
+            for pk in movable
+        ], ip_address=ip_address)
+    return results
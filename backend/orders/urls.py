@@ -1,10 +1,12 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
-from .views import CartViewSet, OrderViewSet, WishlistViewSet
+from .views import CartViewSet, GuestCartViewSet, OrderViewSet, VendorOrderViewSet, WishlistViewSet
 
 router = DefaultRouter()
 router.register(r'carts', CartViewSet, basename='cart')
+router.register(r'guest-carts', GuestCartViewSet, basename='guest-cart')
 router.register(r'orders', OrderViewSet, basename='order')
+router.register(r'vendor-orders', VendorOrderViewSet, basename='vendor-order')
 router.register(r'wishlists', WishlistViewSet, basename='wishlist')
 
 urlpatterns = [
@@ -0,0 +1,64 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from .models import Order, OrderItem, VendorOrder
+
+# Per-vendor sub-orders: one VendorOrder row per (order, vendor) holding the vendor's
+# subtotal and item count, kept in step with the order lines by orders.signals.
+# Vendor listings and dashboards filter this table on its (vendor, created_at) and
+# (vendor, status) indexes instead of joining orders to items to products, which also
+# listed an order once per matching line.
+SYNC_BATCH_SIZE = 500
+
+
+def sync_vendor_orders(order_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Recompute the sub-orders of `order_ids` from their lines: one aggregate, one read of the
+    existing rows and one upsert, whatever the number of orders. Returns the rows written.
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return 0
+    rows = list(
+        OrderItem.objects.using(using).filter(order_id__in=order_ids).order_by()
+        .values('order_id', 'product__vendor_id', 'order__status', 'order__created_at')
+        .annotate(subtotal=Sum('total_price'), item_count=Sum('quantity'))
+    )
+    with transaction.atomic(using=using):
+        existing = VendorOrder.objects.using(using).filter(order_id__in=order_ids).values_list('pk', 'order_id', 'vendor_id')
+        keep = {(row['order_id'], row['product__vendor_id']) for row in rows}
+        stale = [pk for pk, order_id, vendor_id in existing if (order_id, vendor_id) not in keep]
+        if stale: # A vendor's last line was removed from the order
+            VendorOrder.objects.using(using).filter(pk__in=stale).delete()
+        VendorOrder.objects.using(using).bulk_create(
+            [
+                VendorOrder(
+                    order_id=row['order_id'], vendor_id=row['product__vendor_id'], status=row['order__status'],
+                    subtotal=row['subtotal'], item_count=row['item_count'], created_at=row['order__created_at'],
+                )
+                for row in rows
+            ],
+            update_conflicts=True,
+            unique_fields=['order', 'vendor'],
+            update_fields=['status', 'subtotal', 'item_count', 'created_at', 'updated_at'],
+        )
+    return len(rows)
+
+
+def sync_vendor_order_status(order, using=DEFAULT_DB_ALIAS):
+    return VendorOrder.objects.using(using).filter(order=order).exclude(status=order.status).update(
+        status=order.status, updated_at=timezone.now()
+    )
+
+
+def rebuild_vendor_orders(batch_size=SYNC_BATCH_SIZE, using=DEFAULT_DB_ALIAS):
+    """Resync every order, in keyset batches of order ids. Returns the rows written."""
+    total, last_id = 0, 0
+    while True:
+        batch = list(
+            Order.objects.using(using).filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            return total
+        total += sync_vendor_orders(batch, using=using)
+        last_id = batch[-1]
@@ -1,57 +1,305 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, Prefetch, Sum
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from .models import Cart, CartItem, Order, OrderItem, Wishlist
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework_simplejwt.views import TokenObtainPairView
+from aloauto.pagination import KeysetPagination
+from aloauto.fieldsets import fieldset_queryset, fieldset_requested
+from logs.signals import get_request_ip
+from .models import Cart, CartItem, Order, OrderItem, VendorOrder, Wishlist
 from .serializers import (
-    CartSerializer, CartItemSerializer,
+    CartSerializer, CartItemSerializer, CartItemsSetSerializer, CartTotalsSerializer, CheckoutSerializer,
+    GuestCartLineSerializer, GuestCartTokenObtainPairSerializer, OrderTransitionSerializer,
     OrderSerializer, OrderItemSerializer,
-    WishlistSerializer
+    StockReservationSerializer, VendorOrderSerializer, WishlistSerializer
 )
+from .cart_items import UnknownProducts, add_cart_item, set_cart_items
+from .cart_totals import get_cart_totals
+from .checkout import CheckoutError, checkout_cart
+from .guest_carts import (
+    GuestCartBusy, GuestCartFull, GuestCartNotFound, add_guest_cart_item, create_guest_cart, delete_guest_cart,
+    get_guest_cart, guest_cart_lines, merge_guest_cart, set_guest_cart_items
+)
+from .reservations import InsufficientStock, release_reservations, reserve_stock, stock_shortages
+from .transitions import transition_orders
 
 class CartViewSet(viewsets.ModelViewSet):
     serializer_class = CartSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Cart.objects.filter(user=self.request.user)
+        queryset = Cart.objects.filter(user=self.request.user)
+        if self.action in ('list', 'retrieve') and fieldset_requested(self.request):
+            return fieldset_queryset(queryset, self.get_serializer())
+        return queryset
 
     @action(detail=True, methods=['post'])
     def add_item(self, request, pk=None):
+        # Adding a product already in the cart raises its quantity (orders.cart_items)
         cart = self.get_object()
         serializer = CartItemSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save(cart=cart)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            item, created = add_cart_item(cart, serializer.validated_data['product_id'], serializer.validated_data.get('quantity', 1))
+        except UnknownProducts as e:
+            return Response({'product_id': [f'Unknown or inactive product {e.product_ids[0]}.']}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            CartItemSerializer(item, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    @action(detail=True, methods=['post'])
+    def set_items(self, request, pk=None):
+        # Set many quantities in one request and one transaction (offline cart sync);
+        # a later entry for the same product wins.
+        cart = self.get_object()
+        serializer = CartItemsSetSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        quantities = {item['product_id']: item['quantity'] for item in serializer.validated_data['items']}
+        try:
+            set_cart_items(cart, quantities, replace=serializer.validated_data['replace'])
+        except UnknownProducts as e:
+            return Response({'items': [f'Unknown or inactive products: {", ".join(map(str, e.product_ids))}.']}, status=status.HTTP_400_BAD_REQUEST)
+        items = CartItem.objects.select_related('product__vendor', 'product__category').prefetch_related('product__images')
+        cart = Cart.objects.prefetch_related(Prefetch('items', queryset=items)).get(pk=cart.pk)
+        return Response(self.get_serializer(cart).data)
+
+    @action(detail=False, methods=['post'])
+    def merge_guest(self, request):
+        # Add a guest cart (see GuestCartViewSet) to the user's cart; login does it too
+        try:
+            cart = merge_guest_cart(request.data.get('guest_cart'), request.user)
+        except GuestCartBusy as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        if cart is None:
+            return Response({'error': 'Guest cart not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self.get_serializer(cart).data)
+
+    @action(detail=True, methods=['get'])
+    def totals(self, request, pk=None):
+        # Cart badge / mini-cart: cached totals, without loading the items' products
+        cart = self.get_object()
+        return Response(CartTotalsSerializer(get_cart_totals([cart.pk])[cart.pk]).data)
+
+    @action(detail=True, methods=['post'])
+    def reserve(self, request, pk=None):
+        # Hold the cart's items for checkout; replaces the cart's previous reservations,
+        # which are kept if the new ones cannot be made.
+        cart = self.get_object()
+        try:
+            with transaction.atomic():
+                release_reservations(cart=cart)
+                reservations = reserve_stock(cart.items.values_list('product_id', 'quantity'), cart=cart, user=request.user)
+        except InsufficientStock as e:
+            # Read once the release above is rolled back, so the cart's own held units are not counted as available.
+            shortages = stock_shortages(e.requested)
+            return Response(
+                {'error': 'Insufficient stock', 'available': {str(k): v for k, v in shortages.items()}},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(StockReservationSerializer(reservations, many=True).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def release(self, request, pk=None):
+        cart = self.get_object()
+        return Response({'released': release_reservations(cart=cart)})
+
+    @action(detail=True, methods=['post'])
+    def checkout(self, request, pk=None):
+        # Turn the cart into an order (see orders.checkout); the cart is emptied on success.
+        cart = self.get_object()
+        serializer = CheckoutSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        try:
+            order = checkout_cart(
+                cart, request.user,
+                shipping_address_id=data['shipping_address'],
+                billing_address_id=data.get('billing_address'),
+                payment_method=data['payment_method'],
+                shipping_method=data.get('shipping_method'),
+                notes=data.get('notes', ''),
+            )
+        except CheckoutError as e:
+            return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+        except InsufficientStock as e:
+            # Read after the checkout transaction, which released the cart's held units, is rolled back.
+            shortages = stock_shortages(e.requested)
+            return Response(
+                {'error': 'Insufficient stock', 'available': {str(k): v for k, v in shortages.items()}},
+                status=status.HTTP_409_CONFLICT
+            )
+        items = OrderItem.objects.select_related('product__vendor', 'product__category').prefetch_related('product__images')
+        order = Order.objects.prefetch_related(Prefetch('items', queryset=items)).get(pk=order.pk)
+        return Response(OrderSerializer(order, context={'request': request}).data, status=status.HTTP_201_CREATED)
+
+class GuestCartViewSet(viewsets.ViewSet):
+    # Carts of visitors without an account, kept in the cache under an opaque token
+    # (orders.guest_carts) and merged into their Cart when they log in.
+    permission_classes = [AllowAny]
+    lookup_value_regex = '[A-Za-z0-9_-]+'
+
+    def guest_cart_response(self, token, items, status_code=status.HTTP_200_OK):
+        lines, totals = guest_cart_lines(items)
+        return Response({
+            'token': token,
+            'items': GuestCartLineSerializer(lines, many=True).data,
+            'totals': CartTotalsSerializer(totals).data,
+        }, status=status_code)
+
+    def update_items(self, token, update, status_code=status.HTTP_200_OK):
+        try:
+            items = update()
+        except GuestCartNotFound:
+            return Response({'error': 'Guest cart not found'}, status=status.HTTP_404_NOT_FOUND)
+        except GuestCartBusy as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except UnknownProducts as e:
+            return Response({'items': [f'Unknown or inactive products: {", ".join(map(str, e.product_ids))}.']}, status=status.HTTP_400_BAD_REQUEST)
+        except GuestCartFull as e:
+            return Response({'items': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+        return self.guest_cart_response(token, items, status_code)
+
+    def create(self, request):
+        # Optionally with a first set of `items`, as for set_items
+        if not request.data.get('items'):
+            return self.guest_cart_response(create_guest_cart(), {}, status.HTTP_201_CREATED)
+        serializer = CartItemsSetSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        quantities = {item['product_id']: item['quantity'] for item in serializer.validated_data['items']}
+        token = create_guest_cart()
+        return self.update_items(token, lambda: set_guest_cart_items(token, quantities), status.HTTP_201_CREATED)
+
+    def retrieve(self, request, pk=None):
+        items = get_guest_cart(pk)
+        if items is None:
+            return Response({'error': 'Guest cart not found'}, status=status.HTTP_404_NOT_FOUND)
+        return self.guest_cart_response(pk, items)
+
+    def destroy(self, request, pk=None):
+        delete_guest_cart(pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'])
+    def add_item(self, request, pk=None):
+        serializer = CartItemSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        return self.update_items(pk, lambda: add_guest_cart_item(pk, data['product_id'], data.get('quantity', 1)))
+
+    @action(detail=True, methods=['post'])
+    def set_items(self, request, pk=None):
+        serializer = CartItemsSetSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        quantities = {item['product_id']: item['quantity'] for item in serializer.validated_data['items']}
+        replace = serializer.validated_data['replace']
+        return self.update_items(pk, lambda: set_guest_cart_items(pk, quantities, replace=replace))
+
+class GuestCartTokenObtainPairView(TokenObtainPairView):
+    serializer_class = GuestCartTokenObtainPairSerializer
 
 class OrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination # ?cursor= switches to (created_at, id) keyset pages
 
     def get_queryset(self):
         user = self.request.user
         if user.role == 'admin':
-            return Order.objects.all()
+            queryset = Order.objects.all()
         elif user.role == 'vendor':
-            return Order.objects.filter(items__product__vendor__user=user)
-        return Order.objects.filter(user=user)
+            # One sub-order per (order, vendor): no duplicate orders, no join through the items
+            queryset = Order.objects.filter(vendor_orders__vendor__user=user)
+        else:
+            queryset = Order.objects.filter(user=user)
+        if self.action in ('list', 'retrieve') and fieldset_requested(self.request):
+            return fieldset_queryset(queryset, self.get_serializer(), extra_fields=('created_at',))
+        return queryset
 
     @action(detail=True, methods=['post'])
     def confirm(self, request, pk=None):
         order = self.get_object()
         if order.status == 'new':
-            order.status = 'confirmed'
-            order.save()
+            transition_orders([order.pk], 'confirmed', user=request.user, ip_address=get_request_ip(request))
             return Response({'status': 'order confirmed'})
         return Response(
             {'error': 'Invalid order status'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    @action(detail=False, methods=['post'], url_path='bulk-transition')
+    def bulk_transition(self, request):
+        """
+        Move up to TRANSITION_MAX_ORDERS orders to a new status along Order.STATUS_TRANSITIONS.
+        Body: {"ids": [...], "status": "shipped", "strict": false}. Admins only.
+        """
+        if request.user.role != 'admin':
+            return Response({'error': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+        serializer = OrderTransitionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+        results = transition_orders(
+            data['ids'], data['status'], user=request.user, ip_address=get_request_ip(request), strict=data['strict']
+        )
+        summary = {state: sum(1 for r in results if r['status'] == state) for state in ('updated', 'error', 'skipped')}
+        return Response({**summary, 'results': results})
+
+class VendorOrderViewSet(viewsets.ReadOnlyModelViewSet):
+    # Each vendor's share of the orders (see orders.vendor_orders), for vendor listings and dashboards
+    serializer_class = VendorOrderSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    filterset_fields = ['status', 'order']
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.role == 'admin':
+            queryset = VendorOrder.objects.all()
+        elif user.role == 'vendor':
+            queryset = VendorOrder.objects.filter(vendor__user=user)
+        else:
+            queryset = VendorOrder.objects.filter(order__user=user)
+        queryset = queryset.order_by('-created_at', '-id')
+        if self.action in ('list', 'retrieve') and fieldset_requested(self.request):
+            return fieldset_queryset(queryset, self.get_serializer(), extra_fields=('created_at',))
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        # Dashboard totals per status, one GROUP BY on the (vendor, status) index
+        rows = (
+            self.filter_queryset(self.get_queryset()).order_by().values('status')
+            .annotate(orders=Count('id'), items=Sum('item_count'), revenue=Sum('subtotal'))
+        )
+        cent = Decimal('0.01')
+        rows = list(rows)
+        revenue = sum((row['revenue'] for row in rows if row['status'] != 'cancelled'), Decimal('0'))
+        # Amounts rendered as strings, like the serializers' DecimalFields
+        return Response({
+            'orders': sum(row['orders'] for row in rows),
+            'revenue': str(revenue.quantize(cent)),
+            'by_status': {
+                row['status']: {'orders': row['orders'], 'items': row['items'], 'revenue': str(row['revenue'].quantize(cent))}
+                for row in rows
+            },
+        })
+
 class WishlistViewSet(viewsets.ModelViewSet):
     serializer_class = WishlistSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Wishlist.objects.filter(user=self.request.user)
\ No newline at end of file
+        queryset = Wishlist.objects.filter(user=self.request.user)
+        if self.action in ('list', 'retrieve') and fieldset_requested(self.request):
+            return fieldset_queryset(queryset, self.get_serializer())
+        return queryset
\ No newline at end of file
@@ -26,4 +26,7 @@ class Payment(models.Model):
 
     class Meta:
         verbose_name = 'Paiement'
-        verbose_name_plural = 'Paiements'
\ No newline at end of file
+        verbose_name_plural = 'Paiements'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='payment_status_created_idx'),
+        ]
\ No newline at end of file
@@ -0,0 +1,22 @@
+# Generated by Django 5.0 on 2026-10-17 00:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_hot_query_indexes'),
+        ('shipping', '0002_shipment_actual_delivery_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(fields=['status', 'created_at'], name='shipment_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shipment',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'in_transit'])), fields=['created_at'], name='shipment_open_idx'),
+        ),
+    ]
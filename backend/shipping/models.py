@@ -21,4 +21,9 @@ class Shipment(models.Model):
 
     class Meta:
         verbose_name = 'Livraison'
-        verbose_name_plural = 'Livraisons'
\ No newline at end of file
+        verbose_name_plural = 'Livraisons'
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='shipment_status_created_idx'),
+            # Shipments still in flight, polled for tracking updates
+            models.Index(fields=['created_at'], condition=models.Q(status__in=['pending', 'in_transit']), name='shipment_open_idx'),
+        ]
\ No newline at end of file
@@ -35,4 +35,10 @@ class Ticket(models.Model):
 
     class Meta:
         verbose_name = 'Ticket'
-        verbose_name_plural = 'Tickets'
\ No newline at end of file
+        verbose_name_plural = 'Tickets'
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='ticket_user_created_idx'), # A user's tickets, newest first
+            models.Index(fields=['created_at'], name='ticket_created_idx'), # Staff queue
+            # Tickets still being worked on; closed ones pile up and are rarely listed
+            models.Index(fields=['status', 'created_at'], condition=models.Q(status__in=['open', 'pending']), name='ticket_open_idx'),
+        ]
\ No newline at end of file
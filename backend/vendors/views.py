@@ -4,15 +4,24 @@ from rest_framework.response import Response
 from .models import Vendor
 from .serializers import VendorSerializer
 from .permissions import IsVendorOwner
+from aloauto.conditional import ConditionalGetMixin
 
-class VendorViewSet(viewsets.ModelViewSet):
+class VendorViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = VendorSerializer
     permission_classes = [permissions.IsAuthenticated, IsVendorOwner]
+    conditional_related = ('user',) # user_email / user_name are in the payload
 
     def get_queryset(self):
         if self.request.user.role == 'admin':
-            return Vendor.objects.all()
-        return Vendor.objects.filter(user=self.request.user)
+            return Vendor.objects.select_related('user')
+        return Vendor.objects.filter(user=self.request.user).select_related('user')
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag, last_modified = self.get_object_validators(instance)
+        return self.conditional_response(
+            request, etag, last_modified, lambda: Response(self.get_serializer(instance).data)
+        )
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)